@@ -0,0 +1,223 @@
+"""
+Admission control for the LLM-backed routes
+Per-client token buckets turn away bursts with 429, and a global gate caps
+the upstream work in flight: requests beyond the cap wait in a bounded FIFO
+queue for a limited time and are turned away with 503 when it is full or the
+wait runs out. Both rejections carry a Retry-After hint.
+"""
+
+import collections
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Optional
+
+# Rejection reasons, also used as metric labels
+RATE_LIMITED = "rate_limited"
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class Rejected(Exception):
+    """A request refused at admission, with the HTTP status and Retry-After seconds"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RouteLimits:
+    """Per-client rate (requests/second) and burst, and the gate units a request holds"""
+
+    def __init__(self, rate: float, burst: float, cost: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.cost = cost
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; return 0 when admitted, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class RateLimiter:
+    """Token buckets keyed by (client, route), keeping the most recent `max_clients` keys"""
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self._buckets: "collections.OrderedDict[tuple, TokenBucket]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str, route: str, limits: RouteLimits) -> float:
+        now = time.monotonic()
+        key = (client, route)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(limits.rate, limits.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+class ConcurrencyGate:
+    """Weighted FIFO semaphore over upstream work units with a bounded wait queue
+
+    A request holds `cost` units (capped at `capacity`) while it runs. Waiters
+    are served strictly in arrival order so a large request is not starved.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, max_wait: float):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_use = 0
+        self._queue: "collections.deque[object]" = collections.deque()
+        self._cond = threading.Condition()
+        # Exponentially weighted average of how long units are held, for Retry-After
+        self._hold_seconds = 1.0
+
+    def acquire(self, cost: int) -> float:
+        """Wait for `cost` units and return the seconds spent queued, or raise Rejected"""
+        cost = min(cost, self.capacity)
+        started = time.monotonic()
+        with self._cond:
+            if not self._queue and self.in_use + cost <= self.capacity:
+                self.in_use += cost
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                raise Rejected(503, QUEUE_FULL, self._estimated_wait())
+            ticket = object()
+            self._queue.append(ticket)
+            deadline = started + self.max_wait
+            try:
+                while self._queue[0] is not ticket or self.in_use + cost > self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, QUEUE_TIMEOUT, self._estimated_wait())
+                    self._cond.wait(remaining)
+                self.in_use += cost
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+        return time.monotonic() - started
+
+    def release(self, cost: int, held_seconds: float) -> None:
+        cost = min(cost, self.capacity)
+        with self._cond:
+            self.in_use -= cost
+            self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * held_seconds
+            self._cond.notify_all()
+
+    def _estimated_wait(self) -> float:
+        return self._hold_seconds * (len(self._queue) + 1) / self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"inUse": self.in_use, "capacity": self.capacity, "queued": len(self._queue)}
+
+
+class Admission:
+    """Rate limiting plus the concurrency gate, with limits per route
+
+    Only routes listed in `routes` are subject to admission.
+    """
+
+    def __init__(self, enabled: bool, routes: Dict[str, RouteLimits],
+                 gate: ConcurrencyGate, limiter: Optional[RateLimiter] = None):
+        self.enabled = enabled
+        self.routes = routes
+        self.gate = gate
+        self.limiter = limiter or RateLimiter()
+
+    def applies_to(self, route: str) -> bool:
+        return self.enabled and route in self.routes
+
+    def admit(self, client: str, route: str) -> float:
+        """Admit a request or raise Rejected; returns the seconds spent queued"""
+        limits = self.routes[route]
+        wait = self.limiter.check(client, route, limits)
+        if wait > 0:
+            raise Rejected(429, RATE_LIMITED, wait)
+        return self.gate.acquire(limits.cost) if limits.cost else 0.0
+
+    def release(self, route: str, held_seconds: float) -> None:
+        cost = self.routes[route].cost
+        if cost:
+            self.gate.release(cost, held_seconds)
+
+
+def route_env_name(route: str) -> str:
+    """'/generate-startup/stream' -> 'GENERATE_STARTUP_STREAM'"""
+    return route.strip("/").replace("-", "_").replace("/", "_").upper()
+
+
+def api_key_hash(api_key: str) -> str:
+    """Short SHA-256 digest of an API key, so raw keys are never stored or logged"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def api_key_hashes(value: str) -> FrozenSet[str]:
+    """Hashes of a comma-separated list of API keys"""
+    return frozenset(api_key_hash(key.strip()) for key in value.split(",") if key.strip())
+
+
+def client_id(headers, remote_addr: Optional[str], trust_forwarded: bool = False,
+              api_keys: FrozenSet[str] = frozenset()) -> str:
+    """Identify the caller by API key (hashed) or by IP address
+
+    Only keys whose hash is in `api_keys` (configured on the server) count:
+    a client free to pick any key could otherwise mint a fresh rate-limit
+    bucket and token quota per request. Any other key falls back to the IP.
+    """
+    api_key = headers.get("X-API-Key")
+    if api_key and api_key_hash(api_key) in api_keys:
+        return "key:" + api_key_hash(api_key)
+    forwarded = headers.get("X-Forwarded-For") if trust_forwarded else None
+    if forwarded:
+        return "ip:" + forwarded.split(",")[0].strip()
+    return "ip:" + (remote_addr or "unknown")
+
+
+def admission_from_env(routes: Dict[str, RouteLimits]) -> Admission:
+    """Build admission control from ADMISSION_* variables
+
+    `routes` holds the default limits per route; each can be overridden with
+    ADMISSION_RATE_<ROUTE>, ADMISSION_BURST_<ROUTE> and ADMISSION_COST_<ROUTE>.
+    """
+    configured = {}
+    for route, limits in routes.items():
+        name = route_env_name(route)
+        configured[route] = RouteLimits(
+            rate=float(os.getenv("ADMISSION_RATE_" + name, limits.rate)),
+            burst=float(os.getenv("ADMISSION_BURST_" + name, limits.burst)),
+            cost=int(os.getenv("ADMISSION_COST_" + name, limits.cost)),
+        )
+    return Admission(
+        enabled=os.getenv("ADMISSION_ENABLED", "1").lower() not in ("0", "false", "no"),
+        routes=configured,
+        gate=ConcurrencyGate(
+            capacity=int(os.getenv("ADMISSION_MAX_CONCURRENT", "32")),
+            max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "64")),
+            max_wait=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+        ),
+        limiter=RateLimiter(int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))),
+    )
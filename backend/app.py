@@ -1,240 +1,1123 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 import os
 import json
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import time
+import uuid
+import contextvars
+import threading
+import itertools
+import atexit
+import hmac
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
 import logging
+from urllib.parse import urlencode
+from cache import cache_from_env, make_cache_key, should_bypass
+from streaming import IncrementalObjectParser, sse_event, SSE_HEADERS
+from batch import BatchStats, run_batch
+from llm_backends import create_llm
+from readiness import WarmUp
+from singleflight import singleflight_from_env, LEADER
+from similarity import dream_index_from_env
+from jobs import job_runner_from_env, job_view
+from dreams import dream_store_from_env, DreamConflict, parse_timestamp
+from export import FORMATS, export_chunks
+from admission import admission_from_env, api_key_hash, api_key_hashes, client_id, Rejected, RouteLimits
+from model_routing import model_router_from_env, requested_tier, QUALITY, FAST
+from resilience import resilience_from_env, CircuitOpen
+from server import options_from_env
+from metering import meter_from_env, current_client, QuotaExceeded
+from prompts import PromptRegistry, PROMPT_SPECS, SECTION_FIELDS, prompt_version, section_prompt_name, count_tokens
+from longform import split_text, merge_analyses
+from responses import FastJSONProvider, response_layer_from_env
+import metrics
 
 # Load environment variables
 load_dotenv()
 
+class TimedJSONProvider(FastJSONProvider):
+    """Fast JSON provider that records jsonify time as the serialize stage"""
+    
+    def response(self, *args, **kwargs):
+        with metrics.stage("serialize"):
+            return super().response(*args, **kwargs)
+
+class LimitedRequest(Request):
+    """Request whose chunked bodies over MAX_CONTENT_LENGTH raise 413
+
+    Werkzeug stops reading a body without Content-Length at the limit but
+    hands back the truncated data, which would then fail as malformed JSON.
+    """
+    
+    def get_data(self, *args, **kwargs):
+        data = super().get_data(*args, **kwargs)
+        limit = self.max_content_length
+        if self.content_length is None and limit is not None and len(data) >= limit:
+            raise RequestEntityTooLarge()
+        return data
+
 app = Flask(__name__)
-CORS(app)
+app.request_class = LimitedRequest
+app.json_provider_class = TimedJSONProvider
+app.json = TimedJSONProvider(app)
+CORS(app, expose_headers=["X-Request-ID", "X-Cache", "Retry-After", "X-Next-Cursor", "ETag"])
+
+# ETags, 304 Not Modified and gzip/brotli compression for every route (RESPONSE_*)
+response_layer = response_layer_from_env()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI
-llm = ChatOpenAI(
-    model="gpt-4",
-    temperature=0.9,
-    api_key=os.getenv("OPENAI_API_KEY")
+# Model profile per LLM task (MODEL_*): each task has a default tier, which a
+# request can override with X-Model-Tier. Clients (OpenAI unless LLM_BACKEND
+# says otherwise) are built per profile on first use or during warm-up, so
+# importing the app does not construct them. A whole StartupIdea or canvas
+# needs more output tokens than a tier's limit allows, so those tasks carry
+# their own limit (MODEL_MAX_TOKENS_<TASK>) on whichever tier serves them
+model_router = model_router_from_env({
+    'analyze-dream': QUALITY,
+    'generate-startup': QUALITY,
+    'generate-business-model': QUALITY,
+    'generate-mockup': FAST,
+    'regenerate-section': FAST,
+}, create_llm, {
+    'generate-startup': 3000,
+    'generate-business-model': 3000,
+})
+_llm_lock = threading.Lock()
+
+# Circuit breaker, retries and hedging around every upstream call, per model profile (RESILIENCE_*)
+resilience = resilience_from_env(
+    # Every thread that can call upstream: request threads and the app's own pools
+    upstream_threads=options_from_env()["threads"] + sum(
+        int(os.getenv(name, default)) for name, default in
+        (("PIPELINE_WORKERS", "8"), ("LONG_DREAM_WORKERS", "8"), ("JOB_WORKERS", "4"))
+    ),
+    on_event=lambda profile, event: metrics.LLM_RESILIENCE_EVENTS.inc(profile=profile, event=event)
+)
+
+# Token usage per client, route and model, flushed to SQLite (METERING_*)
+meter = meter_from_env()
+atexit.register(meter.close)
+# /usage lists every client's usage, so it needs this admin key; /usage/me stays open
+USAGE_API_KEY = os.getenv("USAGE_API_KEY", "")
+
+# Compiled prompts, built together with the LLM client
+prompt_registry = None
+
+# Response cache shared by the LLM-backed endpoints
+response_cache = cache_from_env()
+
+# Optional near-duplicate dream index in front of dream analysis (SIMILARITY_*),
+# built on first use since loading it pulls in NumPy and reads the saved index
+dream_index = None
+SIMILARITY_INDEX_ENABLED = os.getenv("SIMILARITY_INDEX_ENABLED", "0").lower() in ("1", "true", "yes")
+SIMILARITY_THRESHOLD = None
+SIMILARITY_SEED_THRESHOLD = None
+
+# Coalesces concurrent identical LLM calls (cross-process with COALESCE_LOCK_DIR)
+coalescer = singleflight_from_env()
+
+# Worker threads for pipeline stages that can run concurrently
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PIPELINE_WORKERS", "8")),
+    thread_name_prefix="pipeline"
+)
+
+# Long-input mode: dreams over LONG_DREAM_CHUNK_TOKENS are split into chunks,
+# analysed concurrently on their own pool and merged (0 = always one prompt,
+# trimmed to its token budget). DREAM_MAX_CHARS caps a dream's length and
+# MAX_REQUEST_BYTES any request body.
+LONG_DREAM_CHUNK_TOKENS = int(os.getenv("LONG_DREAM_CHUNK_TOKENS", "1500"))
+chunk_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LONG_DREAM_WORKERS", "8")),
+    thread_name_prefix="dream-chunk"
 )
+DREAM_MAX_CHARS = int(os.getenv("DREAM_MAX_CHARS", "100000"))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(16 * 1024 * 1024)))
+# Enforced by Werkzeug while the body is read, so chunked bodies without a Content-Length are capped too
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+
+# Async job runner and its SQLite store (JOB_*), built on first use
+job_runner = None
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))
+
+# Saved dreams (DREAMS_*), opened on first use
+dream_store = None
+DREAMS_MAX_PAGE_SIZE = 100
+
+# Bulk export: disabled unless EXPORT_API_KEY is set, since it covers every
+# owner's dreams; rows are read and encoded EXPORT_BATCH_SIZE at a time
+EXPORT_API_KEY = os.getenv("EXPORT_API_KEY", "")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Batch endpoint limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Admission control for the LLM-backed routes: per-client rate (requests/second)
+# and burst, and how many units of the global concurrency gate a request holds.
+# Each value can be overridden with ADMISSION_RATE_/BURST_/COST_<ROUTE>.
+admission = admission_from_env({
+    '/analyze-dream': RouteLimits(rate=1, burst=5),
+    '/analyze-dream/stream': RouteLimits(rate=1, burst=5),
+    '/generate-startup': RouteLimits(rate=0.5, burst=3),
+    '/generate-startup/stream': RouteLimits(rate=0.5, burst=3),
+    '/generate-business-model': RouteLimits(rate=0.5, burst=3),
+    '/generate-mockup': RouteLimits(rate=2, burst=10),
+    '/regenerate-section': RouteLimits(rate=1, burst=5, cost=2),
+    '/dream-to-startup': RouteLimits(rate=0.2, burst=2, cost=4),
+    '/analyze-dreams/batch': RouteLimits(rate=0.05, burst=1, cost=BATCH_MAX_CONCURRENCY),
+    '/generate-startups/batch': RouteLimits(rate=0.05, burst=1, cost=BATCH_MAX_CONCURRENCY),
+    # Jobs run on their own worker pool, so submitting one holds no gate units
+    '/jobs': RouteLimits(rate=1, burst=10, cost=0),
+})
+# Take the client address from X-Forwarded-For (only behind a trusted proxy)
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0").lower() in ("1", "true", "yes")
+# API keys (comma-separated) that get their own rate limits and token quota;
+# callers with any other key are limited by IP address
+ADMISSION_API_KEYS = api_key_hashes(os.getenv("ADMISSION_API_KEYS", ""))
+
+# Emit one structured timing log line per request when enabled
+REQUEST_TIMING_LOGS = os.getenv("REQUEST_TIMING_LOGS", "0").lower() in ("1", "true", "yes")
+
+# Prompt versions are part of the cache key, so editing a prompt in prompts.py
+# (and bumping its version) stops stale cached responses from being served
+DREAM_ANALYSIS_PROMPT_VERSION = prompt_version("dream-analysis")
+STARTUP_GENERATION_PROMPT_VERSION = prompt_version("startup-generation")
+
+def get_schema(schema_name):
+    """Pydantic model defined in schemas.py"""
+    import schemas
+    return getattr(schemas, schema_name)
+
+@lru_cache(maxsize=None)
+def get_output_parser(schema_name):
+    """PydanticOutputParser for a model defined in schemas.py, built once"""
+    from langchain_core.output_parsers import PydanticOutputParser
+    return PydanticOutputParser(pydantic_object=get_schema(schema_name))
+
+def get_prompt_registry():
+    """The prompt registry, compiled (with output format instructions) on first call"""
+    global prompt_registry
+    if prompt_registry is None:
+        with _llm_lock:
+            if prompt_registry is None:
+                prompt_registry = PromptRegistry(
+                    PROMPT_SPECS, lambda schema: get_output_parser(schema).get_format_instructions()
+                )
+    return prompt_registry
+
+def render_prompt(prompt_name, **values):
+    """Render a registered prompt within its token budget and record its token counts"""
+    with metrics.stage("prompt"):
+        prompt = get_prompt_registry().get(prompt_name)
+        rendered = prompt.render(**values)
+    route = metrics.current_route.get()
+    metrics.PROMPT_TOKENS.observe(rendered.static_tokens, route=route, prompt=prompt_name, part="static")
+    metrics.PROMPT_TOKENS.observe(rendered.payload_tokens, route=route, prompt=prompt_name, part="payload")
+    if rendered.trimmed:
+        metrics.PROMPT_TRIMS.inc(route=route, prompt=prompt_name)
+    logger.info(f"Prompt {prompt_name} v{prompt.version}: {rendered.static_tokens} static + "
+                f"{rendered.payload_tokens} payload tokens (budget {prompt.token_budget})")
+    return rendered.messages
+
+def get_dream_index():
+    """The near-duplicate dream index, or None when SIMILARITY_INDEX_ENABLED is off"""
+    global dream_index, SIMILARITY_THRESHOLD, SIMILARITY_SEED_THRESHOLD
+    if not SIMILARITY_INDEX_ENABLED:
+        return None
+    if dream_index is None:
+        with _llm_lock:
+            if dream_index is None:
+                index, SIMILARITY_THRESHOLD, SIMILARITY_SEED_THRESHOLD = dream_index_from_env()
+                if index.path:
+                    atexit.register(index.save)
+                dream_index = index
+    return dream_index
+
+def get_job_runner():
+    """The async job runner; resumes jobs interrupted by a previous process when first built"""
+    global job_runner
+    if job_runner is None:
+        with _llm_lock:
+            if job_runner is None:
+                job_runner = job_runner_from_env(
+                    {job_type: partial(run_job, job_type) for job_type in JOB_TYPES},
+                    on_finish=record_job
+                )
+    job_runner.recover()
+    return job_runner
+
+def get_dream_store():
+    global dream_store
+    if dream_store is None:
+        with _llm_lock:
+            if dream_store is None:
+                dream_store = dream_store_from_env()
+    return dream_store
+
+def warm_up_resources():
+    """Import LangChain, build the LLM clients and compile prompts and parsers"""
+    for profile in model_router.profiles.values():
+        model_router.client(profile)
+    for task in model_router.task_tiers:
+        model_router.client(model_router.profile(task))
+    get_prompt_registry()
+    get_dream_index()
+    get_job_runner()
+    get_dream_store()
+
+# A failed warm-up is retried by the next /ready probe after a backoff (WARMUP_RETRY_*)
+warm_up = WarmUp(warm_up_resources, retry_base=float(os.getenv("WARMUP_RETRY_BASE", "1")),
+                 retry_max=float(os.getenv("WARMUP_RETRY_MAX", "60")))
+
+# APP_WARMUP=background warms in a thread as soon as the app is imported;
+# with APP_WARMUP=lazy resources are built by the first request or /ready probe
+if os.getenv("APP_WARMUP", "background").lower() == "background":
+    warm_up.start()
+
+def record_llm_call(profile, llm, seconds, usage, outcome):
+    """Attribute one upstream call's latency and tokens to the route and the model profile"""
+    metrics.LLM_CALLS.inc(route=metrics.current_route.get(), profile=profile.tier, model=llm.model_name, outcome=outcome)
+    metrics.LLM_CALL_DURATION.observe(seconds, profile=profile.tier, model=llm.model_name, outcome=outcome)
+    metrics.record_usage(usage, llm.model_name, profile.tier)
+    meter.record(current_client.get(), metrics.current_route.get(), llm.model_name, usage)
+    model_router.record(profile, seconds, usage, outcome == "ok")
+
+def invoke_llm(prompt, task):
+    """Single entry point for blocking LLM calls
+
+    Sends the prompt to the model profile `task` is routed to, through the
+    profile's circuit breaker with retries and hedging. Every attempt is timed
+    and its token usage recorded, including hedges that lost the race.
+    """
+    profile = model_router.profile(task)
+    llm = model_router.client(profile)
+    
+    def attempt():
+        started = time.perf_counter()
+        try:
+            response = llm.invoke(prompt)
+        except Exception:
+            record_llm_call(profile, llm, time.perf_counter() - started, None, "error")
+            raise
+        record_llm_call(profile, llm, time.perf_counter() - started, getattr(response, "usage_metadata", None), "ok")
+        return response
+    
+    with metrics.stage("llm"):
+        return resilience.call(profile.tier, attempt)
+
+def stream_llm(prompt, task):
+    """Streaming counterpart of invoke_llm, yielding message chunks
+
+    Streams are not hedged; a stream that fails before its first chunk is
+    retried like a blocking call.
+    """
+    profile = model_router.profile(task)
+    llm = model_router.client(profile)
+    started = time.perf_counter()
+    
+    def start():
+        attempt_started = time.perf_counter()
+        chunks = iter(llm.stream(prompt))
+        try:
+            return next(chunks, None), chunks
+        except Exception:
+            record_llm_call(profile, llm, time.perf_counter() - attempt_started, None, "error")
+            raise
+    
+    first, chunks = resilience.call(profile.tier, start, hedge=False)
+    usage = None
+    outcome = "error"
+    try:
+        for chunk in itertools.chain([first] if first is not None else [], chunks):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            yield chunk
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.STAGE_DURATION.observe(elapsed, route=metrics.current_route.get(), stage="llm")
+        record_llm_call(profile, llm, elapsed, usage, outcome)
+
+def parse_output(schema_name, text, prompt, task):
+    """Validate structured LLM output against a schema and return it as a dict
+
+    JSON defects (code fences, trailing commas, truncation) are repaired locally.
+    Fields that are still missing or invalid are asked for once more with the
+    field-repair prompt (on `task`'s model profile), sending `prompt`'s payload
+    and the fields already answered, and merged in. Raises ValueError if the
+    output stays invalid.
+    """
+    from structured import StructuredOutputError, extract_json, field_descriptions, split_fields
+    model = get_schema(schema_name)
+    route = metrics.current_route.get()
+    try:
+        with metrics.stage("parse"):
+            try:
+                data, repaired = extract_json(text)
+            except StructuredOutputError:
+                data, repaired = {}, True
+            valid, bad = split_fields(model, data)
+        outcome = "repaired" if repaired else "clean"
+        if bad:
+            outcome = "reasked"
+            metrics.REASKED_FIELDS.inc(len(bad), route=route, schema=schema_name)
+            logger.warning(f"Re-asking for {len(bad)} {schema_name} field(s): {', '.join(bad)}")
+            response = invoke_llm(render_prompt(
+                "field-repair",
+                request=prompt[-1]["content"],
+                answered=valid,
+                fields=field_descriptions(model, bad)
+            ), task)
+            with metrics.stage("parse"):
+                patch, _ = extract_json(response.content)
+                valid.update({field: value for field, value in patch.items() if field in bad})
+        with metrics.stage("parse"):
+            result = model.model_validate(valid).model_dump()
+    except ValueError:
+        metrics.PARSE_FAILURES.inc(route=route)
+        metrics.STRUCTURED_OUTPUTS.inc(route=route, schema=schema_name, outcome="failed")
+        raise
+    metrics.STRUCTURED_OUTPUTS.inc(route=route, schema=schema_name, outcome=outcome)
+    return result
+
+def submit_in_context(executor, fn, *args):
+    """Submit work to a thread pool carrying the caller's metrics context"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def build_dream_analysis_prompt(dream_content, mood):
+    """Format the dream analysis prompt messages"""
+    return render_prompt("dream-analysis", dream_content=dream_content, mood=mood)
+
+def is_long_dream(dream_content):
+    """Whether a dream is analysed in chunks rather than in one prompt"""
+    return 0 < LONG_DREAM_CHUNK_TOKENS < len(dream_content) and count_tokens(dream_content) > LONG_DREAM_CHUNK_TOKENS
+
+def dream_size_error(dream_content):
+    """Error message for a dream longer than DREAM_MAX_CHARS, else None"""
+    if len(dream_content) > DREAM_MAX_CHARS:
+        return f"Dream content exceeds {DREAM_MAX_CHARS} characters"
+    return None
+
+def run_long_dream_analysis(dream_content, mood):
+    """Analyze a long dream chunk by chunk in parallel and merge the partial analyses
+
+    Each chunk is weighted by its length when emotion intensities are combined.
+    """
+    with metrics.stage("chunk"):
+        chunks = split_text(dream_content, LONG_DREAM_CHUNK_TOKENS, count_tokens)
+    metrics.LONG_DREAM_CHUNKS.observe(len(chunks), route=metrics.current_route.get())
+    logger.info(f"Analyzing a long dream in {len(chunks)} chunks")
+    
+    def analyze_chunk(chunk):
+        prompt = render_prompt("dream-analysis-excerpt", dream_content=chunk, mood=mood)
+        response = invoke_llm(prompt, "analyze-dream")
+        return parse_output("DreamAnalysis", response.content, prompt, "analyze-dream")
+    
+    futures = [submit_in_context(chunk_executor, analyze_chunk, chunk) for chunk in chunks]
+    partials = [future.result() for future in futures]
+    with metrics.stage("merge"):
+        return merge_analyses(partials, [len(chunk) for chunk in chunks])
+
+def run_dream_analysis(dream_content, mood, seed=None):
+    """Call the LLM to analyze a dream and return the analysis as a dict
+
+    `seed` is the analysis of a similar dream given to the model as a starting
+    point. Dreams over LONG_DREAM_CHUNK_TOKENS go through run_long_dream_analysis
+    (without the seed).
+    """
+    if is_long_dream(dream_content):
+        return run_long_dream_analysis(dream_content, mood)
+    if seed is None:
+        prompt = build_dream_analysis_prompt(dream_content, mood)
+    else:
+        prompt = render_prompt("dream-analysis-seeded", dream_content=dream_content, mood=mood, seed=seed)
+    
+    # Get response from OpenAI
+    response = invoke_llm(prompt, "analyze-dream")
+    
+    # Parse the response
+    return parse_output("DreamAnalysis", response.content, prompt, "analyze-dream")
+
+def analyze_with_similarity(dream_content, mood):
+    """run_dream_analysis behind the near-duplicate dream index, when enabled
+
+    A stored analysis at or above SIMILARITY_THRESHOLD is returned as is; one
+    above SIMILARITY_SEED_THRESHOLD seeds the prompt. New analyses are indexed.
+    """
+    index = get_dream_index()
+    if index is None:
+        return run_dream_analysis(dream_content, mood)
+    
+    with metrics.stage("similarity"):
+        match = index.search(dream_content, mood)
+    score = match.score if match else 0.0
+    metrics.SIMILARITY_SCORES.observe(score, route=metrics.current_route.get())
+    if score >= SIMILARITY_THRESHOLD:
+        metrics.SIMILARITY_LOOKUPS.inc(route=metrics.current_route.get(), outcome="reuse")
+        logger.info(f"Reusing analysis of a similar dream (similarity {score:.3f})")
+        return match.analysis
+    
+    seeded = SIMILARITY_SEED_THRESHOLD is not None and match is not None and score >= SIMILARITY_SEED_THRESHOLD
+    metrics.SIMILARITY_LOOKUPS.inc(route=metrics.current_route.get(), outcome="seed" if seeded else "miss")
+    analysis = run_dream_analysis(dream_content, mood, seed=match.analysis if seeded else None)
+    with metrics.stage("similarity"):
+        index.add(dream_content, mood, analysis)
+    return analysis
+
+def build_startup_prompt(symbols, emotions, keywords, tone, themes):
+    """Format the startup generation prompt messages (each analysis field appears once)"""
+    return render_prompt(
+        "startup-generation",
+        symbols=symbols,
+        emotions=emotions,
+        keywords=keywords,
+        tone=tone,
+        themes=themes
+    )
+
+def run_startup_generation(symbols, emotions, keywords, tone, themes):
+    """Call the LLM to generate a startup idea from analysis fields and return it as a dict"""
+    final_prompt = build_startup_prompt(symbols, emotions, keywords, tone, themes)
+    
+    # Get response from OpenAI
+    response = invoke_llm(final_prompt, "generate-startup")
+    
+    # Parse the response
+    return parse_output("StartupIdea", response.content, final_prompt, "generate-startup")
+
+def run_business_model(startup_idea):
+    """Call the LLM to build a business model canvas for a startup idea"""
+    business_model_prompt = render_prompt(
+        "business-model",
+        **{field: startup_idea.get(field, '') for field in ('name', 'description', 'problem', 'solution', 'targetMarket')}
+    )
+    
+    response = invoke_llm(business_model_prompt, "generate-business-model")
+    
+    return parse_output("BusinessModelCanvas", response.content, business_model_prompt, "generate-business-model")
 
-# Pydantic models for structured output
-class Symbol(BaseModel):
-    name: str = Field(description="The name of the symbol")
-    meaning: str = Field(description="The symbolic meaning of this element")
-    icon: str = Field(description="An emoji icon representing this symbol")
-
-class Emotion(BaseModel):
-    name: str = Field(description="The name of the emotion")
-    intensity: float = Field(description="Intensity of the emotion (0.0 to 1.0)")
-    color: str = Field(description="Hex color code for the emotion")
-
-class DreamAnalysis(BaseModel):
-    symbols: List[Symbol] = Field(description="List of symbolic elements found in the dream")
-    emotions: List[Emotion] = Field(description="List of emotions detected in the dream")
-    keywords: List[str] = Field(description="Key themes and keywords extracted from the dream")
-    tone: str = Field(description="Overall tone and mood of the dream")
-    themes: List[str] = Field(description="Recurring themes and patterns")
-
-class StartupIdea(BaseModel):
-    name: str = Field(description="Creative and memorable startup name")
-    tagline: str = Field(description="Catchy one-liner describing the startup")
-    description: str = Field(description="Detailed description of the startup concept")
-    problem: str = Field(description="The problem this startup solves")
-    solution: str = Field(description="How the startup solves the problem")
-    targetMarket: str = Field(description="Target market and audience")
-    businessModel: str = Field(description="Business model and revenue strategy")
-    techStack: List[str] = Field(description="Recommended technology stack")
-    monetization: str = Field(description="Monetization strategy")
-    competitiveAdvantage: str = Field(description="Unique competitive advantage")
-
-# Dream Analysis Prompt
-DREAM_ANALYSIS_PROMPT = """
-You are an expert dream analyst and psychologist. Analyze the following dream and provide a comprehensive breakdown that will be used to generate unique startup ideas.
-
-Dream Content: {dream_content}
-Mood: {mood}
-
-Please analyze this dream and extract SPECIFIC, UNIQUE elements:
-
-1. SYMBOLIC ELEMENTS:
-- Identify specific objects, people, places, or actions from the dream
-- Provide detailed meanings for each symbol
-- Focus on symbols that could inspire business concepts
-- Use specific emojis that represent each symbol
-
-2. EMOTIONAL ANALYSIS:
-- Identify the specific emotions felt during the dream
-- Rate intensity (0.0 to 1.0) for each emotion
-- Consider how emotions could relate to business opportunities
-- Use appropriate colors for each emotion
-
-3. KEYWORDS AND THEMES:
-- Extract SPECIFIC words and phrases from the dream content
-- Identify unique themes that could inspire business ideas
-- Look for problems, desires, or opportunities mentioned
-- Focus on actionable keywords that could become business concepts
-
-4. OVERALL TONE:
-- Describe the dream's atmosphere and mood
-- Consider how the tone could influence business direction
-- Identify the emotional journey or transformation
-
-5. BUSINESS-RELEVANT ELEMENTS:
-- Problems or challenges mentioned in the dream
-- Desires, aspirations, or goals expressed
-- Social interactions or community aspects
-- Technology, innovation, or transformation elements
-- Environmental, sustainability, or nature themes
-- Communication, connection, or isolation themes
-- Growth, change, or development patterns
-
-IMPORTANT: Make this analysis SPECIFIC to this dream. Do not use generic interpretations. Extract unique elements that could inspire a one-of-a-kind startup idea. The keywords should be directly from the dream content, and the themes should reflect the dream's unique characteristics.
-
-Focus on elements that could inspire innovative business ideas by looking for:
-- Specific problems the dreamer is trying to solve
-- Unique desires or aspirations expressed
-- Social dynamics or community needs
-- Technology or innovation opportunities
-- Environmental or sustainability concerns
-- Communication or connection challenges
-- Personal growth or transformation themes
-
-Provide a structured analysis that captures the dream's unique essence and could be used to generate a completely original startup concept.
-"""
-
-# Startup Generation Prompt
-STARTUP_GENERATION_PROMPT = """
-You are an expert startup consultant and business strategist. Based on the dream analysis provided, generate a COMPLETELY UNIQUE startup idea that is DIRECTLY INSPIRED by the specific dream content, keywords, and themes.
-
-Dream Analysis:
-Symbols: {symbols}
-Emotions: {emotions}
-Keywords: {keywords}
-Tone: {tone}
-Themes: {themes}
-
-CRITICAL REQUIREMENTS:
-1. The startup idea MUST be directly inspired by the specific keywords and themes from this dream
-2. Use the actual dream symbols and their meanings to create the business concept
-3. Incorporate the emotional tone and intensity from the dream
-4. Create a startup that addresses problems or opportunities suggested by the dream content
-5. Make the startup name and concept unique to this specific dream analysis
-6. Avoid generic business ideas - this must be tailored to the dream's unique elements
-
-ANALYSIS INSTRUCTIONS:
-- Look at the specific keywords: {keywords}
-- Consider the dream's tone: {tone}
-- Use the symbolic meanings: {symbols}
-- Incorporate the emotional themes: {themes}
-- Create a business that reflects the dream's unique characteristics
-
-STARTUP IDEA REQUIREMENTS:
-1. Name: Must be inspired by dream keywords or symbols
-2. Tagline: Should reflect the dream's emotional tone and themes
-3. Problem: Address a real issue suggested by the dream content
-4. Solution: Use dream symbols or themes in the solution approach
-5. Target Market: Based on the dream's social/emotional context
-6. Business Model: Reflect the dream's themes of success/transformation
-7. Technology: Use modern tech that aligns with dream symbols
-8. Monetization: Strategy that fits the dream's themes
-9. Competitive Advantage: Based on unique dream-inspired features
-
-IMPORTANT: Each section must be highly specific and directly related to the dream analysis. Do not use generic business templates. This startup should feel like it was born from this specific dream's unique elements.
-
-Guidelines for each section:
-
-PROBLEM SECTION:
-- Identify a specific problem that relates to the dream's themes and keywords
-- Use the dream's emotional tone to describe the problem
-- Reference specific dream symbols or situations
-- Make it compelling and directly connected to the dream
-- Should be 2-3 detailed paragraphs
-
-SOLUTION SECTION:
-- Explain how the solution incorporates dream symbols or themes
-- Use the dream's keywords in describing the approach
-- Describe features that reflect the dream's emotional journey
-- Explain how the technology or method relates to dream elements
-- Should be 2-3 detailed paragraphs
-
-TARGET MARKET SECTION:
-- Define audience based on the dream's social/emotional context
-- Use dream themes to identify market characteristics
-- Describe how the dream's tone relates to market needs
-- Explain why this market connects to the dream's symbols
-- Should be 2-3 detailed paragraphs
-
-BUSINESS MODEL SECTION:
-- Create revenue strategy that reflects dream themes of success
-- Use dream symbols to inspire pricing or delivery models
-- Include operational elements that mirror dream patterns
-- Explain growth potential based on dream's transformative themes
-- Should be 2-3 detailed paragraphs
-
-Make the startup idea creative, innovative, and PRACTICALLY IMPLEMENTABLE. The name should be memorable and directly inspired by the dream. Each section should be comprehensive and SPECIFIC to this dream's unique elements.
-"""
+def run_mockup(startup_idea):
+    """Call the LLM to describe an app mockup for a startup idea"""
+    mockup_prompt = render_prompt(
+        "mockup",
+        **{field: startup_idea.get(field, '') for field in ('name', 'description', 'targetMarket')}
+    )
+    
+    response = invoke_llm(mockup_prompt, "generate-mockup")
+    
+    # Create mockup response
+    return {
+        "id": "mockup-1",
+        "imageUrl": "https://via.placeholder.com/400x800/667eea/ffffff?text=App+Mockup",
+        "description": response.content,
+        "createdAt": "2024-01-01T00:00:00Z"
+    }
+
+def run_section(startup_idea, section):
+    """Call the LLM to rewrite one section; only that section's prompt is built"""
+    prompt = render_prompt(
+        section_prompt_name(section),
+        **{field: startup_idea.get(field, '') for field in SECTION_FIELDS[section]}
+    )
+    return invoke_llm(prompt, "regenerate-section").content.strip()
+
+def regenerate_sections(startup_idea, sections, bypass=False):
+    """Generator yielding (section, text, cache_status) as each section completes
+
+    Results are cached per section under the fields its prompt uses plus the
+    section's current text, so identical requests share a result while
+    regenerating an already regenerated section produces a new version.
+    """
+    def regenerate(section):
+        payload = {
+            "startupIdea": {field: startup_idea.get(field, '') for field in SECTION_FIELDS[section]},
+            "section": section,
+            "current": startup_idea.get(section, '')
+        }
+        value, cache_status = cached_compute(
+            "regenerate-section",
+            payload,
+            prompt_version(section_prompt_name(section)),
+            lambda: run_section(startup_idea, section),
+            bypass=bypass
+        )
+        return (section, value, cache_status)
+    
+    if len(sections) == 1:
+        yield regenerate(sections[0])
+        return
+    futures = [submit_in_context(pipeline_executor, regenerate, section) for section in sections]
+    for future in as_completed(futures):
+        yield future.result()
+
+def coalesce(key, compute):
+    """Run compute through the single-flight coalescer, counting shared results"""
+    result, role = coalescer.do(key, compute)
+    if role != LEADER:
+        metrics.COALESCED.inc(route=metrics.current_route.get(), scope=role)
+    return result
+
+def coalesced_call(namespace, payload, compute):
+    """Share one upstream call between concurrent identical requests of an uncached endpoint"""
+    return coalesce(make_cache_key(namespace, payload, model_router.profile(namespace).cache_id, "coalesce"), compute)
+
+def cached_compute(namespace, payload, prompt_version, compute, bypass=False):
+    """Serve a result from the response cache, or compute and store it
+
+    The namespace is also the task routed to a model profile, whose settings
+    are part of the key. Misses for the same key that overlap in time share one
+    compute call. While the upstream's circuit breaker is open, an expired
+    entry is served instead if one is still kept. Returns (result,
+    cache_status) where cache_status is HIT, MISS, BYPASS or STALE.
+    """
+    key = make_cache_key(namespace, payload, model_router.profile(namespace).cache_id, prompt_version)
+    if bypass:
+        response_cache.record_bypass()
+    else:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached, "HIT"
+    
+    def compute_and_store():
+        result = compute()
+        response_cache.set(key, result)
+        return result
+    
+    try:
+        result = coalesce(key, compute_and_store)
+    except CircuitOpen:
+        stale = None if bypass else response_cache.get_stale(key)
+        if stale is None:
+            raise
+        logger.warning(f"Serving a stale {namespace} result while the upstream is unavailable")
+        return stale, "STALE"
+    return result, "BYPASS" if bypass else "MISS"
+
+def cached_call(namespace, payload, prompt_version, compute):
+    """cached_compute honouring the current request's cache bypass headers"""
+    return cached_compute(namespace, payload, prompt_version, compute, bypass=should_bypass(request.headers))
+
+def analyze_job(payload):
+    dream_content = payload.get('content', '')
+    mood = payload.get('mood', 'neutral')
+    if not isinstance(dream_content, str):
+        raise ValueError("content must be a string")
+    if not dream_content:
+        raise ValueError("Dream content is required")
+    if dream_size_error(dream_content):
+        raise ValueError(dream_size_error(dream_content))
+    return lambda: cached_compute(
+        "analyze-dream",
+        {"content": dream_content, "mood": mood},
+        DREAM_ANALYSIS_PROMPT_VERSION,
+        lambda: analyze_with_similarity(dream_content, mood)
+    )[0]
+
+def startup_job(payload):
+    fields = {field: payload.get(field, default) for field, default in
+              (('symbols', []), ('emotions', []), ('keywords', []), ('tone', ''), ('themes', []))}
+    if not fields['symbols'] and not fields['emotions'] and not fields['keywords']:
+        raise ValueError("Dream analysis data is required")
+    return lambda: cached_compute(
+        "generate-startup",
+        fields,
+        STARTUP_GENERATION_PROMPT_VERSION,
+        lambda: run_startup_generation(**fields)
+    )[0]
+
+def business_model_job(payload):
+    startup_idea = payload.get('startupIdea', {})
+    if not startup_idea:
+        raise ValueError("Startup idea is required")
+    return lambda: coalesced_call("generate-business-model", startup_idea, lambda: run_business_model(startup_idea))
+
+def mockup_job(payload):
+    startup_idea = payload.get('startupIdea', {})
+    if not startup_idea:
+        raise ValueError("Startup idea is required")
+    return lambda: coalesced_call("generate-mockup", startup_idea, lambda: run_mockup(startup_idea))
+
+def section_job(payload):
+    startup_idea = payload.get('startupIdea', {})
+    sections = payload.get('sections') or ([payload['section']] if payload.get('section') else [])
+    if not startup_idea or not sections:
+        raise ValueError("Startup idea and section are required")
+    if not isinstance(sections, list) or not all(isinstance(section, str) for section in sections):
+        raise ValueError("sections must be a list of strings")
+    sections = list(dict.fromkeys(sections))
+    invalid = [section for section in sections if section not in SECTION_FIELDS]
+    if invalid:
+        raise ValueError(f"Invalid section: {invalid[0]}")
+    
+    def run():
+        regenerated = {section: value for section, value, _ in regenerate_sections(startup_idea, sections)}
+        return {section: regenerated[section] for section in sections}
+    return run
+
+# Job types accepted by POST /jobs: each validates a payload (raising
+# ValueError) and returns the function that produces the result
+JOB_TYPES = {
+    'analyze': analyze_job,
+    'startup': startup_job,
+    'business-model': business_model_job,
+    'mockup': mockup_job,
+    'regenerate-section': section_job,
+}
+
+def run_job(job_type, payload):
+    """Execute a stored job on a job worker thread, labelled as its own route in metrics"""
+    token = metrics.current_route.set(f"job:{job_type}")
+    tier_token = requested_tier.set(payload.get('tier'))
+    client_token = current_client.set(payload.get('client', 'unknown'))
+    try:
+        return JOB_TYPES[job_type](payload)()
+    finally:
+        current_client.reset(client_token)
+        requested_tier.reset(tier_token)
+        metrics.current_route.reset(token)
+
+def record_job(job_type, status, queued_seconds, run_seconds):
+    metrics.JOBS_FINISHED.inc(type=job_type, status=status)
+    metrics.JOB_DURATION.observe(queued_seconds, type=job_type, phase="queued")
+    metrics.JOB_DURATION.observe(run_seconds, type=job_type, phase="run")
+
+def run_pipeline(dream_content, mood, bypass_cache=False):
+    """Generator yielding (stage, result, elapsed_ms) for the full dream-to-startup flow
+
+    Analysis and startup generation run sequentially (each depends on the
+    previous stage). Business model and mockup only need the startup idea, so
+    they run concurrently and are yielded in completion order. A final
+    ("total", None, elapsed_ms) tuple closes the pipeline.
+    """
+    pipeline_start = time.perf_counter()
+    
+    def elapsed_since(start):
+        return round((time.perf_counter() - start) * 1000, 1)
+    
+    stage_start = time.perf_counter()
+    analysis, _ = cached_compute(
+        "analyze-dream",
+        {"content": dream_content, "mood": mood},
+        DREAM_ANALYSIS_PROMPT_VERSION,
+        lambda: analyze_with_similarity(dream_content, mood),
+        bypass=bypass_cache
+    )
+    yield "analysis", analysis, elapsed_since(stage_start)
+    
+    stage_start = time.perf_counter()
+    startup, _ = cached_compute(
+        "generate-startup",
+        analysis,
+        STARTUP_GENERATION_PROMPT_VERSION,
+        lambda: run_startup_generation(
+            analysis["symbols"], analysis["emotions"], analysis["keywords"], analysis["tone"], analysis["themes"]
+        ),
+        bypass=bypass_cache
+    )
+    yield "startupIdea", startup, elapsed_since(stage_start)
+    
+    # Fan out the stages that only depend on the startup idea
+    stage_start = time.perf_counter()
+    futures = {
+        submit_in_context(pipeline_executor, coalesced_call, "generate-business-model", startup,
+                          lambda: run_business_model(startup)): "businessModel",
+        submit_in_context(pipeline_executor, coalesced_call, "generate-mockup", startup,
+                          lambda: run_mockup(startup)): "mockup",
+    }
+    for future in as_completed(futures):
+        yield futures[future], future.result(), elapsed_since(stage_start)
+    
+    yield "total", None, elapsed_since(pipeline_start)
+
+def stream_structured(namespace, payload, prompt_version, prompt, schema_name, compute=None):
+    """Stream LLM tokens and yield an SSE event per completed top-level field
+
+    Ends with a `complete` event carrying the validated object, which is also
+    written to the response cache. Cache hits replay the stored fields at once.
+    With `compute` the result is computed without streaming and then replayed.
+    """
+    key = make_cache_key(namespace, payload, model_router.profile(namespace).cache_id, prompt_version)
+    bypass = should_bypass(request.headers)
+    if bypass:
+        response_cache.record_bypass()
+    cached = None if bypass else response_cache.get(key)
+    
+    def replay(result):
+        for field, value in result.items():
+            yield sse_event("field", {"field": field, "value": value})
+        yield sse_event("complete", result)
+    
+    def generate():
+        # Flush headers immediately so the client sees the stream open
+        yield ": stream open\n\n"
+        if cached is not None:
+            yield from replay(cached)
+            return
+        try:
+            if compute is not None:
+                result, _ = cached_compute(namespace, payload, prompt_version, compute, bypass=bypass)
+                yield from replay(result)
+                return
+            field_parser = IncrementalObjectParser()
+            chunks = []
+            for chunk in stream_llm(prompt, namespace):
+                chunks.append(chunk.content)
+                for field, value in field_parser.feed(chunk.content):
+                    yield sse_event("field", {"field": field, "value": value})
+            if field_parser.failed:
+                logger.warning(f"Streamed {namespace} output is not valid JSON; repairing it before completing")
+            
+            # Validate the full output against the schema
+            result = parse_output(schema_name, "".join(chunks), prompt, namespace)
+            response_cache.set(key, result)
+            yield sse_event("complete", result)
+        except CircuitOpen as e:
+            stale = None if bypass else response_cache.get_stale(key)
+            if stale is not None:
+                logger.warning(f"Replaying a stale {namespace} result while the upstream is unavailable")
+                yield from replay(stale)
+                return
+            logger.error(f"Error streaming {namespace}: {str(e)}")
+            yield sse_event("error", {"error": f"Failed to stream {namespace}", "details": str(e),
+                                      "retryAfter": e.retry_after})
+        except Exception as e:
+            logger.error(f"Error streaming {namespace}: {str(e)}")
+            yield sse_event("error", {"error": f"Failed to stream {namespace}", "details": str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        **SSE_HEADERS,
+        'X-Cache': "HIT" if cached is not None else ("BYPASS" if bypass else "MISS")
+    })
+
+def bearer_key_error(key, feature, variable):
+    """Error response unless the request carries `Authorization: Bearer <key>`; None when it does
+
+    An unset key disables the feature (403) rather than leaving it open.
+    """
+    if not key:
+        return jsonify({"error": f"{feature} is disabled; set {variable} to enable it"}), 403
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied.encode("utf-8"), key.encode("utf-8")):
+        return jsonify({"error": f"A valid {feature.lower()} key is required"}), 401
+    return None
+
+def error_response(message, e):
+    """JSON error for a failed LLM-backed request
+
+    503 with Retry-After while the upstream's circuit breaker is open, so
+    clients back off instead of retrying at once; 500 otherwise. A body over
+    MAX_REQUEST_BYTES is re-raised for the 413 handler.
+    """
+    if isinstance(e, RequestEntityTooLarge):
+        raise e
+    if isinstance(e, CircuitOpen):
+        response = jsonify({"error": message, "details": str(e), "retryAfter": e.retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return jsonify({"error": message, "details": str(e)}), 500
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """JSON 413 for bodies over MAX_REQUEST_BYTES"""
+    return jsonify({"error": f"Request body exceeds {MAX_REQUEST_BYTES} bytes"}), 413
+
+@app.before_request
+def start_request_metrics():
+    """Assign a request ID and start per-request timing"""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    g.route_label = request.url_rule.rule if request.url_rule else "unmatched"
+    g.stage_timings = []
+    g.metric_tokens = (
+        metrics.current_route.set(g.route_label),
+        metrics.current_timings.set(g.stage_timings)
+    )
+    metrics.REQUESTS_IN_FLIGHT.inc(route=g.route_label)
+
+@app.before_request
+def select_model_tier():
+    """Apply a model tier requested with X-Model-Tier (or ?tier=) to every LLM call of the request"""
+    tier = request.headers.get('X-Model-Tier') or request.args.get('tier')
+    if not tier:
+        return None
+    try:
+        g.tier_token = requested_tier.set(model_router.check_tier(tier.lower()))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.before_request
+def meter_request():
+    """Identify the client for token metering and turn it away once it has used up its quota"""
+    g.client = client_id(request.headers, request.remote_addr, ADMISSION_TRUST_FORWARDED, ADMISSION_API_KEYS)
+    g.client_token = current_client.set(g.client)
+    if request.method == 'OPTIONS' or g.route_label not in admission.routes:
+        return None
+    try:
+        meter.check_quota(g.client)
+    except QuotaExceeded as e:
+        metrics.ADMISSION_REJECTIONS.inc(route=g.route_label, reason="quota_exceeded")
+        logger.warning(f"Rejected {g.route_label} for {g.client}: token quota used up (retry after {e.retry_after}s)")
+        response = jsonify({
+            "error": "Token quota exceeded",
+            "reason": "quota_exceeded",
+            "used": e.used,
+            "quota": e.quota,
+            "retryAfter": e.retry_after
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+@app.before_request
+def admit_request():
+    """Rate-limit LLM-backed routes per client and queue them behind the concurrency gate"""
+    if request.method == 'OPTIONS' or not admission.applies_to(g.route_label):
+        return None
+    client = g.client
+    try:
+        with metrics.stage("queue"):
+            admission.admit(client, g.route_label)
+    except Rejected as e:
+        metrics.ADMISSION_REJECTIONS.inc(route=g.route_label, reason=e.reason)
+        logger.warning(f"Rejected {g.route_label} for {client}: {e.reason} (retry after {e.retry_after}s)")
+        response = jsonify({
+            "error": "Too many requests" if e.status == 429 else "Server is busy, try again later",
+            "reason": e.reason,
+            "retryAfter": e.retry_after
+        })
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    g.admitted_at = time.perf_counter()
+
+@app.after_request
+def finish_request_metrics(response):
+    """Record request latency, attach the request ID and optionally log stage timings"""
+    elapsed = time.perf_counter() - g.request_started
+    metrics.REQUEST_DURATION.observe(elapsed, route=g.route_label, method=request.method, status=str(response.status_code))
+    response.headers['X-Request-ID'] = g.request_id
+    if REQUEST_TIMING_LOGS:
+        logger.info(json.dumps({
+            "requestId": g.request_id,
+            "route": g.route_label,
+            "method": request.method,
+            "status": response.status_code,
+            "durationMs": round(elapsed * 1000, 2),
+            "stagesMs": metrics.summarize_timings(g.stage_timings)
+        }))
+    return response
+
+# Registered after finish_request_metrics so it runs first and the metrics see 304s
+@app.after_request
+def encode_response(response):
+    """Attach a strong ETag, answer matching If-None-Match with 304 and compress large bodies"""
+    with metrics.stage("encode"):
+        return response_layer.finish(request, response)
+
+@app.teardown_request
+def end_request_metrics(exc=None):
+    """Release the in-flight gauge even when the request failed"""
+    admitted_at = g.pop('admitted_at', None)
+    if admitted_at is not None:
+        admission.release(g.route_label, time.perf_counter() - admitted_at)
+    tier_token = g.pop('tier_token', None)
+    if tier_token is not None:
+        requested_tier.reset(tier_token)
+    client_token = g.pop('client_token', None)
+    if client_token is not None:
+        current_client.reset(client_token)
+    if 'metric_tokens' not in g:
+        return
+    metrics.REQUESTS_IN_FLIGHT.dec(route=g.route_label)
+    route_token, timings_token = g.pop('metric_tokens')
+    metrics.current_route.reset(route_token)
+    metrics.current_timings.reset(timings_token)
+
+def cache_metrics():
+    """Expose response cache counters in Prometheus format"""
+    stats = response_cache.stats()
+    lines = ["# HELP response_cache_events_total Response cache lookups by outcome",
+             "# TYPE response_cache_events_total counter"]
+    for outcome in ("memory_hits", "disk_hits", "stale_hits", "misses", "bypasses", "stores"):
+        lines.append(f'response_cache_events_total{{outcome="{outcome}"}} {stats[outcome]}')
+    return lines
+
+metrics.registry.register_collector(cache_metrics)
+
+def coalescing_metrics():
+    """Expose how many identical calls are currently running"""
+    return ["# HELP llm_singleflight_in_flight Distinct coalesced calls currently running",
+            "# TYPE llm_singleflight_in_flight gauge",
+            f"llm_singleflight_in_flight {coalescer.in_flight()}"]
+
+metrics.registry.register_collector(coalescing_metrics)
+
+def similarity_metrics():
+    """Expose the near-duplicate dream index size once it has been built"""
+    if dream_index is None:
+        return []
+    stats = dream_index.stats()
+    return ["# HELP dream_index_entries Dreams stored in the near-duplicate index",
+            "# TYPE dream_index_entries gauge",
+            f"dream_index_entries {stats['entries']}",
+            "# HELP dream_index_bytes Memory held by the index vectors",
+            "# TYPE dream_index_bytes gauge",
+            f"dream_index_bytes {stats['bytes']}"]
+
+metrics.registry.register_collector(similarity_metrics)
+
+def admission_metrics():
+    """Expose concurrency gate occupancy and queue depth"""
+    if not admission.enabled:
+        return []
+    stats = admission.gate.stats()
+    return ["# HELP admission_gate_units_in_use Concurrency gate units held by running requests",
+            "# TYPE admission_gate_units_in_use gauge",
+            f"admission_gate_units_in_use {stats['inUse']}",
+            "# HELP admission_gate_capacity Concurrency gate capacity",
+            "# TYPE admission_gate_capacity gauge",
+            f"admission_gate_capacity {stats['capacity']}",
+            "# HELP admission_queue_depth Requests waiting for the concurrency gate",
+            "# TYPE admission_queue_depth gauge",
+            f"admission_queue_depth {stats['queued']}"]
+
+metrics.registry.register_collector(admission_metrics)
+
+def job_metrics():
+    """Expose jobs waiting for and holding a job worker in this process"""
+    if job_runner is None:
+        return []
+    active = job_runner.active()
+    return ["# HELP jobs_active Jobs accepted by this worker and not yet finished",
+            "# TYPE jobs_active gauge",
+            f'jobs_active{{state="queued"}} {active["queued"]}',
+            f'jobs_active{{state="running"}} {active["running"]}']
+
+metrics.registry.register_collector(job_metrics)
+
+def resilience_metrics():
+    """Expose each model profile's circuit breaker state and current hedge delay"""
+    lines = ["# HELP llm_circuit_state Circuit breaker state per model profile (1 for the current state)",
+             "# TYPE llm_circuit_state gauge"]
+    hedge_lines = ["# HELP llm_hedge_delay_seconds Latency after which a call is hedged",
+                   "# TYPE llm_hedge_delay_seconds gauge"]
+    for profile, stats in resilience.stats().items():
+        for state in ("closed", "half_open", "open"):
+            lines.append(f'llm_circuit_state{{profile="{profile}",state="{state}"}} '
+                         f'{1 if stats["breaker"]["state"] == state else 0}')
+        if stats["hedgeDelayMs"] is not None:
+            hedge_lines.append(f'llm_hedge_delay_seconds{{profile="{profile}"}} {stats["hedgeDelayMs"] / 1000}')
+    return lines + hedge_lines
+
+metrics.registry.register_collector(resilience_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics endpoint"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness check: answers without touching LangChain or the LLM client"""
     return jsonify({"status": "healthy", "message": "Dream to Startup Generator API is running"})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: 200 once the LLM client and prompt templates are warmed, 503 before"""
+    warm_up.start()
+    status = warm_up.status()
+    if warm_up.ready:
+        return jsonify({"status": "ready", "models": {tier: profile.model for tier, profile in model_router.profiles.items()},
+                        "warmUp": status,
+                        "prompts": get_prompt_registry().summary()})
+    return jsonify({"status": status["state"], "warmUp": status}), 503
+
+@app.route('/models', methods=['GET'])
+def model_profiles():
+    """Model profile per tier and the default tier per task, with each profile's
+    calls, latency and tokens and its circuit breaker, retry and hedge state"""
+    summary = model_router.summary()
+    upstreams = resilience.stats()
+    for tier, profile in summary["profiles"].items():
+        profile["resilience"] = upstreams.get(tier)
+    return jsonify(summary)
+
+@app.route('/usage', methods=['GET'])
+def usage_report():
+    """Token usage and cost per client, route and model over a time window
+
+    Requires `Authorization: Bearer <USAGE_API_KEY>`. Query parameters:
+    `window` in seconds (default: one day), `interval` for a time series,
+    `client` and `route` to filter, `limit` on the clients and routes listed.
+    """
+    denied = bearer_key_error(USAGE_API_KEY, "Usage report", "USAGE_API_KEY")
+    if denied:
+        return denied
+    try:
+        window = float(request.args.get('window', 86400))
+        interval = float(request.args['interval']) if 'interval' in request.args else None
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"error": "window, interval and limit must be numbers"}), 400
+    if window <= 0 or (interval is not None and interval <= 0) or limit < 1:
+        return jsonify({"error": "window, interval and limit must be positive"}), 400
+    return jsonify(meter.usage(window, client=request.args.get('client'), route=request.args.get('route'),
+                               interval=interval, limit=limit))
+
+@app.route('/usage/me', methods=['GET'])
+def my_usage():
+    """The calling client's own token usage over the quota window (default: one day), and its quota"""
+    window = meter.quota_window if meter.quota_tokens else 86400
+    report = meter.usage(window, client=g.client)
+    return jsonify({"client": g.client, "total": report["total"], "routes": report["routes"],
+                    "quota": meter.quota(g.client)})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache hit/miss counters"""
+    return jsonify(response_cache.stats())
+
 @app.route('/analyze-dream', methods=['POST'])
 def analyze_dream():
     """Analyze a dream and extract symbolic elements, emotions, and themes"""
     try:
         data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
         dream_content = data.get('content', '')
         mood = data.get('mood', 'neutral')
         
+        if not isinstance(dream_content, str):
+            return jsonify({"error": "content must be a string"}), 400
         if not dream_content:
             return jsonify({"error": "Dream content is required"}), 400
+        if dream_size_error(dream_content):
+            return jsonify({"error": dream_size_error(dream_content)}), 413
         
         logger.info(f"Analyzing dream with mood: {mood}")
         
-        # Create prompt template
-        prompt_template = ChatPromptTemplate.from_template(DREAM_ANALYSIS_PROMPT)
-        
-        # Create parser
-        parser = PydanticOutputParser(pydantic_object=DreamAnalysis)
-        
-        # Format prompt
-        prompt = prompt_template.format_messages(
-            dream_content=dream_content,
-            mood=mood
+        result, cache_status = cached_call(
+            "analyze-dream",
+            {"content": dream_content, "mood": mood},
+            DREAM_ANALYSIS_PROMPT_VERSION,
+            lambda: analyze_with_similarity(dream_content, mood)
         )
         
-        # Get response from OpenAI
-        response = llm.invoke(prompt)
-        
-        # Parse the response
-        analysis = parser.parse(response.content)
-        
-        # Convert to dict for JSON response
-        result = {
-            "symbols": [symbol.dict() for symbol in analysis.symbols],
-            "emotions": [emotion.dict() for emotion in analysis.emotions],
-            "keywords": analysis.keywords,
-            "tone": analysis.tone,
-            "themes": analysis.themes
-        }
-        
-        logger.info("Dream analysis completed successfully")
-        return jsonify(result)
+        logger.info(f"Dream analysis completed successfully (cache: {cache_status})")
+        response = jsonify(result)
+        response.headers['X-Cache'] = cache_status
+        return response
         
     except Exception as e:
         logger.error(f"Error analyzing dream: {str(e)}")
-        return jsonify({"error": "Failed to analyze dream", "details": str(e)}), 500
+        return error_response("Failed to analyze dream", e)
 
 @app.route('/generate-startup', methods=['POST'])
 def generate_startup():
@@ -254,50 +1137,80 @@ def generate_startup():
         
         logger.info("Generating startup idea from dream analysis")
         
-        # Create prompt template
-        prompt_template = ChatPromptTemplate.from_template(STARTUP_GENERATION_PROMPT)
-        
-        # Create parser
-        parser = PydanticOutputParser(pydantic_object=StartupIdea)
-        
-        # Format prompt
-        prompt = prompt_template.format_messages(
-            symbols=json.dumps(symbols, indent=2),
-            emotions=json.dumps(emotions, indent=2),
-            keywords=json.dumps(keywords, indent=2),
-            tone=tone,
-            themes=json.dumps(themes, indent=2)
+        result, cache_status = cached_call(
+            "generate-startup",
+            {"symbols": symbols, "emotions": emotions, "keywords": keywords, "tone": tone, "themes": themes},
+            STARTUP_GENERATION_PROMPT_VERSION,
+            lambda: run_startup_generation(symbols, emotions, keywords, tone, themes)
         )
         
-        # Add specific instruction to ensure uniqueness
-        additional_instruction = f"""
-        CRITICAL: This startup idea must be COMPLETELY UNIQUE and directly inspired by the dream analysis above. 
-        Use the specific keywords: {keywords}
-        Use the dream's tone: {tone}
-        Use the symbolic meanings: {symbols}
-        Use the emotional themes: {themes}
-        
-        Do NOT generate a generic business idea. This must be a one-of-a-kind concept that could only come from this specific dream analysis.
-        """
-        
-        # Combine the prompt with additional instruction
-        final_prompt = prompt + [{"role": "user", "content": additional_instruction}]
-        
-        # Get response from OpenAI
-        response = llm.invoke(final_prompt)
-        
-        # Parse the response
-        startup = parser.parse(response.content)
-        
-        # Convert to dict for JSON response
-        result = startup.dict()
-        
-        logger.info("Startup generation completed successfully")
-        return jsonify(result)
+        logger.info(f"Startup generation completed successfully (cache: {cache_status})")
+        response = jsonify(result)
+        response.headers['X-Cache'] = cache_status
+        return response
         
     except Exception as e:
         logger.error(f"Error generating startup: {str(e)}")
-        return jsonify({"error": "Failed to generate startup idea", "details": str(e)}), 500
+        return error_response("Failed to generate startup idea", e)
+
+@app.route('/analyze-dream/stream', methods=['POST'])
+def analyze_dream_stream():
+    """Stream a dream analysis as Server-Sent Events, one event per completed field"""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    dream_content = data.get('content', '')
+    mood = data.get('mood', 'neutral')
+    
+    if not isinstance(dream_content, str):
+        return jsonify({"error": "content must be a string"}), 400
+    if not dream_content:
+        return jsonify({"error": "Dream content is required"}), 400
+    if dream_size_error(dream_content):
+        return jsonify({"error": dream_size_error(dream_content)}), 413
+    
+    logger.info(f"Streaming dream analysis with mood: {mood}")
+    if is_long_dream(dream_content):
+        # Chunked analyses have no single token stream; the merged result is sent as field events
+        return stream_structured(
+            "analyze-dream",
+            {"content": dream_content, "mood": mood},
+            DREAM_ANALYSIS_PROMPT_VERSION,
+            None,
+            "DreamAnalysis",
+            compute=lambda: analyze_with_similarity(dream_content, mood)
+        )
+    return stream_structured(
+        "analyze-dream",
+        {"content": dream_content, "mood": mood},
+        DREAM_ANALYSIS_PROMPT_VERSION,
+        build_dream_analysis_prompt(dream_content, mood),
+        "DreamAnalysis"
+    )
+
+@app.route('/generate-startup/stream', methods=['POST'])
+def generate_startup_stream():
+    """Stream a startup idea as Server-Sent Events, one event per completed field"""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    symbols = data.get('symbols', [])
+    emotions = data.get('emotions', [])
+    keywords = data.get('keywords', [])
+    tone = data.get('tone', '')
+    themes = data.get('themes', [])
+    
+    if not symbols and not emotions and not keywords:
+        return jsonify({"error": "Dream analysis data is required"}), 400
+    
+    logger.info("Streaming startup idea from dream analysis")
+    return stream_structured(
+        "generate-startup",
+        {"symbols": symbols, "emotions": emotions, "keywords": keywords, "tone": tone, "themes": themes},
+        STARTUP_GENERATION_PROMPT_VERSION,
+        build_startup_prompt(symbols, emotions, keywords, tone, themes),
+        "StartupIdea"
+    )
 
 @app.route('/generate-business-model', methods=['POST'])
 def generate_business_model():
@@ -311,55 +1224,14 @@ def generate_business_model():
         
         logger.info("Generating business model canvas")
         
-        # Business model generation prompt
-        business_model_prompt = f"""
-        Based on the following startup idea, create a comprehensive business model canvas:
-        
-        Startup: {startup_idea.get('name', '')}
-        Description: {startup_idea.get('description', '')}
-        Problem: {startup_idea.get('problem', '')}
-        Solution: {startup_idea.get('solution', '')}
-        Target Market: {startup_idea.get('targetMarket', '')}
-        
-        Please provide a business model canvas with the following sections:
-        1. Key Partners
-        2. Key Activities
-        3. Key Resources
-        4. Value Propositions
-        5. Customer Relationships
-        6. Channels
-        7. Customer Segments
-        8. Cost Structure
-        9. Revenue Streams
-        
-        Return as JSON format.
-        """
-        
-        response = llm.invoke(business_model_prompt)
-        
-        # Try to parse JSON from response
-        try:
-            business_model = json.loads(response.content)
-        except:
-            # If JSON parsing fails, create a structured response
-            business_model = {
-                "keyPartners": ["AI Technology Providers", "Business Consultants"],
-                "keyActivities": ["Product Development", "Market Research"],
-                "keyResources": ["Technology Platform", "Expert Team"],
-                "valuePropositions": ["Innovative Solution", "Cost Effective"],
-                "customerRelationships": ["Personal Support", "Community"],
-                "channels": ["Web Platform", "Mobile App"],
-                "customerSegments": ["Entrepreneurs", "Small Businesses"],
-                "costStructure": ["Development", "Marketing", "Operations"],
-                "revenueStreams": ["Subscription", "Consulting", "Licensing"]
-            }
+        business_model = coalesced_call("generate-business-model", startup_idea, lambda: run_business_model(startup_idea))
         
         logger.info("Business model generation completed successfully")
         return jsonify(business_model)
         
     except Exception as e:
         logger.error(f"Error generating business model: {str(e)}")
-        return jsonify({"error": "Failed to generate business model", "details": str(e)}), 500
+        return error_response("Failed to generate business model", e)
 
 @app.route('/generate-mockup', methods=['POST'])
 def generate_mockup():
@@ -373,148 +1245,432 @@ def generate_mockup():
         
         logger.info("Generating app mockup description")
         
-        # Mockup generation prompt
-        mockup_prompt = f"""
-        Based on the startup idea, describe what the app interface should look like:
+        mockup = coalesced_call("generate-mockup", startup_idea, lambda: run_mockup(startup_idea))
         
-        Startup: {startup_idea.get('name', '')}
-        Description: {startup_idea.get('description', '')}
-        Target Market: {startup_idea.get('targetMarket', '')}
+        logger.info("Mockup generation completed successfully")
+        return jsonify(mockup)
         
-        Describe the main screens and UI elements for this app.
-        """
+    except Exception as e:
+        logger.error(f"Error generating mockup: {str(e)}")
+        return error_response("Failed to generate mockup", e)
+
+@app.route('/dream-to-startup', methods=['POST'])
+def dream_to_startup():
+    """Run the full pipeline: analysis, startup idea, then business model and mockup in parallel
+
+    Send `"stream": true` (or `?stream=1`) to receive each stage as an SSE event.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    dream_content = data.get('content', '')
+    mood = data.get('mood', 'neutral')
+    
+    if not isinstance(dream_content, str):
+        return jsonify({"error": "content must be a string"}), 400
+    if not dream_content:
+        return jsonify({"error": "Dream content is required"}), 400
+    if dream_size_error(dream_content):
+        return jsonify({"error": dream_size_error(dream_content)}), 413
+    
+    logger.info(f"Running dream-to-startup pipeline with mood: {mood}")
+    stages = run_pipeline(dream_content, mood, bypass_cache=should_bypass(request.headers))
+    
+    if data.get('stream') or request.args.get('stream') in ('1', 'true'):
+        def generate():
+            try:
+                for stage, value, elapsed_ms in stages:
+                    yield sse_event("stage", {"stage": stage, "result": value, "elapsedMs": elapsed_ms})
+                yield sse_event("complete", {"status": "ok"})
+            except Exception as e:
+                logger.error(f"Error in dream-to-startup pipeline: {str(e)}")
+                yield sse_event("error", {"error": "Failed to run pipeline", "details": str(e)})
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    
+    try:
+        result = {}
+        timings = {}
+        for stage, value, elapsed_ms in stages:
+            if value is not None:
+                result[stage] = value
+            timings[stage] = elapsed_ms
+        result["timings"] = timings
         
-        response = llm.invoke(mockup_prompt)
+        logger.info(f"Dream-to-startup pipeline completed successfully in {timings['total']}ms")
+        return jsonify(result)
         
-        # Create mockup response
-        mockup = {
-            "id": "mockup-1",
-            "imageUrl": "https://via.placeholder.com/400x800/667eea/ffffff?text=App+Mockup",
-            "description": response.content,
-            "createdAt": "2024-01-01T00:00:00Z"
-        }
+    except Exception as e:
+        logger.error(f"Error in dream-to-startup pipeline: {str(e)}")
+        return error_response("Failed to run pipeline", e)
+
+def batch_response(data, key_fn, worker_fn, label):
+    """Run a batch request body through run_batch as JSON or NDJSON
+
+    Results are returned in input order as JSON, or streamed one line per item
+    in completion order when `"stream": true` / `?stream=1` is set.
+    """
+    items = data.get('items', [])
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty items list is required"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Batch size exceeds limit of {BATCH_MAX_ITEMS} items"}), 400
+    
+    concurrency = data.get('concurrency', BATCH_MAX_CONCURRENCY)
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+        return jsonify({"error": "concurrency must be a positive integer"}), 400
+    concurrency = min(concurrency, BATCH_MAX_CONCURRENCY)
+    stats = BatchStats(len(items))
+    
+    # Run each item in a copy of the request's metrics context
+    request_context = contextvars.copy_context()
+    def contextual_worker(item):
+        return request_context.copy().run(worker_fn, item)
+    
+    results = run_batch(items, key_fn, contextual_worker, concurrency, stats)
+    logger.info(f"Running {label} batch of {len(items)} items with concurrency {concurrency}")
+    
+    if data.get('stream') or request.args.get('stream') in ('1', 'true'):
+        def generate():
+            for index, result, error in results:
+                line = {"index": index, "error": error} if error else {"index": index, "result": result}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            yield json.dumps({"stats": stats.as_dict()}) + "\n"
+            logger.info(f"{label} batch completed: {stats.as_dict()}")
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    ordered = [None] * len(items)
+    for index, result, error in results:
+        ordered[index] = {"error": error} if error else {"result": result}
+    logger.info(f"{label} batch completed: {stats.as_dict()}")
+    return jsonify({"results": ordered, "stats": stats.as_dict()})
+
+@app.route('/analyze-dreams/batch', methods=['POST'])
+def analyze_dreams_batch():
+    """Analyze many dreams in one request with deduplication and bounded concurrency"""
+    try:
+        data = request.get_json()
+        bypass = should_bypass(request.headers)
         
-        logger.info("Mockup generation completed successfully")
-        return jsonify(mockup)
+        def key_fn(item):
+            if not isinstance(item, dict) or not item.get('content'):
+                raise ValueError("Dream content is required")
+            if dream_size_error(item['content']):
+                raise ValueError(dream_size_error(item['content']))
+            return make_cache_key("analyze-dream", {"content": item['content'], "mood": item.get('mood', 'neutral')},
+                                  model_router.profile("analyze-dream").cache_id, DREAM_ANALYSIS_PROMPT_VERSION)
+        
+        def worker_fn(item):
+            content, mood = item['content'], item.get('mood', 'neutral')
+            result, _ = cached_compute(
+                "analyze-dream",
+                {"content": content, "mood": mood},
+                DREAM_ANALYSIS_PROMPT_VERSION,
+                lambda: analyze_with_similarity(content, mood),
+                bypass=bypass
+            )
+            return result
+        
+        return batch_response(data, key_fn, worker_fn, "Dream analysis")
         
     except Exception as e:
-        logger.error(f"Error generating mockup: {str(e)}")
-        return jsonify({"error": "Failed to generate mockup", "details": str(e)}), 500
+        logger.error(f"Error running dream analysis batch: {str(e)}")
+        return error_response("Failed to run dream analysis batch", e)
+
+@app.route('/generate-startups/batch', methods=['POST'])
+def generate_startups_batch():
+    """Generate startup ideas for many dream analyses in one request"""
+    try:
+        data = request.get_json()
+        bypass = should_bypass(request.headers)
+        fields = ('symbols', 'emotions', 'keywords', 'tone', 'themes')
+        
+        def analysis_payload(item):
+            return {"symbols": item.get('symbols', []), "emotions": item.get('emotions', []),
+                    "keywords": item.get('keywords', []), "tone": item.get('tone', ''), "themes": item.get('themes', [])}
+        
+        def key_fn(item):
+            if not isinstance(item, dict) or not (item.get('symbols') or item.get('emotions') or item.get('keywords')):
+                raise ValueError("Dream analysis data is required")
+            return make_cache_key("generate-startup", analysis_payload(item),
+                                  model_router.profile("generate-startup").cache_id, STARTUP_GENERATION_PROMPT_VERSION)
+        
+        def worker_fn(item):
+            payload = analysis_payload(item)
+            result, _ = cached_compute(
+                "generate-startup",
+                payload,
+                STARTUP_GENERATION_PROMPT_VERSION,
+                lambda: run_startup_generation(*(payload[field] for field in fields)),
+                bypass=bypass
+            )
+            return result
+        
+        return batch_response(data, key_fn, worker_fn, "Startup generation")
+        
+    except Exception as e:
+        logger.error(f"Error running startup generation batch: {str(e)}")
+        return error_response("Failed to run startup generation batch", e)
 
 @app.route('/regenerate-section', methods=['POST'])
 def regenerate_section():
-    """Regenerate a specific section of a startup idea"""
+    """Regenerate one or more sections of a startup idea
+
+    Accepts `section` or a `sections` list. Sections are generated concurrently
+    and cached per section; send `"stream": true` (or `?stream=1`) to receive
+    each section as an SSE event as soon as it is ready.
+    """
     try:
         data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
         startup_idea = data.get('startupIdea', {})
-        section = data.get('section', '')
+        sections = data.get('sections') or ([data['section']] if data.get('section') else [])
         
-        if not startup_idea or not section:
+        if not startup_idea or not sections:
             return jsonify({"error": "Startup idea and section are required"}), 400
+        if not isinstance(sections, list) or not all(isinstance(section, str) for section in sections):
+            return jsonify({"error": "sections must be a list of strings"}), 400
         
-        logger.info(f"Regenerating section: {section}")
+        sections = list(dict.fromkeys(sections))
+        invalid = [section for section in sections if section not in SECTION_FIELDS]
+        if invalid:
+            return jsonify({"error": f"Invalid section: {invalid[0]}"}), 400
         
-        # Section-specific prompts
-        section_prompts = {
-            'problem': f"""
-            Based on the following startup idea, regenerate the PROBLEM section with detailed, specific content:
-            
-            Startup Name: {startup_idea.get('name', '')}
-            Tagline: {startup_idea.get('tagline', '')}
-            Description: {startup_idea.get('description', '')}
-            
-            Create a comprehensive problem statement that:
-            - Identifies a specific, real-world problem this startup solves
-            - Describes pain points and challenges faced by the target audience
-            - Includes relevant statistics or market data
-            - Makes it compelling and relatable
-            - Is 2-3 detailed paragraphs
-            
-            Focus on making this problem statement unique to this specific startup idea.
-            """,
-            
-            'solution': f"""
-            Based on the following startup idea, regenerate the SOLUTION section with detailed, specific content:
-            
-            Startup Name: {startup_idea.get('name', '')}
-            Tagline: {startup_idea.get('tagline', '')}
-            Description: {startup_idea.get('description', '')}
-            Problem: {startup_idea.get('problem', '')}
-            
-            Create a comprehensive solution description that:
-            - Explains exactly how this startup solves the identified problem
-            - Describes the unique approach and methodology
-            - Includes key features and capabilities
-            - Explains the technology or innovation behind it
-            - Is 2-3 detailed paragraphs
-            
-            Focus on making this solution unique to this specific startup idea.
-            """,
-            
-            'targetMarket': f"""
-            Based on the following startup idea, regenerate the TARGET MARKET section with detailed, specific content:
-            
-            Startup Name: {startup_idea.get('name', '')}
-            Tagline: {startup_idea.get('tagline', '')}
-            Description: {startup_idea.get('description', '')}
-            Problem: {startup_idea.get('problem', '')}
-            Solution: {startup_idea.get('solution', '')}
-            
-            Create a comprehensive target market description that:
-            - Defines the specific target audience in detail
-            - Includes demographics, psychographics, and behavioral patterns
-            - Describes market size and potential
-            - Explains why this market is ideal for the solution
-            - Is 2-3 detailed paragraphs
-            
-            Focus on making this market analysis unique to this specific startup idea.
-            """,
-            
-            'businessModel': f"""
-            Based on the following startup idea, regenerate the BUSINESS MODEL section with detailed, specific content:
-            
-            Startup Name: {startup_idea.get('name', '')}
-            Tagline: {startup_idea.get('tagline', '')}
-            Description: {startup_idea.get('description', '')}
-            Problem: {startup_idea.get('problem', '')}
-            Solution: {startup_idea.get('solution', '')}
-            Target Market: {startup_idea.get('targetMarket', '')}
-            
-            Create a comprehensive business model description that:
-            - Explains the revenue generation strategy in detail
-            - Describes pricing models and monetization approaches
-            - Includes cost structure and operational model
-            - Explains scalability and growth potential
-            - Is 2-3 detailed paragraphs
-            
-            Focus on making this business model unique to this specific startup idea.
-            """
-        }
+        logger.info(f"Regenerating sections: {', '.join(sections)}")
+        results = regenerate_sections(startup_idea, sections, bypass=should_bypass(request.headers))
         
-        if section not in section_prompts:
-            return jsonify({"error": f"Invalid section: {section}"}), 400
+        if data.get('stream') or request.args.get('stream') in ('1', 'true'):
+            def generate():
+                regenerated = {}
+                try:
+                    for section, value, cache_status in results:
+                        regenerated[section] = value
+                        yield sse_event("section", {"section": section, "value": value, "cache": cache_status})
+                    yield sse_event("complete", regenerated)
+                except Exception as e:
+                    logger.error(f"Error regenerating sections: {str(e)}")
+                    yield sse_event("error", {"error": "Failed to regenerate section", "details": str(e)})
+            return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
         
-        # Get the appropriate prompt
-        prompt = section_prompts[section]
+        # Return the regenerated sections in request order
+        regenerated, statuses = {}, set()
+        for section, value, cache_status in results:
+            regenerated[section] = value
+            statuses.add(cache_status)
+        result = {section: regenerated[section] for section in sections}
         
-        # Get response from OpenAI
-        response = llm.invoke(prompt)
+        logger.info(f"Sections {', '.join(sections)} regenerated successfully")
+        response = jsonify(result)
+        response.headers['X-Cache'] = statuses.pop() if len(statuses) == 1 else "PARTIAL"
+        return response
         
-        # Extract the generated content
-        generated_content = response.content.strip()
+    except Exception as e:
+        logger.error(f"Error regenerating section: {str(e)}")
+        return error_response("Failed to regenerate section", e)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Accept a generation job and return its ID at once; poll GET /jobs/<id> for the result"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        job_type = data.get('type')
+        payload = data.get('payload') or {}
         
-        # Return the regenerated section
-        result = {
-            section: generated_content
-        }
+        if job_type not in JOB_TYPES:
+            return jsonify({"error": f"type must be one of: {', '.join(JOB_TYPES)}"}), 400
+        if not isinstance(payload, dict):
+            return jsonify({"error": "payload must be a JSON object"}), 400
+        try:
+            JOB_TYPES[job_type](payload)
+            # Keep the requested model tier with the job so its worker uses it too,
+            # and the client so its tokens are metered against it
+            tier = payload.get('tier') or requested_tier.get()
+            if tier:
+                payload = {**payload, 'tier': model_router.check_tier(str(tier).lower())}
+            payload = {**payload, 'client': g.client}
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        logger.info(f"Section {section} regenerated successfully")
-        return jsonify(result)
+        runner = get_job_runner()
+        job_id = runner.submit(job_type, payload)
+        logger.info(f"Accepted {job_type} job {job_id}")
+        response = jsonify(job_view(runner.store.get(job_id)))
+        response.status_code = 202
+        response.headers['Location'] = f"/jobs/{job_id}"
+        return response
         
     except Exception as e:
-        logger.error(f"Error regenerating section: {str(e)}")
-        return jsonify({"error": "Failed to regenerate section", "details": str(e)}), 500
+        logger.error(f"Error creating job: {str(e)}")
+        return error_response("Failed to create job", e)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status and, once finished, its result or error
+
+    With `?wait=SECONDS` (at most JOB_MAX_WAIT) the request is held until the
+    job finishes or the wait runs out.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    
+    runner = get_job_runner()
+    job = runner.wait(job_id, wait) if wait > 0 else runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_view(job))
+
+@app.route('/jobs/stats', methods=['GET'])
+def job_stats():
+    """Job counts by status, mean queue/run time and throughput per job type"""
+    runner = get_job_runner()
+    return jsonify({"types": runner.store.stats(), "active": runner.active()})
+
+def page_params():
+    """(limit, cursor, query) from the query string of a dream listing"""
+    limit = request.args.get('limit', type=int) or get_dream_store().feed_page_size
+    return max(1, min(limit, DREAMS_MAX_PAGE_SIZE)), request.args.get('cursor'), request.args.get('q', '').strip()
+
+def page_response(page, **headers):
+    """A page of dreams as a JSON array, with the next cursor in X-Next-Cursor and a Link header"""
+    response = jsonify(page.items)
+    if page.next_cursor:
+        args = {**request.args, 'cursor': page.next_cursor}
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    response.headers.update(headers)
+    return response
+
+def dream_owner():
+    """Owner of the caller's saved dreams: its hashed X-API-Key, or None without one
+
+    Any key works here, configured or not: it only names whose dreams these
+    are, while admission control and metering identify callers separately.
+    Unlike those this never falls back to the IP address, which many users
+    share behind a proxy or NAT.
+    """
+    api_key = request.headers.get('X-API-Key')
+    if not api_key:
+        return None
+    return "key:" + api_key_hash(api_key)
+
+OWNER_REQUIRED = {"error": "An X-API-Key header is required to save or list your dreams"}
+
+@app.route('/dreams', methods=['POST'])
+def save_dream():
+    """Save a dream with its analysis and startup idea for the calling client
+
+    Saving an existing ID again updates it; an ID owned by another client is a 409.
+    """
+    owner = dream_owner()
+    if owner is None:
+        return jsonify(OWNER_REQUIRED), 401
+    try:
+        data = request.get_json()
+        if not data or not data.get('content'):
+            return jsonify({"error": "Dream content is required"}), 400
+        for field, schema_name in (('analysis', 'DreamAnalysis'), ('startupIdea', 'StartupIdea')):
+            if data.get(field):
+                try:
+                    get_schema(schema_name).model_validate(data[field])
+                except ValueError as e:
+                    return jsonify({"error": f"Invalid {field}", "details": str(e)}), 400
+        
+        try:
+            with metrics.stage("db"):
+                dream = get_dream_store().save(data, owner)
+        except DreamConflict:
+            return jsonify({"error": "Dream ID already exists"}), 409
+        except ValueError as e:
+            return jsonify({"error": "Invalid createdAt", "details": str(e)}), 400
+        
+        logger.info(f"Saved dream {dream['id']}")
+        return jsonify(dream), 201
+        
+    except Exception as e:
+        logger.error(f"Error saving dream: {str(e)}")
+        return error_response("Failed to save dream", e)
+
+@app.route('/dreams', methods=['GET'])
+def list_dreams():
+    """The calling client's dreams, newest first, with cursor pagination and `?q=` search"""
+    owner = dream_owner()
+    if owner is None:
+        return jsonify(OWNER_REQUIRED), 401
+    limit, cursor, query = page_params()
+    try:
+        with metrics.stage("db"):
+            page = get_dream_store().list_owner(owner, limit, cursor, query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(page)
+
+@app.route('/dreams/public', methods=['GET'])
+def list_public_dreams():
+    """Public dreams, newest first
+
+    The first page is served from memory and refreshed every DREAMS_FEED_REFRESH
+    seconds; later pages (`?cursor=`) and searches (`?q=`) read the database.
+    """
+    limit, cursor, query = page_params()
+    store = get_dream_store()
+    try:
+        if not cursor and not query and limit == store.feed_page_size:
+            page, cached = store.public_feed()
+            metrics.DREAM_FEED.inc(outcome="hit" if cached else "refresh")
+            return page_response(page, **{
+                'X-Cache': "HIT" if cached else "MISS",
+                'Cache-Control': f"public, max-age={int(store.feed_refresh)}"
+            })
+        with metrics.stage("db"):
+            page = store.list_public(limit, cursor, query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(page)
+
+@app.route('/export/dreams', methods=['GET'])
+def export_dreams():
+    """Stream every saved dream with its analysis and startup idea as NDJSON, CSV, Parquet or Arrow
+
+    Requires `Authorization: Bearer <EXPORT_API_KEY>`. `X-Export-Cursor` marks
+    where this export ends; pass it back as `?cursor=` to export only dreams
+    created or updated since. `?since=` keeps dreams created or updated at or
+    after a time, `?public=1` only public ones.
+    """
+    denied = bearer_key_error(EXPORT_API_KEY, "Export", "EXPORT_API_KEY")
+    if denied:
+        return denied
+    
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        after = int(request.args.get('cursor', 0))
+        since = parse_timestamp(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"error": "cursor must be an integer and since an ISO 8601 time"}), 400
+    
+    store = get_dream_store()
+    until = store.export_cursor()
+    try:
+        chunks = export_chunks(store, fmt, after=after, until=until, since=since,
+                               public_only=request.args.get('public') in ('1', 'true'),
+                               batch_size=EXPORT_BATCH_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+    
+    content_type, extension = FORMATS[fmt]
+    logger.info(f"Exporting dreams {after}..{until} as {fmt}")
+    return Response(stream_with_context(chunks), content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="dreams-{after}-{until}.{extension}"',
+        'X-Export-Cursor': str(until),
+        'Cache-Control': 'no-store',
+    })
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Development only; use `python run.py --production` to serve real traffic
+    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
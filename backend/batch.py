@@ -0,0 +1,81 @@
+"""
+Batch execution with in-batch deduplication and bounded concurrency
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class BatchStats:
+    """Counters and throughput for one batch run"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.unique = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "items": self.total,
+            "unique": self.unique,
+            "deduplicated": self.total - self.unique - self.rejected,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsedMs": round(elapsed * 1000, 1),
+            "itemsPerSecond": round(self.total / elapsed, 2) if elapsed > 0 else None,
+        }
+
+
+def run_batch(
+    items: List[Any],
+    key_fn: Callable[[Any], str],
+    worker_fn: Callable[[Any], Any],
+    concurrency: int,
+    stats: Optional[BatchStats] = None,
+) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Yield (index, result, error) for every item, in completion order
+
+    Items with the same key are executed once and the result fanned out to
+    every index. `key_fn` may raise ValueError to reject an item, which is
+    reported as that item's error without affecting the rest of the batch.
+    """
+    stats = stats or BatchStats(len(items))
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, item in enumerate(items):
+        try:
+            key = key_fn(item)
+        except ValueError as e:
+            stats.rejected += 1
+            stats.failed += 1
+            yield index, None, str(e)
+            continue
+        groups.setdefault(key, []).append(index)
+    stats.unique = len(groups)
+    if not groups:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(groups))), thread_name_prefix="batch")
+    try:
+        futures = {pool.submit(worker_fn, items[indices[0]]): indices for indices in groups.values()}
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, str(e)
+            for index in indices:
+                if error is None:
+                    stats.succeeded += 1
+                else:
+                    stats.failed += 1
+                yield index, result, error
+    finally:
+        # A client that disconnects mid-stream should not keep queued items running
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Show that admission control keeps tail latency bounded under overload
+
+Runs the app against a fake LLM with limited upstream capacity
+(--upstream-concurrency calls at a time) and offers an open-loop load of
+--rate requests/second for --duration seconds, above what the upstream can
+serve. The run is repeated with admission control off and on. Without it,
+requests pile up behind the upstream and latency grows for the whole run;
+with it, excess requests are turned away quickly with 429/503 and admitted
+ones stay within roughly the queue timeout plus one LLM call.
+
+Usage (from the backend directory):
+    python benchmarks/bench_admission.py --route /generate-startup --rate 80 --duration 10 \
+        --latency constant:200 --upstream-concurrency 8 --output bench_admission.json
+"""
+
+import argparse
+import ipaddress
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import request_json, start_server, summarize, write_results
+from bench_routes import route_payloads
+
+
+def offer_load(base_url, route, payload_fn, rate, duration, clients):
+    """Send requests at a fixed arrival rate regardless of how fast they complete"""
+    results = []
+    lock = threading.Lock()
+
+    def one(i):
+        headers = {"X-Forwarded-For": str(ipaddress.IPv4Address(0x0A000000 + i % clients))}
+        try:
+            status, elapsed_ms, _, response_headers = request_json(base_url + route, payload_fn(i), headers)
+        except OSError:
+            status, elapsed_ms, response_headers = 599, None, {}
+        with lock:
+            results.append((status, elapsed_ms, response_headers.get("Retry-After")))
+
+    total = int(rate * duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(total, 2000)) as pool:
+        for i in range(total):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, i)
+    wall = time.perf_counter() - started
+
+    by_status = {}
+    for status, _, _ in results:
+        by_status[str(status)] = by_status.get(str(status), 0) + 1
+    ok = [elapsed for status, elapsed, _ in results if status == 200]
+    rejected = [elapsed for status, elapsed, _ in results if status in (429, 503)]
+    return {
+        "offered": total,
+        "statuses": by_status,
+        "goodputRps": round(len(ok) / wall, 2),
+        "admittedLatencyMs": summarize(ok),
+        "rejectedLatencyMs": summarize(rejected),
+        "rejectionsWithRetryAfter": sum(1 for status, _, retry in results if status in (429, 503) and retry),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", default="/generate-startup")
+    parser.add_argument("--rate", type=float, default=80.0, help="Offered requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of offered load per run")
+    parser.add_argument("--clients", type=int, default=100000, help="Distinct client addresses to spread requests over")
+    parser.add_argument("--latency", default="constant:200", help="Fake LLM time-to-first-token distribution")
+    parser.add_argument("--upstream-concurrency", type=int, default=8, help="Fake LLM calls served at once")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="ADMISSION_MAX_CONCURRENT")
+    parser.add_argument("--queue-size", type=int, default=16, help="ADMISSION_QUEUE_SIZE")
+    parser.add_argument("--queue-timeout", type=float, default=1.0, help="ADMISSION_QUEUE_TIMEOUT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_admission.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging enabled")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "APP_WARMUP": "lazy",
+        "RESPONSE_CACHE_ENABLED": "0",
+        "COALESCE_ENABLED": "0",
+        "ADMISSION_MAX_CONCURRENT": str(args.max_concurrent),
+        "ADMISSION_QUEUE_SIZE": str(args.queue_size),
+        "ADMISSION_QUEUE_TIMEOUT": str(args.queue_timeout),
+        "ADMISSION_TRUST_FORWARDED": "1",
+    })
+
+    import app as app_module
+    from fake_llm import FakeChatModel
+    app_module.model_router.use(FakeChatModel(latency=args.latency, seed=args.seed,
+                                              max_concurrency=args.upstream_concurrency))
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    server, base_url = start_server(app_module.app)
+    payload_fn = route_payloads()[args.route]
+    results = {}
+    try:
+        for label, enabled in (("withoutAdmission", False), ("withAdmission", True)):
+            app_module.admission.enabled = enabled
+            results[label] = row = offer_load(base_url, args.route, payload_fn, args.rate, args.duration, args.clients)
+            latency = row["admittedLatencyMs"]
+            print(f"{label:18s} goodput {row['goodputRps']:7.2f} req/s  admitted p50 {latency['p50']} ms  "
+                  f"p99 {latency['p99']} ms  max {latency['max']} ms  statuses {row['statuses']}")
+    finally:
+        server.shutdown()
+
+    write_results(args.output, "admission", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
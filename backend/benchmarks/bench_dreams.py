@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark dream storage: feed, pagination and search latency at scale
+
+Fills a fresh DreamStore with --dreams synthetic dreams (a --public-ratio
+share of them public, spread over --owners owners), then measures the cached
+public feed (in memory and through the /dreams/public route), the same first
+page read from SQLite, deep keyset pagination, per-owner listings and
+full-text search for common, rare and prefix terms.
+
+Usage (from the backend directory):
+    python benchmarks/bench_dreams.py --dreams 300000 --queries 200 --output bench_dreams.json
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from common import summarize, write_results
+
+WORDS = (
+    "flying falling city light ocean forest teeth school exam train door stairs mirror house river "
+    "mountain storm fire snow moon sun garden library whale bird snake wolf cat dog car bridge tower "
+    "stranger friend mother father baby wedding funeral chase maze key clock phone computer robot "
+    "island desert cave castle market stage crowd silence music color shadow glass water sky star"
+).split()
+MOODS = ["sad", "neutral", "happy", "excited", "anxious"]
+STARTUP_WORDS = ["Lumen", "Dream", "Sky", "Deep", "Echo", "Nova", "Drift", "Quiet", "Bright", "Wander"]
+
+
+def synthetic_dreams(count, owners, public_ratio, seed):
+    rng = random.Random(seed)
+    started = time.time() - count
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(12, 40))
+        keywords = rng.sample(words, k=min(4, len(set(words))))
+        dream = {
+            "content": "I dreamed " + " ".join(words),
+            "mood": rng.choice(MOODS),
+            "isPublic": rng.random() < public_ratio,
+            "createdAt": started + i,
+            "analysis": {"symbols": [], "emotions": [], "keywords": keywords, "tone": "vivid", "themes": []},
+            "startupIdea": {"name": rng.choice(STARTUP_WORDS) + rng.choice(STARTUP_WORDS).lower() + str(i % 97)},
+        }
+        yield dream, f"key:owner{rng.randrange(owners)}"
+
+
+def timed(fn, repeat):
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dreams", type=int, default=300000)
+    parser.add_argument("--owners", type=int, default=10000)
+    parser.add_argument("--public-ratio", type=float, default=0.3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=50, help="Pages walked for deep pagination")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_dreams.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({"DREAMS_DB": os.path.join(directory, "dreams.db"), "LLM_BACKEND": "fake",
+                           "APP_WARMUP": "lazy", "ADMISSION_ENABLED": "0"})
+        import app as app_module
+        logging.disable(logging.ERROR)
+        store = app_module.get_dream_store()
+
+        started = time.perf_counter()
+        store.save_many(synthetic_dreams(args.dreams, args.owners, args.public_ratio, args.seed))
+        load_seconds = time.perf_counter() - started
+        results = {
+            "load": {"rows": args.dreams, "rowsPerSecond": round(args.dreams / load_seconds, 1),
+                     "bytes": sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))},
+        }
+
+        client = app_module.app.test_client()
+        store.public_feed()
+        results["feedCachedMs"] = timed(lambda i: store.public_feed(), args.queries)
+        results["feedRouteCachedMs"] = timed(lambda i: client.get("/dreams/public"), args.queries)
+        results["feedFromDbMs"] = timed(lambda i: store.list_public(store.feed_page_size), args.queries)
+
+        cursors = [None]
+        for _ in range(args.pages):
+            cursors.append(store.list_public(store.feed_page_size, cursors[-1]).next_cursor)
+        cursors = [cursor for cursor in cursors if cursor]
+        results["feedDeepPageMs"] = timed(
+            lambda i: store.list_public(store.feed_page_size, cursors[i % len(cursors)]), args.queries)
+        results["ownerListMs"] = timed(
+            lambda i: store.list_owner(f"key:owner{i % args.owners}", store.feed_page_size), args.queries)
+
+        searches = {"common": "flying", "twoTerms": "whale library", "prefix": "lumen", "rare": "zeppelin"}
+        results["searchMs"] = {
+            name: timed(lambda i, term=term: store.list_public(store.feed_page_size, query=term), args.queries)
+            for name, term in searches.items()
+        }
+
+    print(f"load            {results['load']['rowsPerSecond']} rows/s  ({results['load']['bytes'] / 2**20:.1f} MiB)")
+    for name in ("feedCachedMs", "feedRouteCachedMs", "feedFromDbMs", "feedDeepPageMs", "ownerListMs"):
+        print(f"{name:16s} p50 {results[name]['p50']} ms  p99 {results[name]['p99']} ms")
+    for name, summary in results["searchMs"].items():
+        print(f"search {name:9s} p50 {summary['p50']} ms  p99 {summary['p99']} ms")
+
+    write_results(args.output, "dreams", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
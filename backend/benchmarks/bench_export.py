@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Measure bulk export throughput and memory on a large synthetic dream store
+
+Fills a fresh DreamStore with --rows dreams, each with a full analysis and
+startup idea, then exports the whole store in every format and reports rows
+per second, output size and throughput, and the process's peak RSS after
+each format. A flat peak RSS across formats and sizes shows the export
+streams instead of buffering. With --http the exports are also downloaded
+through the /export/dreams route of a local server.
+
+Usage (from the backend directory):
+    python benchmarks/bench_export.py --rows 1000000 --formats ndjson,csv,parquet,arrow --http
+"""
+
+import argparse
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import urllib.request
+
+from common import start_server, write_results
+
+
+def synthetic_dreams(count, seed):
+    from fake_llm import CANNED_ANALYSIS, CANNED_STARTUP
+    rng = random.Random(seed)
+    words = CANNED_ANALYSIS["keywords"] + ["ocean", "door", "train", "mirror", "river"]
+    started = time.time() - count
+    for i in range(count):
+        startup = dict(CANNED_STARTUP, name=f"{CANNED_STARTUP['name']} {i}")
+        yield {
+            "content": f"Dream {i}: " + " ".join(rng.choices(words, k=40)),
+            "mood": rng.choice(["sad", "neutral", "happy", "excited"]),
+            "isPublic": rng.random() < 0.3,
+            "createdAt": started + i,
+            "analysis": CANNED_ANALYSIS,
+            "startupIdea": startup,
+        }, f"key:owner{rng.randrange(1000)}"
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def drain(chunks):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+    return total
+
+
+def http_chunks(url, key):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {key}"})
+    with urllib.request.urlopen(request, timeout=3600) as response:
+        while True:
+            chunk = response.read(1 << 20)
+            if not chunk:
+                return
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--formats", default="ndjson,csv,parquet,arrow")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--http", action="store_true", help="Also download each format through /export/dreams")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_export.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({"DREAMS_DB": os.path.join(directory, "dreams.db"), "LLM_BACKEND": "fake",
+                           "APP_WARMUP": "lazy", "ADMISSION_ENABLED": "0", "EXPORT_API_KEY": "bench",
+                           "EXPORT_BATCH_SIZE": str(args.batch_size)})
+        import app as app_module
+        from export import export_chunks
+        logging.disable(logging.ERROR)
+        store = app_module.get_dream_store()
+
+        started = time.perf_counter()
+        store.save_many(synthetic_dreams(args.rows, args.seed))
+        print(f"Loaded {args.rows} dreams in {time.perf_counter() - started:.1f} s (peak RSS {peak_rss_mb()} MB)")
+
+        server, base_url = start_server(app_module.app) if args.http else (None, None)
+        results = []
+        try:
+            for fmt in args.formats.split(","):
+                runs = [("direct", lambda: export_chunks(store, fmt, batch_size=args.batch_size))]
+                if args.http:
+                    runs.append(("http", lambda: http_chunks(f"{base_url}/export/dreams?format={fmt}", "bench")))
+                for path, chunks in runs:
+                    started = time.perf_counter()
+                    size = drain(chunks())
+                    seconds = time.perf_counter() - started
+                    row = {
+                        "format": fmt,
+                        "path": path,
+                        "rows": args.rows,
+                        "seconds": round(seconds, 2),
+                        "rowsPerSecond": round(args.rows / seconds),
+                        "megabytes": round(size / 1e6, 1),
+                        "megabytesPerSecond": round(size / 1e6 / seconds, 1),
+                        "peakRssMb": peak_rss_mb(),
+                    }
+                    results.append(row)
+                    print(f"{fmt:8s} {path:6s}  {row['rowsPerSecond']:>9,d} rows/s  {row['megabytes']:9.1f} MB  "
+                          f"{row['megabytesPerSecond']:7.1f} MB/s  peak RSS {row['peakRssMb']} MB")
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    write_results(args.output, "export", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Measure /analyze-dream latency against dream length, single prompt vs chunked
+
+The fake LLM's time to first token grows with prompt length (--prefill-rate
+tokens/second), as a real model's does. For each dream length the route runs
+twice:
+  single   the whole dream in one prompt (token budget lifted so nothing is trimmed)
+  chunked  long-input mode: chunks of --chunk-tokens analysed in parallel and merged
+Single-prompt latency grows linearly with length; chunked latency stays about
+flat while the chunks fit in --workers threads.
+
+Usage (from the backend directory):
+    python benchmarks/bench_long_dreams.py --words 250,1000,4000,8000,16000 --requests 5 \
+        --latency constant:300 --prefill-rate 2000 --chunk-tokens 1500 --workers 16
+"""
+
+import argparse
+import logging
+import os
+import random
+
+from common import request_json, start_server, summarize, write_results
+
+VOCABULARY = (
+    "I was walking through a flooded library where the books floated like boats . "
+    "My grandmother handed me a glowing key and told me the train would not wait . "
+    "The city lights flickered whenever someone laughed , and the streets folded into stairs . "
+    "A silver fox followed me into an empty classroom full of ringing phones . "
+    "I tried to call my brother but every number turned into a song . "
+    "The ocean climbed the hills at night and nobody seemed afraid . "
+).split()
+
+
+def make_dream(words, seed):
+    """Deterministic dream text of about `words` words in paragraphs of ~80 words"""
+    rng = random.Random(seed)
+    paragraphs, current = [], []
+    for index in range(words):
+        current.append(rng.choice(VOCABULARY))
+        if len(current) >= 80 and current[-1] == ".":
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current) + " .")
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", default="250,1000,2000,4000,8000,16000", help="Comma-separated dream lengths")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per length and mode")
+    parser.add_argument("--latency", default="constant:300", help="Fake LLM base time-to-first-token distribution")
+    parser.add_argument("--prefill-rate", type=float, default=2000, help="Fake LLM prompt tokens processed per second")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Fake LLM output rate (0 = instant)")
+    parser.add_argument("--chunk-tokens", type=int, default=1500)
+    parser.add_argument("--workers", type=int, default=16, help="LONG_DREAM_WORKERS")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_long_dreams.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging enabled")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "APP_WARMUP": "lazy",
+        "ADMISSION_ENABLED": "0",
+        "RESPONSE_CACHE_ENABLED": "0",
+        "COALESCE_ENABLED": "0",
+        "RESILIENCE_ENABLED": "0",
+        "DREAM_MAX_CHARS": "10000000",
+        "PROMPT_TOKEN_BUDGET_DREAM_ANALYSIS": "10000000",
+        "LONG_DREAM_WORKERS": str(args.workers),
+    })
+
+    import app as app_module
+    from fake_llm import FakeChatModel
+    from longform import split_text
+    from prompts import count_tokens
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    fake = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                         prefill_tokens_per_second=args.prefill_rate, seed=args.seed)
+    app_module.model_router.use(fake)
+    server, base_url = start_server(app_module.app)
+    results = []
+    try:
+        for words in (int(value) for value in args.words.split(",")):
+            dreams = [make_dream(words, seed=args.seed * 1000 + index) for index in range(args.requests)]
+            tokens = count_tokens(dreams[0])
+            for mode, chunk_tokens in (("single", 0), ("chunked", args.chunk_tokens)):
+                app_module.LONG_DREAM_CHUNK_TOKENS = chunk_tokens
+                calls_before = fake.stats()["calls"]
+                latencies, errors = [], 0
+                for dream in dreams:
+                    status, elapsed_ms, _, _ = request_json(f"{base_url}/analyze-dream",
+                                                            {"content": dream, "mood": "curious"})
+                    errors += status != 200
+                    latencies.append(elapsed_ms)
+                chunks = len(split_text(dreams[0], chunk_tokens, count_tokens)) if app_module.is_long_dream(dreams[0]) else 1
+                row = {
+                    "words": words,
+                    "tokens": tokens,
+                    "mode": mode,
+                    "chunks": chunks,
+                    "errors": errors,
+                    "llmCalls": fake.stats()["calls"] - calls_before,
+                    "latencyMs": summarize(latencies),
+                }
+                results.append(row)
+                print(f"{words:6d} words ({tokens:6d} tokens)  {mode:7s}  chunks {chunks:3d}  "
+                      f"errors {errors}  mean {row['latencyMs']['mean']:9.2f} ms  p50 {row['latencyMs']['p50']:9.2f} ms")
+    finally:
+        server.shutdown()
+
+    write_results(args.output, "long_dreams", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Measure token metering overhead under many recording threads
+
+Each thread records --records calls spread over --clients clients, once with
+the per-thread sharded Meter and once with a single dict behind one global
+lock (the obvious alternative). Reports records per second and the mean cost
+of a record() call; a final flush checks that no count was lost.
+
+Usage (from the backend directory):
+    python benchmarks/bench_metering.py --threads 1,8,32 --records 50000 --clients 100
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from common import write_results
+from metering import Meter
+
+ROUTES = ("/analyze-dream", "/generate-startup", "/generate-mockup")
+USAGE = {"input_tokens": 900, "output_tokens": 300}
+
+
+class GlobalLockMeter:
+    """Baseline: every thread updates one dict under one lock"""
+
+    def __init__(self, bucket_seconds: float = 60.0):
+        self.bucket_seconds = bucket_seconds
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def record(self, client, route, model, usage):
+        now = time.time()
+        key = (now - now % self.bucket_seconds, client, route, model)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                self.counts[key] = [1, usage["input_tokens"], usage["output_tokens"]]
+            else:
+                counts[0] += 1
+                counts[1] += usage["input_tokens"]
+                counts[2] += usage["output_tokens"]
+
+
+def run(meter, threads, records, clients):
+    start = threading.Barrier(threads + 1)
+
+    def worker(index):
+        start.wait()
+        for n in range(records):
+            meter.record(f"key:{(index * 7919 + n) % clients}", ROUTES[n % len(ROUTES)], "gpt-4", USAGE)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,8,32", help="Comma-separated thread counts")
+    parser.add_argument("--records", type=int, default=50000, help="Records per thread")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--output", default="bench_metering.json")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in (int(value) for value in args.threads.split(",")):
+            total = threads * args.records
+            for name in ("global-lock", "sharded"):
+                if name == "sharded":
+                    meter = Meter(os.path.join(directory, f"usage-{threads}.db"), flush_interval=0.5)
+                else:
+                    meter = GlobalLockMeter()
+                seconds = run(meter, threads, args.records, args.clients)
+                row = {
+                    "threads": threads,
+                    "meter": name,
+                    "recordsPerSecond": round(total / seconds),
+                    "nsPerRecord": round(seconds * 1e9 / total, 1),
+                }
+                if name == "sharded":
+                    meter.close()
+                    row["recordedCalls"] = meter.usage(3600)["total"]["calls"]
+                    row["lost"] = total - row["recordedCalls"]
+                results.append(row)
+                print(f"{threads:3d} threads  {name:11s}  {row['recordsPerSecond']:>10,d} records/s  "
+                      f"{row['nsPerRecord']:8.1f} ns/record" + (f"  lost {row['lost']}" if "lost" in row else ""))
+
+    write_results(args.output, "metering", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure hedging and retries against a fault-injecting fake LLM
+
+Runs one route in two scenarios, each with the resilience layer off and on:
+  tail   --slow-rate of calls take an extra --slow-latency (hedging cuts the tail)
+  errors --error-rate of calls fail with a 503-like error (retries hide them)
+For each run it reports error count, latency percentiles and upstream calls
+per request, so the cost of hedges and retries is visible next to the gain.
+
+Usage (from the backend directory):
+    python benchmarks/bench_resilience.py --route /generate-mockup --requests 400 --concurrency 8 \
+        --latency uniform:80:120 --slow-rate 0.02 --slow-latency constant:2000 --error-rate 0.1
+"""
+
+import argparse
+import logging
+import os
+
+from common import start_server, write_results
+from bench_routes import bench_route, route_payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", default="/generate-mockup")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="uniform:80:120", help="Fake LLM time-to-first-token distribution")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Share of calls slowed down in the tail scenario")
+    parser.add_argument("--slow-latency", default="constant:2000", help="Extra latency of a slowed call")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Share of calls failing in the errors scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Requests that fill the latency history before a run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_resilience.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging enabled")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "APP_WARMUP": "lazy",
+        "ADMISSION_ENABLED": "0",
+        "RESPONSE_CACHE_ENABLED": "0",
+        "COALESCE_ENABLED": "0",
+        "RESILIENCE_BACKOFF_BASE": os.getenv("RESILIENCE_BACKOFF_BASE", "0.05"),
+    })
+
+    import app as app_module
+    from fake_llm import FakeChatModel
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    server, base_url = start_server(app_module.app)
+    payload_fn = route_payloads()[args.route]
+    scenarios = {
+        "tail": {"slow_rate": args.slow_rate, "slow_latency": args.slow_latency},
+        "errors": {"error_rate": args.error_rate},
+    }
+    results = {}
+    try:
+        for scenario, faults in scenarios.items():
+            for label, enabled in (("off", False), ("on", True)):
+                # A fresh fake and resilience state per run, so breaker and latency history start clean
+                fake = FakeChatModel(latency=args.latency, seed=args.seed, **faults)
+                app_module.model_router.use(fake)
+                app_module.resilience = app_module.resilience_from_env()
+                app_module.resilience.enabled = enabled
+                bench_route(base_url, args.route, payload_fn, args.warmup, args.concurrency, fake)
+                row = bench_route(base_url, args.route, payload_fn, args.requests, args.concurrency, fake)
+                row["upstreamCallsPerRequest"] = round(row["llmCalls"] / args.requests, 3)
+                row["resilience"] = app_module.resilience.stats()
+                results[f"{scenario}/{label}"] = row
+                latency = row["latencyMs"]
+                print(f"{scenario:6s} resilience {label:3s}  errors {row['errors']:4d}  p50 {latency['p50']:8.2f} ms  "
+                      f"p99 {latency['p99']:8.2f} ms  max {latency['max']:8.2f} ms  "
+                      f"upstream calls/request {row['upstreamCallsPerRequest']}")
+    finally:
+        server.shutdown()
+
+    write_results(args.output, "resilience", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load-test every LLM-backed route against the deterministic fake LLM
+
+Usage (from the backend directory):
+    python benchmarks/bench_routes.py --concurrency 16 --requests 200 \
+        --latency lognormal:800:0.4 --tokens-per-second 60 --output bench_routes.json
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import request_json, start_server, summarize, write_results
+
+
+def route_payloads():
+    from fake_llm import CANNED_ANALYSIS, CANNED_STARTUP
+    return {
+        "/analyze-dream": lambda i: {"content": f"I was flying over a city made of light #{i}", "mood": "excited"},
+        "/generate-startup": lambda i: {**CANNED_ANALYSIS, "keywords": CANNED_ANALYSIS["keywords"] + [f"k{i}"]},
+        "/generate-business-model": lambda i: {"startupIdea": {**CANNED_STARTUP, "name": f"Lumenflight {i}"}},
+        "/generate-mockup": lambda i: {"startupIdea": {**CANNED_STARTUP, "name": f"Lumenflight {i}"}},
+        "/regenerate-section": lambda i: {"startupIdea": {**CANNED_STARTUP, "name": f"Lumenflight {i}"}, "section": "problem"},
+    }
+
+
+def bench_route(base_url, route, payload_fn, requests, concurrency, fake):
+    calls_before, busy_before = fake.calls, fake.busy_seconds
+    latencies, errors = [], 0
+
+    def one(i):
+        status, elapsed_ms, _, _ = request_json(base_url + route, payload_fn(i))
+        return status, elapsed_ms
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for status, elapsed_ms in pool.map(one, range(requests)):
+            latencies.append(elapsed_ms)
+            if status >= 400:
+                errors += 1
+    wall = time.perf_counter() - started
+
+    llm_ms_per_request = (fake.busy_seconds - busy_before) * 1000.0 / requests
+    latency = summarize(latencies)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "llmCalls": fake.calls - calls_before,
+        "throughputRps": round(requests / wall, 2),
+        "latencyMs": latency,
+        "llmMsPerRequest": round(llm_ms_per_request, 2),
+        # Time spent in the server and client stack, excluding fake LLM time
+        "overheadMsMean": round(latency["mean"] - llm_ms_per_request, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", nargs="*", help="Routes to benchmark (default: all)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:200:0.3", help="Fake LLM time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake LLM output token rate (0 = instant)")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of fake responses with broken JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--output", default="bench_routes.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging enabled")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "fake"
+    # The fake model is swapped in below; don't let a background warm-up build another one
+    os.environ["APP_WARMUP"] = "lazy"
+    # Measures raw route cost from a single client, so per-client rate limits stay off
+    os.environ["ADMISSION_ENABLED"] = "0"
+    if not args.cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+
+    import app as app_module
+    from fake_llm import FakeChatModel
+    fake = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                         invalid_rate=args.invalid_rate, seed=args.seed)
+    app_module.model_router.use(fake)
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    server, base_url = start_server(app_module.app)
+    payloads = route_payloads()
+    routes = args.routes or list(payloads)
+    results = {}
+    try:
+        for route in routes:
+            results[route] = bench_route(base_url, route, payloads[route], args.requests, args.concurrency, fake)
+            row = results[route]
+            print(f"{route:28s} {row['throughputRps']:8.2f} req/s  p50 {row['latencyMs']['p50']:8.2f} ms  "
+                  f"p95 {row['latencyMs']['p95']:8.2f} ms  p99 {row['latencyMs']['p99']:8.2f} ms  "
+                  f"overhead {row['overheadMsMean']:6.2f} ms  errors {row['errors']}")
+    finally:
+        server.shutdown()
+
+    write_results(args.output, "routes", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
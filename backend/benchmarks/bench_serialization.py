@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Measure JSON serialization time and bytes on the wire for API responses
+
+Three payloads: one StartupIdea with multi-paragraph fields, a dream-to-startup
+pipeline result, and a page of saved dreams. Each is serialized the way the
+app did before (model_dump() through Flask's stdlib provider: sorted keys,
+ASCII escapes) and the way it does now (the model itself through
+responses.dumps_bytes), then sized uncompressed, gzipped and, when brotli is
+installed, brotli-compressed. Finally the same page is fetched through the
+app's test client with and without Accept-Encoding and with If-None-Match.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py --paragraphs 4 --page-size 50 --repeat 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from common import write_results
+
+
+EXTRA_WORDS = {
+    "en": "",
+    # Non-ASCII text is where the stdlib's \u escapes cost the most
+    "es": "soñé que la ciudad despertaba conmigo bajo un cielo de cristal y canción",
+    "ja": "夢 の 中 で 街 が 光 に 包 まれ て いた 空 を 飛ぶ",
+}
+rng = random.Random(0)
+
+
+def paragraphs(text, count, language):
+    """`count` paragraphs of shuffled words, so compression ratios are not inflated by repetition"""
+    words = text.split() + EXTRA_WORDS[language].split()
+    return "\n\n".join(" ".join(rng.choices(words, k=60)) + "." for _ in range(count))
+
+
+def payloads(count, page_size, language):
+    from fake_llm import CANNED_ANALYSIS, CANNED_STARTUP
+    from schemas import DreamAnalysis, StartupIdea
+    startup = StartupIdea(**{
+        field: paragraphs(value, count, language) if field in ("problem", "solution", "targetMarket", "businessModel")
+        else value
+        for field, value in CANNED_STARTUP.items()
+    })
+    pipeline = {"analysis": DreamAnalysis(**CANNED_ANALYSIS), "startupIdea": startup, "cache": "MISS"}
+    page = {
+        "items": [{
+            "id": f"{n:032x}", "content": paragraphs("I flew over a city of light and the river sang", 2, language),
+            "mood": "excited", "isPublic": True, "createdAt": "2026-01-01T00:00:00Z", "analysis": CANNED_ANALYSIS,
+            "startupIdea": startup.model_copy(update={"name": f"{startup.name} {n}", "solution": paragraphs(
+                startup.solution, count, language)}),
+        } for n in range(page_size)],
+        "nextCursor": "eyJjIjoxfQ",
+    }
+    return {"startup": startup, "pipeline": pipeline, "page": page}
+
+
+def as_dicts(value):
+    """What the routes handed to jsonify before: model_dump() of every model"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {key: as_dicts(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_dicts(item) for item in value]
+    return value
+
+
+def time_per_call(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) * 1e6 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs in each long StartupIdea field")
+    parser.add_argument("--page-size", type=int, default=50, help="Dreams in the page payload")
+    parser.add_argument("--language", choices=("en", "es", "ja"), default="es")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--level", type=int, default=6, help="Compression level")
+    parser.add_argument("--output", default="bench_serialization.json")
+    args = parser.parse_args()
+
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from responses import brotli, compress, dumps_bytes, orjson
+    stdlib = DefaultJSONProvider(Flask(__name__))
+    print(f"orjson: {'yes' if orjson else 'no'}  brotli: {'yes' if brotli else 'no'}")
+
+    results = []
+    for name, payload in payloads(args.paragraphs, args.page_size, args.language).items():
+        repeat = max(1, args.repeat // (args.page_size if name == "page" else 1))
+        before_us, before = time_per_call(lambda: (stdlib.dumps(as_dicts(payload)) + "\n").encode("utf-8"), repeat)
+        after_us, after = time_per_call(lambda: dumps_bytes(payload, sort_keys=True) + b"\n", repeat)
+        assert json.loads(before) == json.loads(after)
+        sizes = {"before": len(before), "after": len(after)}
+        for encoding in ("gzip", "br") if brotli else ("gzip",):
+            seconds_us, body = time_per_call(lambda: compress(after, encoding, args.level), max(1, repeat // 10))
+            sizes[encoding] = len(body)
+            sizes[f"{encoding}Us"] = round(seconds_us, 1)
+        row = {"payload": name, "serializeUsBefore": round(before_us, 1), "serializeUsAfter": round(after_us, 1),
+               "speedup": round(before_us / after_us, 1), "bytes": sizes}
+        results.append(row)
+        wire = "  ".join(f"{key} {value:,}" for key, value in sizes.items() if not key.endswith("Us"))
+        print(f"{name:8s} serialize {before_us:9.1f} -> {after_us:8.1f} us ({row['speedup']}x)  bytes: {wire}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({"DREAMS_DB": os.path.join(directory, "dreams.db"), "LLM_BACKEND": "fake",
+                           "APP_WARMUP": "lazy", "ADMISSION_ENABLED": "0", "METERING_ENABLED": "0"})
+        import app as app_module
+        logging.disable(logging.ERROR)
+        page = payloads(args.paragraphs, args.page_size, args.language)["page"]
+        store = app_module.get_dream_store()
+        store.save_many(({"content": item["content"], "mood": item["mood"], "isPublic": True,
+                          "analysis": item["analysis"], "startupIdea": item["startupIdea"].model_dump()}, "key:bench")
+                        for item in page["items"])
+        client = app_module.app.test_client()
+        path = f"/dreams/public?limit={args.page_size}"
+        plain = client.get(path)
+        encoded = client.get(path, headers={"Accept-Encoding": "br, gzip"})
+        revalidated = client.get(path, headers={"Accept-Encoding": "br, gzip", "If-None-Match": encoded.headers["ETag"]})
+        http = {"identity": len(plain.data), encoded.headers.get("Content-Encoding", "identity"): len(encoded.data),
+                "notModified": {"status": revalidated.status_code, "bytes": len(revalidated.data)}}
+        results.append({"payload": "GET /dreams/public", "bytes": http})
+        print(f"GET {path}: {http}")
+
+    write_results(args.output, "serialization", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
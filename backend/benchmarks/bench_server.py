@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Measure concurrent capacity of the production server against the fake LLM
+
+Starts `run.py --production` as a subprocess with LLM_BACKEND=fake, ramps
+client concurrency and reports throughput and tail latency per level. The
+capacity is the highest level whose p95 stays under --slo-ms with no errors.
+With --drain-check it finally sends SIGTERM while requests are in flight and
+reports how many of them still completed.
+
+Usage (from the backend directory):
+    python benchmarks/bench_server.py --workers 2 --threads 32 --levels 8 32 64 128 \
+        --latency lognormal:2000:0.4 --output bench_server.json
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, request_json, summarize, write_results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_production_server(args, port):
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": args.latency,
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_LLM_SEED": str(args.seed),
+        "RESPONSE_CACHE_ENABLED": "1" if args.cache else "0",
+        "ADMISSION_ENABLED": "0",
+    }
+    command = [sys.executable, "run.py", "--production", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--threads", str(args.threads),
+               "--graceful-timeout", str(args.graceful_timeout)]
+    output = None if args.verbose else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Production server exited during startup (is gunicorn installed?)")
+        try:
+            if request_json(base_url + "/ready", timeout=2)[0] == 200:
+                return process, base_url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Production server did not become ready within 60s")
+
+
+def payload(i):
+    return {"content": f"I was flying over a city made of light #{i}", "mood": "excited"}
+
+
+def run_level(base_url, route, concurrency, requests):
+    latencies, errors = [], 0
+
+    def one(i):
+        try:
+            status, elapsed_ms, _, _ = request_json(base_url + route, payload(i))
+        except OSError:
+            return 599, None
+        return status, elapsed_ms
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for status, elapsed_ms in pool.map(one, range(requests)):
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(elapsed_ms)
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughputRps": round(requests / wall, 2),
+        "latencyMs": summarize(latencies),
+    }
+
+
+def drain_check(process, base_url, route, in_flight):
+    """SIGTERM the server with requests in flight and count how many still succeed"""
+    pool = ThreadPoolExecutor(max_workers=in_flight)
+    futures = [pool.submit(request_json, base_url + route, payload(i)) for i in range(in_flight)]
+    time.sleep(0.5)
+    process.send_signal(signal.SIGTERM)
+    completed = 0
+    for future in futures:
+        try:
+            if future.result()[0] < 400:
+                completed += 1
+        except OSError:
+            pass
+    pool.shutdown()
+    process.wait(timeout=300)
+    return {"inFlight": in_flight, "completed": completed, "exitCode": process.returncode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", default="/analyze-dream")
+    parser.add_argument("--levels", type=int, nargs="+", default=[8, 32, 64, 128], help="Client concurrency levels")
+    parser.add_argument("--requests-per-level", type=int, default=0,
+                        help="Requests per level (default: 4x the concurrency)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--graceful-timeout", type=int, default=120)
+    parser.add_argument("--latency", default="lognormal:2000:0.4", help="Fake LLM time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake LLM output token rate (0 = instant)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo-ms", type=float, default=10000.0, help="p95 latency bound used to report capacity")
+    parser.add_argument("--drain-check", action="store_true", help="Finish with a SIGTERM-under-load check")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--output", default="bench_server.json")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's own output")
+    args = parser.parse_args()
+
+    process, base_url = start_production_server(args, free_port())
+    results = {"levels": []}
+    try:
+        for concurrency in args.levels:
+            row = run_level(base_url, args.route, concurrency, args.requests_per_level or concurrency * 4)
+            results["levels"].append(row)
+            print(f"concurrency {concurrency:5d}  {row['throughputRps']:8.2f} req/s  "
+                  f"p50 {row['latencyMs']['p50']} ms  p95 {row['latencyMs']['p95']} ms  "
+                  f"p99 {row['latencyMs']['p99']} ms  errors {row['errors']}")
+        within_slo = [row["concurrency"] for row in results["levels"]
+                      if row["errors"] == 0 and (row["latencyMs"]["p95"] or 0) <= args.slo_ms]
+        results["capacity"] = max(within_slo) if within_slo else 0
+        print(f"Capacity: {results['capacity']} concurrent requests within p95 <= {args.slo_ms} ms")
+        if args.drain_check:
+            results["drain"] = drain_check(process, base_url, args.route, min(args.levels[-1], args.workers * args.threads))
+            print(f"Drain: {results['drain']['completed']}/{results['drain']['inFlight']} in-flight requests "
+                  f"completed after SIGTERM (exit code {results['drain']['exitCode']})")
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            process.wait(timeout=300)
+
+    write_results(args.output, "server", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
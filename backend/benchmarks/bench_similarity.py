@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the near-duplicate dream index at scale
+
+Fills a DreamIndex with --entries random unit vectors (the embedding cost is
+measured separately on real dream text, so filling 100k+ rows stays fast),
+then measures embedding, lookup, insert and save/load latency.
+
+Usage (from the backend directory):
+    python benchmarks/bench_similarity.py --entries 100000 --dim 512 --queries 500 --output bench_similarity.json
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import summarize, write_results
+
+DREAMS = [
+    "I was falling from a tall building and could not scream",
+    "I was flying over a city made of light",
+    "My teeth were crumbling while I gave a presentation at work",
+    "I was lost in a library whose shelves kept rearranging themselves",
+    "A whale swam through the streets of my hometown and people rode on it",
+]
+MOODS = ["anxious", "excited", "calm", "confused", "happy"]
+
+
+def timed(fn, repeat):
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_similarity.json")
+    args = parser.parse_args()
+
+    import numpy as np
+    from similarity import DreamIndex, embed
+
+    rng = np.random.default_rng(args.seed)
+    texts = [f"{random.Random(i).choice(DREAMS)} #{i}" for i in range(args.queries)]
+    results = {"embedMs": timed(lambda i: embed(texts[i], args.dim), args.queries)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dream_index")
+        index = DreamIndex(dim=args.dim, max_entries=args.entries, path=path, save_every=args.entries + 1)
+        vectors = rng.standard_normal((args.entries, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        analysis = {"symbols": [], "emotions": [], "keywords": [], "tone": "", "themes": []}
+
+        started = time.perf_counter()
+        for row in range(args.entries):
+            index.add_vector(vectors[row], MOODS[row % len(MOODS)], analysis)
+        insert_seconds = time.perf_counter() - started
+        results["insert"] = {
+            "entries": args.entries,
+            "insertsPerSecond": round(args.entries / insert_seconds, 1),
+            "bytes": index.stats()["bytes"],
+        }
+
+        queries = [embed(text, args.dim) for text in texts]
+        results["searchMs"] = timed(lambda i: index.search_vector(queries[i], MOODS[i % len(MOODS)]), args.queries)
+        results["searchWithEmbedMs"] = timed(lambda i: index.search(texts[i], MOODS[i % len(MOODS)]), args.queries)
+
+        started = time.perf_counter()
+        index.save()
+        results["saveMs"] = round((time.perf_counter() - started) * 1000.0, 1)
+        started = time.perf_counter()
+        reloaded = DreamIndex(dim=args.dim, max_entries=args.entries, path=path)
+        results["loadMs"] = round((time.perf_counter() - started) * 1000.0, 1)
+        results["reloadedEntries"] = len(reloaded)
+
+    print(f"embed       p50 {results['embedMs']['p50']} ms  p99 {results['embedMs']['p99']} ms")
+    print(f"search      p50 {results['searchMs']['p50']} ms  p99 {results['searchMs']['p99']} ms  "
+          f"({args.entries} entries, dim {args.dim}, {results['insert']['bytes'] / 2**20:.1f} MiB)")
+    print(f"insert      {results['insert']['insertsPerSecond']} /s")
+    print(f"save/load   {results['saveMs']} ms / {results['loadMs']} ms")
+
+    write_results(args.output, "similarity", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
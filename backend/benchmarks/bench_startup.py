@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start cost: import time, time to first /health, /ready and LLM response
+
+Each run is a fresh interpreter so module caches are cold. The child imports
+the app, serves it on a local port and records milliseconds from the start of
+the child script for each milestone. A separate lazy-mode import checks that `import app`
+alone does not pull in LangChain.
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py --runs 5 --output bench_startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import BACKEND_DIR, write_results
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, "benchmarks")
+import app
+imported = time.perf_counter()
+from common import request_json, start_server
+server, base_url = start_server(app.app)
+status = request_json(base_url + "/health")[0]
+first_health = time.perf_counter()
+while request_json(base_url + "/ready")[0] != 200:
+    if app.warm_up.state == "failed":
+        raise SystemExit("warm-up failed: %s" % app.warm_up.error)
+    time.sleep(0.005)
+ready = time.perf_counter()
+request_json(base_url + "/analyze-dream", {"content": "I was flying over a city made of light", "mood": "excited"})
+first_llm = time.perf_counter()
+server.shutdown()
+
+def ms(value):
+    return round((value - started) * 1000, 2)
+
+print(json.dumps({
+    "importMs": ms(imported),
+    "firstHealthMs": ms(first_health),
+    "readyMs": ms(ready),
+    "firstLlmResponseMs": ms(first_llm),
+    "healthStatus": status,
+}))
+"""
+
+MILESTONES = ("importMs", "firstHealthMs", "readyMs", "firstLlmResponseMs")
+
+
+IMPORT_CHECK = "import sys, app; print(any(name.startswith('langchain') for name in sys.modules))"
+
+
+def langchain_imported_by_app(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_CHECK], cwd=BACKEND_DIR, env={**env, "APP_WARMUP": "lazy"},
+                            capture_output=True, text=True, check=True)
+    return output.stdout.strip().splitlines()[-1] == "True"
+
+
+def run_once(env):
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backend", default="fake", help="LLM_BACKEND for the child processes")
+    parser.add_argument("--warmup", default="background", choices=["background", "lazy"], help="APP_WARMUP mode")
+    parser.add_argument("--output", default="bench_startup.json")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "LLM_BACKEND": args.backend,
+        "APP_WARMUP": args.warmup,
+        "RESPONSE_CACHE_ENABLED": "0",
+        "FAKE_LLM_LATENCY": "constant:0",
+    }
+    if args.backend == "openai":
+        # Enough to construct the client; the first-response milestone needs a real key
+        env.setdefault("OPENAI_API_KEY", "sk-startup-benchmark")
+
+    runs = [run_once(env) for _ in range(args.runs)]
+    results = {"runs": runs, "median": {name: round(statistics.median(run[name] for run in runs), 2)
+                                        for name in MILESTONES}}
+    results["langchainImportedByApp"] = langchain_imported_by_app(env)
+    for name in MILESTONES:
+        print(f"{name:20s} median {results['median'][name]:9.2f} ms")
+    if results["langchainImportedByApp"]:
+        print("Warning: `import app` pulled in LangChain; heavy imports are back on the startup path")
+
+    write_results(args.output, "startup", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
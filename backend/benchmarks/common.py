@@ -0,0 +1,83 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, Optional[float]]:
+    """Mean and tail latencies in milliseconds, rounded for reporting"""
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+    return {
+        "mean": rounded(sum(latencies_ms) / len(latencies_ms)) if latencies_ms else None,
+        "p50": rounded(percentile(latencies_ms, 50)),
+        "p95": rounded(percentile(latencies_ms, 95)),
+        "p99": rounded(percentile(latencies_ms, 99)),
+        "max": rounded(max(latencies_ms)) if latencies_ms else None,
+    }
+
+
+def start_server(flask_app) -> Tuple[Any, str]:
+    """Serve a Flask app on an ephemeral port in a background thread"""
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def request_json(url: str, payload: Any = None, headers: Optional[Dict[str, str]] = None,
+                 method: Optional[str] = None, timeout: float = 300.0) -> Tuple[int, float, bytes, Dict[str, str]]:
+    """Send a JSON request and return (status, elapsed_ms, body, headers)"""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method or ("POST" if data is not None else "GET"))
+    request.add_header("Content-Type", "application/json")
+    for name, value in (headers or {}).items():
+        request.add_header(name, value)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            status, response_headers = response.status, dict(response.headers)
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status, response_headers = e.code, dict(e.headers)
+    return status, (time.perf_counter() - started) * 1000.0, body, response_headers
+
+
+def write_results(path: str, name: str, config: Dict[str, Any], results: Any) -> None:
+    """Write a machine-readable benchmark report"""
+    report = {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Results written to {path}")
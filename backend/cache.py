@@ -0,0 +1,239 @@
+"""
+Response cache for LLM-backed endpoints
+Content-addressed keys with an in-memory LRU tier and an optional SQLite tier.
+Expired entries are kept for `stale_ttl` more seconds so they can still be
+served while the upstream is unavailable.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def normalize_text(text: Any) -> str:
+    """Collapse whitespace and case so trivially different inputs share a key"""
+    return " ".join(str(text).split()).lower()
+
+
+def normalize_payload(payload: Any) -> Any:
+    """Recursively normalize every string inside a JSON-like payload"""
+    if isinstance(payload, dict):
+        return {str(key): normalize_payload(value) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [normalize_payload(item) for item in payload]
+    if isinstance(payload, str):
+        return normalize_text(payload)
+    return payload
+
+
+def make_cache_key(namespace: str, payload: Any, model: str, prompt_version: str) -> str:
+    """Build a stable SHA-256 key from a normalized request payload"""
+    canonical = json.dumps(
+        {
+            "namespace": namespace,
+            "payload": normalize_payload(payload),
+            "model": model,
+            "prompt_version": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    """Thread-safe LRU map with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str, stale: bool = False) -> Optional[Any]:
+        """Fresh value for `key`; with `stale`, also one expired less than `stale_ttl` ago"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            now = time.monotonic()
+            if expires_at < now:
+                if expires_at + self.stale_ttl < now:
+                    del self._entries[key]
+                    return None
+                if not stale:
+                    return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """Persistent tier so cached responses survive restarts"""
+
+    def __init__(self, path: str, ttl: float = 86400.0, stale_ttl: float = 0.0):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, stale: bool = False) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if row[1] < now:
+                if row[1] + self.stale_ttl < now:
+                    self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                if not stale:
+                    return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Two-tier cache: memory first, then disk (promoting disk hits to memory)"""
+
+    def __init__(self, memory: MemoryTier, disk: Optional[SQLiteTier] = None, enabled: bool = True):
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypasses": 0, "stores": 0, "stale_hits": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """A value for `key` even if expired (within the stale window), for when the upstream is down"""
+        if not self.enabled:
+            return None
+        value = self.memory.get(key, stale=True)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key, stale=True)
+        if value is not None:
+            self._count("stale_hits")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("stores")
+
+    def record_bypass(self) -> None:
+        self._count("bypasses")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_entries": len(self.disk) if self.disk is not None else None,
+        }
+
+
+def cache_from_env() -> ResponseCache:
+    """Build the response cache from RESPONSE_CACHE_* environment variables"""
+    enabled = os.getenv("RESPONSE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+    stale_ttl = float(os.getenv("RESPONSE_CACHE_STALE_TTL", "86400"))
+    memory = MemoryTier(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        stale_ttl=stale_ttl,
+    )
+    disk = None
+    db_path = os.getenv("RESPONSE_CACHE_DB")
+    if enabled and db_path:
+        disk = SQLiteTier(db_path, ttl=float(os.getenv("RESPONSE_CACHE_DISK_TTL", "86400")), stale_ttl=stale_ttl)
+    return ResponseCache(memory, disk, enabled=enabled)
+
+
+def should_bypass(headers) -> bool:
+    """A client can skip cached reads with X-Cache-Bypass or Cache-Control: no-cache"""
+    if headers.get("X-Cache-Bypass", "").lower() in ("1", "true", "yes"):
+        return True
+    return "no-cache" in headers.get("Cache-Control", "").lower()
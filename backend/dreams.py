@@ -0,0 +1,334 @@
+"""
+Dream persistence
+Dreams are stored with their analysis and startup idea in SQLite (WAL mode).
+Listings use keyset pagination over (created_at, rowid), backed by an index
+per owner and a partial index over public dreams. An FTS5 index covers dream
+content, keywords and startup names. The first page of the public feed is
+kept in memory and rebuilt at most every `feed_refresh` seconds. Every write
+gives the dream the next `updated_seq`, which bulk exports use as their cursor.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dreams (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    owner TEXT NOT NULL,
+    content TEXT NOT NULL,
+    mood TEXT NOT NULL,
+    is_public INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL,
+    updated_seq INTEGER NOT NULL DEFAULT 0,
+    analysis TEXT,
+    startup_idea TEXT,
+    keywords TEXT NOT NULL DEFAULT '',
+    startup_name TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS dreams_owner_created ON dreams (owner, created_at, rowid);
+CREATE INDEX IF NOT EXISTS dreams_public_created ON dreams (created_at, rowid) WHERE is_public = 1;
+CREATE VIRTUAL TABLE IF NOT EXISTS dreams_fts USING fts5(
+    content, keywords, startup_name, content='dreams', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS dreams_fts_insert AFTER INSERT ON dreams BEGIN
+    INSERT INTO dreams_fts (rowid, content, keywords, startup_name)
+    VALUES (new.rowid, new.content, new.keywords, new.startup_name);
+END;
+CREATE TRIGGER IF NOT EXISTS dreams_fts_delete AFTER DELETE ON dreams BEGIN
+    INSERT INTO dreams_fts (dreams_fts, rowid, content, keywords, startup_name)
+    VALUES ('delete', old.rowid, old.content, old.keywords, old.startup_name);
+END;
+CREATE TRIGGER IF NOT EXISTS dreams_fts_update AFTER UPDATE ON dreams BEGIN
+    INSERT INTO dreams_fts (dreams_fts, rowid, content, keywords, startup_name)
+    VALUES ('delete', old.rowid, old.content, old.keywords, old.startup_name);
+    INSERT INTO dreams_fts (rowid, content, keywords, startup_name)
+    VALUES (new.rowid, new.content, new.keywords, new.startup_name);
+END;
+"""
+
+# Columns added after the first release, with how to fill them in for existing rows
+MIGRATIONS = {
+    "updated_at": ("REAL", "created_at"),
+    "updated_seq": ("INTEGER NOT NULL DEFAULT 0", "rowid"),
+}
+
+# The next value of the store-wide write sequence; evaluated inside the write
+# transaction, so concurrent writers (SQLite serializes them) never share one
+NEXT_SEQ = "(SELECT COALESCE(MAX(updated_seq), 0) + 1 FROM dreams)"
+
+COLUMNS = "d.rowid, d.id, d.content, d.mood, d.is_public, d.created_at, d.analysis, d.startup_idea"
+
+
+class DreamConflict(Exception):
+    """A dream ID that already belongs to another owner"""
+
+
+def encode_cursor(created_at: float, rowid: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at!r}:{rowid}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        created_at, rowid = raw.split(":")
+        return float(created_at), int(rowid)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_timestamp(value: Any) -> float:
+    """Epoch seconds from an ISO 8601 string (as sent by JSON.stringify) or a number"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def format_timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def match_query(query: str) -> str:
+    """FTS5 query matching every word of free text (each quoted, the last one as a prefix)"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def dream_row(dream: Dict[str, Any], owner: str) -> Dict[str, Any]:
+    """Column values for a dream as sent by the client"""
+    analysis = dream.get("analysis") or None
+    startup_idea = dream.get("startupIdea") or None
+    now = time.time()
+    return {
+        "id": dream.get("id") or uuid.uuid4().hex,
+        "owner": owner,
+        "content": dream["content"],
+        "mood": dream.get("mood", "neutral"),
+        "is_public": 1 if dream.get("isPublic") else 0,
+        "created_at": parse_timestamp(dream["createdAt"]) if dream.get("createdAt") else now,
+        "updated_at": now,
+        "analysis": json.dumps(analysis, ensure_ascii=False) if analysis else None,
+        "startup_idea": json.dumps(startup_idea, ensure_ascii=False) if startup_idea else None,
+        "keywords": " ".join((analysis or {}).get("keywords", [])),
+        "startup_name": (startup_idea or {}).get("name", ""),
+    }
+
+
+def dream_view(row: sqlite3.Row) -> Dict[str, Any]:
+    """Stored row in the shape of the frontend's Dream type"""
+    view = {
+        "id": row["id"],
+        "content": row["content"],
+        "mood": row["mood"],
+        "isPublic": bool(row["is_public"]),
+        "createdAt": format_timestamp(row["created_at"]),
+    }
+    if row["analysis"]:
+        view["analysis"] = json.loads(row["analysis"])
+    if row["startup_idea"]:
+        view["startupIdea"] = json.loads(row["startup_idea"])
+    return view
+
+
+class Page:
+    """One page of dreams and the cursor for the next one (None on the last page)"""
+
+    def __init__(self, items: List[Dict[str, Any]], next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+class DreamStore:
+    """SQLite-backed dream storage with one connection per thread
+
+    WAL mode lets readers on other threads (and worker processes) run while a
+    write is in progress.
+    """
+
+    def __init__(self, path: str, feed_refresh: float = 5.0, feed_page_size: int = 20):
+        self.path = path
+        self.feed_refresh = feed_refresh
+        self.feed_page_size = feed_page_size
+        self._local = threading.local()
+        self._feed: Optional[Page] = None
+        self._feed_built = 0.0
+        self._feed_lock = threading.Lock()
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        self._migrate(connection)
+        connection.commit()
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        """Add columns missing from a store created by an older version"""
+        existing = {row["name"] for row in connection.execute("PRAGMA table_info(dreams)")}
+        for column, (definition, initial) in MIGRATIONS.items():
+            if column not in existing:
+                connection.execute(f"ALTER TABLE dreams ADD COLUMN {column} {definition}")
+                connection.execute(f"UPDATE dreams SET {column} = {initial}")
+        connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS dreams_updated_seq ON dreams (updated_seq)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def save(self, dream: Dict[str, Any], owner: str) -> Dict[str, Any]:
+        """Insert a dream, or update it if its ID already belongs to `owner`"""
+        row = dream_row(dream, owner)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                "INSERT INTO dreams (id, owner, content, mood, is_public, created_at, updated_at, updated_seq,"
+                " analysis, startup_idea, keywords, startup_name) VALUES (:id, :owner, :content, :mood,"
+                f" :is_public, :created_at, :updated_at, {NEXT_SEQ}, :analysis, :startup_idea, :keywords,"
+                " :startup_name)"
+                " ON CONFLICT (id) DO UPDATE SET content = excluded.content, mood = excluded.mood,"
+                " is_public = excluded.is_public, analysis = excluded.analysis,"
+                " startup_idea = excluded.startup_idea, keywords = excluded.keywords,"
+                " startup_name = excluded.startup_name, updated_at = excluded.updated_at,"
+                f" updated_seq = {NEXT_SEQ} WHERE dreams.owner = excluded.owner",
+                row,
+            )
+            if cursor.rowcount == 0:
+                raise DreamConflict(row["id"])
+        return self.get(row["id"])
+
+    def save_many(self, dreams: Iterable[Tuple[Dict[str, Any], str]]) -> int:
+        """Bulk insert (dream, owner) pairs in one transaction"""
+        connection = self._connection()
+        with connection:
+            cursor = connection.executemany(
+                "INSERT INTO dreams (id, owner, content, mood, is_public, created_at, updated_at, updated_seq,"
+                " analysis, startup_idea, keywords, startup_name) VALUES (:id, :owner, :content, :mood,"
+                f" :is_public, :created_at, :updated_at, {NEXT_SEQ}, :analysis, :startup_idea, :keywords,"
+                " :startup_name)",
+                (dream_row(dream, owner) for dream, owner in dreams),
+            )
+        return cursor.rowcount
+
+    def get(self, dream_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(f"SELECT {COLUMNS} FROM dreams d WHERE d.id = ?", (dream_id,)).fetchone()
+        return dream_view(row) if row else None
+
+    def _page(self, where: str, params: List[Any], limit: int, cursor: Optional[str], query: Optional[str]) -> Page:
+        """Keyset page: by (created_at, rowid) for listings, by rowid (save order) for searches
+
+        Searches walk the FTS index in rowid order, so a page stops after
+        `limit` matches instead of sorting every match of a common word.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        if query:
+            table, order = "dreams_fts f JOIN dreams d ON d.rowid = f.rowid", "f.rowid DESC"
+            where += " AND dreams_fts MATCH ?"
+            params = params + [match_query(query)]
+            if position:
+                where += " AND f.rowid < ?"
+                params.append(position[1])
+        else:
+            table, order = "dreams d", "d.created_at DESC, d.rowid DESC"
+            if position:
+                where += " AND (d.created_at, d.rowid) < (?, ?)"
+                params = params + list(position)
+        rows = self._connection().execute(
+            f"SELECT {COLUMNS} FROM {table} WHERE {where} ORDER BY {order} LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["rowid"])
+        return Page([dream_view(row) for row in rows], next_cursor)
+
+    def list_owner(self, owner: str, limit: int = 20, cursor: Optional[str] = None,
+                   query: Optional[str] = None) -> Page:
+        """An owner's dreams, newest first (most recently saved first when searching)"""
+        return self._page("d.owner = ?", [owner], limit, cursor, query)
+
+    def list_public(self, limit: int = 20, cursor: Optional[str] = None, query: Optional[str] = None) -> Page:
+        """Public dreams, newest first (most recently saved first when searching)"""
+        return self._page("d.is_public = 1", [], limit, cursor, query)
+
+    def public_feed(self) -> Tuple[Page, bool]:
+        """First page of the public feed from memory; returns (page, cached)
+
+        The page is rebuilt once it is older than `feed_refresh` seconds. One
+        caller rebuilds it while the others keep serving the previous page.
+        """
+        feed = self._feed
+        if feed is not None and time.monotonic() - self._feed_built < self.feed_refresh:
+            return feed, True
+        if feed is not None and not self._feed_lock.acquire(blocking=False):
+            return feed, True
+        if feed is None:
+            self._feed_lock.acquire()
+        try:
+            if self._feed is not None and time.monotonic() - self._feed_built < self.feed_refresh:
+                return self._feed, True
+            self._feed = self.list_public(self.feed_page_size)
+            self._feed_built = time.monotonic()
+            return self._feed, False
+        finally:
+            self._feed_lock.release()
+
+    def export_cursor(self) -> int:
+        """Sequence number of the latest write, up to which an export started now reads"""
+        return self._connection().execute("SELECT COALESCE(MAX(updated_seq), 0) FROM dreams").fetchone()[0]
+
+    def export(self, after: int = 0, until: Optional[int] = None, since: Optional[float] = None,
+               public_only: bool = False, batch_size: int = 1000) -> Iterator[List[sqlite3.Row]]:
+        """Dreams in write order with after < updated_seq <= until, in batches of `batch_size` rows
+
+        Saving a dream again moves it to the end of the sequence, so an
+        export after a cursor includes dreams updated since as well as new
+        ones. Each batch is a separate keyset query, so memory stays flat
+        however many dreams there are. `since` keeps dreams created or
+        updated at or after it.
+        """
+        until = self.export_cursor() if until is None else until
+        where, params = "d.updated_seq > ? AND d.updated_seq <= ?", [until]
+        if since is not None:
+            where += " AND d.updated_at >= ?"
+            params.append(since)
+        if public_only:
+            where += " AND d.is_public = 1"
+        while True:
+            rows = self._connection().execute(
+                f"SELECT {COLUMNS}, d.updated_seq FROM dreams d WHERE {where} ORDER BY d.updated_seq LIMIT ?",
+                [after] + params + [batch_size],
+            ).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1]["updated_seq"]
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(is_public), 0) FROM dreams"
+        ).fetchone()
+        return {"dreams": row[0], "public": row[1]}
+
+
+def dream_store_from_env() -> DreamStore:
+    """Build the dream store from DREAMS_* environment variables"""
+    return DreamStore(
+        os.getenv("DREAMS_DB", "dreams.db"),
+        feed_refresh=float(os.getenv("DREAMS_FEED_REFRESH", "5")),
+        feed_page_size=int(os.getenv("DREAMS_PAGE_SIZE", "20")),
+    )
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Bulk export of saved dreams with their analysis and startup idea
+Rows are read from the dream store in keyset batches and encoded batch by
+batch, so memory stays flat however many dreams there are. Formats:
+  ndjson   one dream per line, nested like the /dreams API
+  csv      one flat row per dream; list and object fields as JSON
+  parquet  one row group per batch; keywords, themes and techStack as lists
+  arrow    Arrow IPC stream, one record batch per batch
+Parquet and Arrow need pyarrow. An export covers dreams saved up to the
+moment it starts; pass the cursor it reports to the next export to get only
+the dreams saved since, updates of earlier dreams included.
+
+    python export.py --format parquet --output dreams.parquet
+    python export.py --format ndjson --cursor 120000 --since 2026-01-01T00:00:00Z > new.ndjson
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from dreams import dream_view, format_timestamp
+
+# Format name -> (content type, file extension)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# Flat columns for csv/parquet/arrow; LIST_COLUMNS hold lists of strings
+COLUMNS = [
+    "id", "createdAt", "mood", "isPublic", "content",
+    "tone", "keywords", "themes", "symbols", "emotions",
+    "startupName", "tagline", "description", "problem", "solution", "targetMarket",
+    "businessModel", "techStack", "monetization", "competitiveAdvantage",
+]
+LIST_COLUMNS = ("keywords", "themes", "techStack")
+
+
+def flat_record(row) -> Dict[str, Any]:
+    """One dream as a flat record; symbols and emotions as JSON text"""
+    analysis = json.loads(row["analysis"]) if row["analysis"] else {}
+    startup = json.loads(row["startup_idea"]) if row["startup_idea"] else {}
+    return {
+        "id": row["id"],
+        "createdAt": format_timestamp(row["created_at"]),
+        "mood": row["mood"],
+        "isPublic": bool(row["is_public"]),
+        "content": row["content"],
+        "tone": analysis.get("tone"),
+        "keywords": analysis.get("keywords"),
+        "themes": analysis.get("themes"),
+        "symbols": json.dumps(analysis["symbols"], ensure_ascii=False) if "symbols" in analysis else None,
+        "emotions": json.dumps(analysis["emotions"], ensure_ascii=False) if "emotions" in analysis else None,
+        "startupName": startup.get("name"),
+        "tagline": startup.get("tagline"),
+        "description": startup.get("description"),
+        "problem": startup.get("problem"),
+        "solution": startup.get("solution"),
+        "targetMarket": startup.get("targetMarket"),
+        "businessModel": startup.get("businessModel"),
+        "techStack": startup.get("techStack"),
+        "monetization": startup.get("monetization"),
+        "competitiveAdvantage": startup.get("competitiveAdvantage"),
+    }
+
+
+def ndjson_line(row) -> str:
+    """dream_view(row) as one JSON line, splicing in the stored analysis and startup JSON undecoded"""
+    line = json.dumps(dream_view({**dict(row), "analysis": None, "startup_idea": None}), ensure_ascii=False)[:-1]
+    if row["analysis"]:
+        line += ', "analysis": ' + row["analysis"]
+    if row["startup_idea"]:
+        line += ', "startupIdea": ' + row["startup_idea"]
+    return line + "}\n"
+
+
+def ndjson_chunks(batches: Iterable[List[Any]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(ndjson_line(row) for row in rows).encode("utf-8")
+
+
+class _Lines(list):
+    """csv.writer target collecting the written lines (faster than a growing StringIO for non-ASCII text)"""
+
+    write = list.append
+
+
+def csv_chunks(batches: Iterable[List[Any]]) -> Iterator[bytes]:
+    lines = _Lines()
+    writer = csv.writer(lines)
+    writer.writerow(COLUMNS)
+    for rows in batches:
+        for row in rows:
+            record = flat_record(row)
+            writer.writerow([
+                json.dumps(record[column], ensure_ascii=False) if column in LIST_COLUMNS and record[column] is not None
+                else record[column]
+                for column in COLUMNS
+            ])
+        yield "".join(lines).encode("utf-8")
+        lines.clear()
+    if lines:
+        yield "".join(lines).encode("utf-8")
+
+
+def require_pyarrow():
+    """Import pyarrow, raising RuntimeError with an install hint when it is missing"""
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError as e:
+        raise RuntimeError("Parquet and Arrow exports need pyarrow (pip install pyarrow)") from e
+
+
+def arrow_schema():
+    pa = require_pyarrow()
+    types = {"isPublic": pa.bool_()}
+    return pa.schema([
+        (column, pa.list_(pa.string()) if column in LIST_COLUMNS else types.get(column, pa.string()))
+        for column in COLUMNS
+    ])
+
+
+class _Sink(io.RawIOBase):
+    """Write-only stream whose contents are taken after each batch"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _columnar_chunks(batches: Iterable[List[Any]], open_writer) -> Iterator[bytes]:
+    pa = require_pyarrow()
+    schema = arrow_schema()
+    sink = _Sink()
+    writer = open_writer(sink, schema)
+    try:
+        for rows in batches:
+            records = [flat_record(row) for row in rows]
+            table = pa.Table.from_pydict({column: [record[column] for record in records] for column in COLUMNS},
+                                         schema=schema)
+            writer.write_table(table)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def parquet_chunks(batches: Iterable[List[Any]]) -> Iterator[bytes]:
+    import pyarrow.parquet as pq
+    return _columnar_chunks(batches, lambda sink, schema: pq.ParquetWriter(sink, schema, compression="zstd"))
+
+
+def arrow_chunks(batches: Iterable[List[Any]]) -> Iterator[bytes]:
+    pa = require_pyarrow()
+    return _columnar_chunks(batches, lambda sink, schema: pa.ipc.new_stream(sink, schema))
+
+
+ENCODERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks, "arrow": arrow_chunks}
+
+
+def export_chunks(store, fmt: str, after: int = 0, until: Optional[int] = None, since: Optional[float] = None,
+                  public_only: bool = False, batch_size: int = 1000) -> Iterator[bytes]:
+    """Encoded export of the dream store, as byte chunks of about one batch each
+
+    Raises ValueError for an unknown format and RuntimeError when the format
+    needs pyarrow and it is not installed, before anything is read.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt in ("parquet", "arrow"):
+        require_pyarrow()
+    return ENCODERS[fmt](store.export(after, until, since, public_only, batch_size))
+
+
+def main():
+    from dreams import dream_store_from_env, parse_timestamp
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    parser.add_argument("--cursor", type=int, default=0, help="Export only dreams created or updated after this cursor")
+    parser.add_argument("--since", help="Export only dreams created or updated at or after this ISO 8601 time")
+    parser.add_argument("--public", action="store_true", help="Export only public dreams")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("EXPORT_BATCH_SIZE", "1000")))
+    args = parser.parse_args()
+
+    store = dream_store_from_env()
+    until = store.export_cursor()
+    chunks = export_chunks(store, args.format, after=args.cursor, until=until,
+                           since=parse_timestamp(args.since) if args.since else None,
+                           public_only=args.public, batch_size=args.batch_size)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    # The cursor goes to stderr so stdout stays a clean export
+    print(f"cursor: {until}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Deterministic local stand-in for ChatOpenAI
+Used for benchmarks and offline testing: configurable latency distributions,
+token rates and canned valid/invalid structured outputs, no network access.
+Faults can be injected: a share of calls fail with a 503-like error, and a
+share are slowed down to produce a latency tail.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+CANNED_ANALYSIS = {
+    "symbols": [
+        {"name": "Flying", "meaning": "Freedom and liberation from constraints", "icon": "🦅"},
+        {"name": "City of Light", "meaning": "Clarity, vision and collective energy", "icon": "🌆"},
+    ],
+    "emotions": [
+        {"name": "Excitement", "intensity": 0.8, "color": "#e53e3e"},
+        {"name": "Wonder", "intensity": 0.6, "color": "#805ad5"},
+    ],
+    "keywords": ["flying", "light", "city", "freedom"],
+    "tone": "Optimistic and expansive",
+    "themes": ["Liberation", "Innovation", "Community"],
+}
+
+CANNED_STARTUP = {
+    "name": "Lumenflight",
+    "tagline": "Navigate your city by its brightest ideas",
+    "description": "A civic discovery platform that maps local innovation hubs as a living city of light.",
+    "problem": "People with ideas struggle to find the communities and spaces that would help them take off. " * 4,
+    "solution": "Lumenflight surfaces nearby makerspaces, mentors and events on an interactive light map. " * 4,
+    "targetMarket": "Early-stage founders, students and creative professionals in dense urban areas. " * 4,
+    "businessModel": "Freemium access for individuals with paid listings and analytics for venues. " * 4,
+    "techStack": ["React", "Flask", "PostGIS", "OpenAI API"],
+    "monetization": "Venue subscriptions and promoted events",
+    "competitiveAdvantage": "A community graph built from dream-inspired discovery prompts",
+}
+
+CANNED_CANVAS = {
+    "keyPartners": ["Coworking spaces", "Universities"],
+    "keyActivities": ["Community curation", "Map development"],
+    "keyResources": ["Venue graph", "Engineering team"],
+    "valuePropositions": ["Find your launchpad in minutes"],
+    "customerRelationships": ["Self-service", "Community events"],
+    "channels": ["Web app", "Mobile app", "Campus partnerships"],
+    "customerSegments": ["Founders", "Students", "Creatives"],
+    "costStructure": ["Hosting", "Data acquisition", "Salaries"],
+    "revenueStreams": ["Venue subscriptions", "Promoted listings"],
+}
+
+CANNED_MOCKUP = (
+    "Home screen: a dark map with glowing nodes for each venue. "
+    "Bottom sheet with filters for mentors, events and spaces. "
+    "Profile screen listing saved places and upcoming sessions."
+)
+
+CANNED_SECTION = "This section was regenerated by the fake LLM backend. " * 6
+
+# Substring markers used to recognise which prompt is being answered, checked in order
+TASK_MARKERS = [
+    ("missing or invalid fields", "repair"),
+    ("business model canvas", "canvas"),
+    ("describe what the app interface", "mockup"),
+    ("regenerate the", "section"),
+    ("startup consultant", "startup"),
+    ("dream analyst", "analysis"),
+]
+
+
+def prompt_text(prompt: Any) -> str:
+    """Flatten a string, message list or dict list into plain text"""
+    if isinstance(prompt, str):
+        return prompt
+    parts = []
+    for message in prompt:
+        if isinstance(message, dict):
+            parts.append(str(message.get("content", "")))
+        else:
+            parts.append(str(getattr(message, "content", message)))
+    return "\n".join(parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return max(1, len(text) // 4)
+
+
+class LatencyDistribution:
+    """Parse and sample specs like constant:200, uniform:100:500, normal:800:200, lognormal:800:0.5
+
+    All values are milliseconds except the lognormal sigma.
+    """
+
+    def __init__(self, spec: str = "constant:0"):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("constant", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+    def sample(self, rng: random.Random) -> float:
+        """Return a latency in seconds"""
+        if self.kind == "constant":
+            ms = self.params[0] if self.params else 0.0
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(self.params[0], self.params[1])
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(0.0, sigma) * median
+        return max(0.0, ms) / 1000.0
+
+
+class FakeUpstreamError(Exception):
+    """Injected transient failure, shaped like an OpenAI 503 response"""
+
+    status_code = 503
+
+
+class FakeMessage:
+    """Mimics the AIMessage / AIMessageChunk attributes the app reads"""
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict[str, int]] = None, model_name: str = "fake"):
+        self.content = content
+        self.usage_metadata = usage_metadata
+        self.response_metadata = {"model_name": model_name}
+
+
+class FakeChatModel:
+    """Drop-in replacement for the subset of ChatOpenAI the app uses"""
+
+    def __init__(
+        self,
+        model_name: str = "fake-gpt-4",
+        latency: str = "constant:0",
+        tokens_per_second: float = 0.0,
+        invalid_rate: float = 0.0,
+        seed: int = 0,
+        responses: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = 0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: str = "constant:0",
+        prefill_tokens_per_second: float = 0.0,
+    ):
+        self.model_name = model_name
+        # Output beyond max_tokens is cut off, and calls slower than timeout
+        # raise TimeoutError, as with the real client
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        # Injected faults: error_rate of calls fail after their latency, and
+        # slow_rate of calls take an extra slow_latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = LatencyDistribution(slow_latency)
+        self.latency = LatencyDistribution(latency)
+        self.tokens_per_second = tokens_per_second
+        # Prompt processing rate: with it, time to first token grows with input length
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.invalid_rate = invalid_rate
+        self.responses = {
+            "analysis": CANNED_ANALYSIS,
+            "startup": CANNED_STARTUP,
+            "canvas": CANNED_CANVAS,
+            "mockup": CANNED_MOCKUP,
+            "section": CANNED_SECTION,
+            **(responses or {}),
+        }
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Simulated provider capacity: calls beyond it wait for a free slot (0 = unlimited)
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.calls = 0
+        self.invalid_responses = 0
+        self.injected_errors = 0
+        self.busy_seconds = 0.0
+
+    def classify(self, text: str) -> str:
+        lowered = text.lower()
+        for marker, task in TASK_MARKERS:
+            if marker in lowered:
+                return task
+        return "section"
+
+    def repair_response(self, text: str) -> Dict[str, Any]:
+        """Canned values for the fields listed in a field-repair prompt"""
+        known = {}
+        for task in ("analysis", "startup", "canvas"):
+            if isinstance(self.responses[task], dict):
+                known.update(self.responses[task])
+        fields = re.findall(r"^- (\w+) \(", text, re.M)
+        return {field: known[field] for field in fields if field in known}
+
+    def render(self, text: str) -> str:
+        """Choose the canned output for a prompt, occasionally corrupting it"""
+        task = self.classify(text)
+        response = self.repair_response(text) if task == "repair" else self.responses[task]
+        content = response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+        with self._lock:
+            corrupt = self._rng.random() < self.invalid_rate
+            if corrupt:
+                self.invalid_responses += 1
+        if corrupt and not isinstance(response, str):
+            # Truncate mid-object so the JSON is unparseable
+            digest = int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16)
+            content = content[: max(1, len(content) // 2 + digest % 16)]
+        if self.max_tokens and estimate_tokens(content) > self.max_tokens:
+            content = content[: self.max_tokens * 4]
+        return content
+
+    def _delays(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            first_token = self.latency.sample(self._rng)
+            if self.slow_rate and self._rng.random() < self.slow_rate:
+                first_token += self.slow_latency.sample(self._rng)
+        if self.prefill_tokens_per_second:
+            first_token += input_tokens / self.prefill_tokens_per_second
+        generation = output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        return first_token, generation
+
+    def _maybe_fail(self, delay: float) -> None:
+        """Raise an injected upstream error after `delay` seconds, for error_rate of calls"""
+        with self._lock:
+            fail = self.error_rate and self._rng.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        if fail:
+            self._wait(delay)
+            self._record(delay)
+            raise FakeUpstreamError(f"{self.model_name} is temporarily unavailable (injected)")
+
+    def _usage(self, text: str, content: str) -> Dict[str, int]:
+        input_tokens = estimate_tokens(text)
+        output_tokens = estimate_tokens(content)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.busy_seconds += seconds
+
+    def _wait(self, seconds: float) -> None:
+        """Sleep for a simulated upstream delay, giving up after the timeout"""
+        if self.timeout is not None and seconds > self.timeout:
+            time.sleep(self.timeout)
+            self._record(self.timeout)
+            raise TimeoutError(f"{self.model_name} did not respond within {self.timeout:g}s")
+        time.sleep(seconds)
+
+    @contextmanager
+    def _upstream_slot(self):
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def invoke(self, prompt: Any, **kwargs) -> FakeMessage:
+        text = prompt_text(prompt)
+        content = self.render(text)
+        usage = self._usage(text, content)
+        first_token, generation = self._delays(usage["input_tokens"], usage["output_tokens"])
+        with self._upstream_slot():
+            self._maybe_fail(first_token)
+            self._wait(first_token + generation)
+        self._record(first_token + generation)
+        return FakeMessage(content, usage, self.model_name)
+
+    def stream(self, prompt: Any, **kwargs) -> Iterator[FakeMessage]:
+        text = prompt_text(prompt)
+        content = self.render(text)
+        usage = self._usage(text, content)
+        first_token, generation = self._delays(usage["input_tokens"], usage["output_tokens"])
+        with self._upstream_slot():
+            self._maybe_fail(first_token)
+            self._wait(first_token)
+            chunk_size = 16
+            chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+            per_chunk = generation / len(chunks) if chunks else 0.0
+            for index, chunk in enumerate(chunks):
+                if per_chunk:
+                    time.sleep(per_chunk)
+                last = index == len(chunks) - 1
+                yield FakeMessage(chunk, usage if last else None, self.model_name)
+        self._record(first_token + generation)
+
+    def batch(self, prompts: List[Any], **kwargs) -> List[FakeMessage]:
+        return [self.invoke(prompt) for prompt in prompts]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "invalidResponses": self.invalid_responses,
+                "injectedErrors": self.injected_errors,
+                "busySeconds": round(self.busy_seconds, 4),
+            }
@@ -0,0 +1,306 @@
+"""
+Asynchronous jobs backed by a local SQLite store
+A job is accepted immediately, executed by a worker pool, and its status and
+result are kept in SQLite so clients can poll (or long-poll) for it and
+finished results survive restarts. The process holding a queued or running
+job keeps renewing a lease on it; once a lease expires (the process died, or
+its container was replaced), any other process reclaims and reruns the job.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """SQLite table of jobs; safe to share between threads and worker processes"""
+
+    def __init__(self, path: str, lease: float = 60.0):
+        self.path = path
+        self.lease = lease
+        # Unique per process: hostnames and PIDs repeat across recreated containers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, type TEXT NOT NULL, status TEXT NOT NULL,"
+            " payload TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+            " owner TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);"
+            "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_until" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        self._conn.commit()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def create(self, job_type: str, payload: Any) -> str:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, type, status, payload, owner, created_at, lease_until) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job_type, QUEUED, json.dumps(payload, ensure_ascii=False), self.owner, time.time(),
+             time.time() + self.lease),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def start(self, job_id: str) -> bool:
+        """Mark a queued job as running; False if it is gone or already taken"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ?"
+            " WHERE id = ? AND status = ?",
+            (RUNNING, time.time(), self.owner, time.time() + self.lease, job_id, QUEUED),
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (
+                FAILED if error is not None else SUCCEEDED,
+                None if error is not None else json.dumps(result, ensure_ascii=False),
+                error,
+                time.time(),
+                job_id,
+            ),
+        )
+
+    def renew(self) -> int:
+        """Extend the lease on every unfinished job this process holds"""
+        return self._execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+            (time.time() + self.lease, self.owner, QUEUED, RUNNING),
+        ).rowcount
+
+    def recover(self, max_attempts: int) -> List[str]:
+        """Take over unfinished jobs whose lease expired; fail those out of attempts. Returns the requeued IDs"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, attempts FROM jobs WHERE status IN (?, ?) AND (lease_until IS NULL OR lease_until < ?)"
+                " AND owner IS NOT ?",
+                (QUEUED, RUNNING, now, self.owner),
+            ).fetchall()
+        requeued = []
+        # Each takeover re-checks the lease, so only one process wins a job
+        expired = " WHERE id = ? AND status IN (?, ?) AND (lease_until IS NULL OR lease_until < ?)"
+        for row in rows:
+            if row["attempts"] >= max_attempts:
+                self._execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?" + expired,
+                    (FAILED, "Interrupted too many times", now, row["id"], QUEUED, RUNNING, now),
+                )
+            else:
+                cursor = self._execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?" + expired,
+                    (QUEUED, self.owner, now + self.lease, row["id"], QUEUED, RUNNING, now),
+                )
+                if cursor.rowcount == 1:
+                    requeued.append(row["id"])
+        return requeued
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs that finished before `older_than` (epoch seconds)"""
+        return self._execute("DELETE FROM jobs WHERE finished_at < ?", (older_than,)).rowcount
+
+    def stats(self, window: float = 600.0) -> Dict[str, Dict[str, Any]]:
+        """Per job type: counts by status, mean queue/run time and recent throughput"""
+        since = time.time() - window
+        with self._lock:
+            counts = self._conn.execute("SELECT type, status, COUNT(*) FROM jobs GROUP BY type, status").fetchall()
+            timings = self._conn.execute(
+                "SELECT type, COUNT(*), AVG(started_at - created_at), AVG(finished_at - started_at)"
+                " FROM jobs WHERE finished_at >= ? GROUP BY type",
+                (since,),
+            ).fetchall()
+        stats: Dict[str, Dict[str, Any]] = {}
+        for job_type, status, count in counts:
+            stats.setdefault(job_type, {"counts": {}})["counts"][status] = count
+        for job_type, finished, queue_seconds, run_seconds in timings:
+            stats.setdefault(job_type, {"counts": {}}).update({
+                "finishedRecently": finished,
+                "jobsPerMinute": round(finished * 60.0 / window, 2),
+                "avgQueueMs": round((queue_seconds or 0.0) * 1000, 1),
+                "avgRunMs": round((run_seconds or 0.0) * 1000, 1),
+            })
+        return stats
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public JSON representation of a stored job"""
+    view = {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"],
+    }
+    if job["status"] == SUCCEEDED:
+        view["result"] = json.loads(job["result"])
+    elif job["status"] == FAILED:
+        view["error"] = job["error"]
+    return view
+
+
+class JobRunner:
+    """Executes stored jobs on a thread pool
+
+    `handlers` maps a job type to a function taking the job payload and
+    returning a JSON-serializable result.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Callable[[Any], Any]], workers: int = 4,
+                 retention: float = 86400.0, cleanup_interval: float = 300.0, max_attempts: int = 2,
+                 on_finish: Optional[Callable[[str, str, float, float], None]] = None):
+        self.store = store
+        self.handlers = handlers
+        self.retention = retention
+        self.cleanup_interval = cleanup_interval
+        self.max_attempts = max_attempts
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._finished = threading.Condition()
+        self._active: Dict[str, int] = {QUEUED: 0, RUNNING: 0}
+        self._last_cleanup = 0.0
+        self._heartbeat = None
+        self._recover_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def recover(self) -> None:
+        """Resume jobs with expired leases, and start the heartbeat that keeps doing so (once per runner)"""
+        with self._recover_lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+        self._reclaim()
+        self._heartbeat.start()
+
+    def _reclaim(self) -> None:
+        for job_id in self.store.recover(self.max_attempts):
+            logger.info(f"Resuming interrupted job {job_id}")
+            self._schedule(job_id)
+
+    def _beat(self) -> None:
+        """Renew this process's leases a few times per lease period and take over expired ones"""
+        while not self._stopped.wait(self.store.lease / 3):
+            try:
+                self.store.renew()
+                self._reclaim()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def submit(self, job_type: str, payload: Any) -> str:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        self.recover()
+        job_id = self.store.create(job_type, payload)
+        self._schedule(job_id)
+        self._maybe_cleanup()
+        return job_id
+
+    def _schedule(self, job_id: str) -> None:
+        with self._finished:
+            self._active[QUEUED] += 1
+        self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id: str) -> None:
+        with self._finished:
+            self._active[QUEUED] -= 1
+        if not self.store.start(job_id):
+            return
+        job = self.store.get(job_id)
+        with self._finished:
+            self._active[RUNNING] += 1
+        result, error = None, None
+        try:
+            result = self.handlers[job["type"]](json.loads(job["payload"]))
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['type']}) failed: {str(e)}")
+            error = str(e) or e.__class__.__name__
+        try:
+            self.store.finish(job_id, result, error)
+        finally:
+            with self._finished:
+                self._active[RUNNING] -= 1
+                self._finished.notify_all()
+        if self.on_finish:
+            job = self.store.get(job_id)
+            self.on_finish(job["type"], job["status"], job["started_at"] - job["created_at"],
+                           job["finished_at"] - job["started_at"])
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the job once finished or after `timeout` seconds, whichever comes first
+
+        Jobs finishing in this process wake waiters at once; jobs run by another
+        worker process are noticed by re-reading the store every half second.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            with self._finished:
+                self._finished.wait(min(remaining, 0.5))
+
+    def _maybe_cleanup(self) -> None:
+        now = time.time()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        removed = self.store.purge(now - self.retention)
+        if removed:
+            logger.info(f"Removed {removed} finished jobs older than {self.retention:.0f}s")
+
+    def active(self) -> Dict[str, int]:
+        with self._finished:
+            return dict(self._active)
+
+    def shutdown(self, wait: bool = True) -> None:
+        # Leases stay renewed while accepted jobs drain
+        self._executor.shutdown(wait=wait)
+        self._stopped.set()
+
+
+def job_runner_from_env(handlers: Dict[str, Callable[[Any], Any]], **kwargs) -> JobRunner:
+    """Build the job store and runner from JOB_* environment variables"""
+    return JobRunner(
+        JobStore(os.getenv("JOB_DB", "jobs.db"), lease=float(os.getenv("JOB_LEASE", "60"))),
+        handlers,
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        retention=float(os.getenv("JOB_RETENTION", "86400")),
+        cleanup_interval=float(os.getenv("JOB_CLEANUP_INTERVAL", "300")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "2")),
+        **kwargs,
+    )
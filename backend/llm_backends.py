@@ -0,0 +1,48 @@
+"""
+LLM backend selection
+LLM_BACKEND=openai (default) builds ChatOpenAI; LLM_BACKEND=fake builds the
+local FakeChatModel configured through FAKE_LLM_* environment variables.
+Each model profile (see model_routing.py) gets its own client.
+"""
+
+import os
+
+
+def create_llm(profile, backend=None):
+    """Build the chat model for a model profile on the configured backend"""
+    backend = (backend or os.getenv("LLM_BACKEND", "openai")).lower()
+
+    if backend == "openai":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=profile.model,
+            temperature=profile.temperature,
+            max_tokens=profile.max_tokens,
+            timeout=profile.timeout,
+            # Report token usage on streams too, for metering
+            stream_usage=True,
+            # Retries are done by resilience.py (with backoff, deadline and circuit breaker)
+            max_retries=0 if os.getenv("RESILIENCE_ENABLED", "1").lower() not in ("0", "false", "no") else 2,
+            api_key=os.getenv("OPENAI_API_KEY")
+        )
+
+    if backend == "fake":
+        from fake_llm import FakeChatModel
+        # FAKE_LLM_LATENCY_<TIER> gives one tier its own latency, e.g. a slower quality model
+        latency = os.getenv(f"FAKE_LLM_LATENCY_{profile.tier.upper()}") or os.getenv("FAKE_LLM_LATENCY", "constant:0")
+        return FakeChatModel(
+            model_name=f"fake-{profile.model}",
+            latency=latency,
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0")),
+            prefill_tokens_per_second=float(os.getenv("FAKE_LLM_PREFILL_TOKENS_PER_SECOND", "0")),
+            invalid_rate=float(os.getenv("FAKE_LLM_INVALID_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+            max_concurrency=int(os.getenv("FAKE_LLM_MAX_CONCURRENCY", "0")),
+            max_tokens=profile.max_tokens,
+            timeout=profile.timeout,
+            error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            slow_rate=float(os.getenv("FAKE_LLM_SLOW_RATE", "0")),
+            slow_latency=os.getenv("FAKE_LLM_SLOW_LATENCY", "constant:0")
+        )
+
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
@@ -0,0 +1,126 @@
+"""
+Long dream inputs
+Dreams longer than one chunk are split on paragraph, then sentence, then word
+boundaries into chunks of at most `chunk_tokens`, analysed separately, and
+the partial analyses merged back into one DreamAnalysis. Splitting is greedy
+from the start, so the same text always gives the same chunks, and merging
+depends only on the partial results and chunk sizes.
+"""
+
+import re
+from typing import Any, Callable, Dict, List
+
+# Upper bounds on the merged lists, about what a single analysis returns
+MAX_SYMBOLS = 10
+MAX_EMOTIONS = 8
+MAX_KEYWORDS = 15
+MAX_THEMES = 8
+
+_PARAGRAPHS = re.compile(r"\n\s*\n|\r\n\s*\r\n")
+_SENTENCES = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _pieces(text: str, chunk_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Paragraphs, with any paragraph over the limit broken into sentences, then words"""
+    pieces = []
+    for paragraph in _PARAGRAPHS.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= chunk_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCES.split(paragraph):
+            if count_tokens(sentence) <= chunk_tokens:
+                pieces.append(sentence)
+                continue
+            words = sentence.split()
+            # Words are about a token each; halve the step until a slice fits
+            step = max(1, chunk_tokens)
+            start = 0
+            while start < len(words):
+                piece = " ".join(words[start:start + step])
+                if step > 1 and count_tokens(piece) > chunk_tokens:
+                    step //= 2
+                    continue
+                pieces.append(piece)
+                start += step
+    return pieces
+
+
+def split_text(text: str, chunk_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Greedily pack paragraphs (or sentences, or words) into chunks of at most `chunk_tokens`"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in _pieces(text, chunk_tokens, count_tokens):
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _key(text: Any) -> str:
+    return " ".join(str(text).split()).casefold()
+
+
+def _ranked(items: List[Any], key: Callable[[Any], str], limit: int) -> List[Any]:
+    """First occurrence of each distinct item, most frequent first (ties in order of appearance)"""
+    first: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    for item in items:
+        k = key(item)
+        if not k:
+            continue
+        first.setdefault(k, item)
+        counts[k] = counts.get(k, 0) + 1
+    order = {k: index for index, k in enumerate(first)}
+    return [first[k] for k in sorted(first, key=lambda k: (-counts[k], order[k]))][:limit]
+
+
+def merge_analyses(partials: List[Dict[str, Any]], weights: List[float]) -> Dict[str, Any]:
+    """Merge chunk analyses into one, given each chunk's weight (its length)
+
+    Symbols, keywords and themes are deduplicated case-insensitively and ranked
+    by how many chunks mention them. An emotion's intensity is the
+    weight-averaged intensity over the chunks it appears in, and emotions are
+    ranked by weight times intensity summed over chunks. The tone is the most
+    common one, ties going to the tone of the heaviest chunk.
+    """
+    if len(partials) == 1:
+        return partials[0]
+
+    emotions: Dict[str, Dict[str, Any]] = {}
+    for partial, weight in zip(partials, weights):
+        seen = set()
+        for emotion in partial.get("emotions", []):
+            k = _key(emotion["name"])
+            if k in seen:
+                continue
+            seen.add(k)
+            entry = emotions.setdefault(k, {"emotion": emotion, "weight": 0.0, "weighted": 0.0})
+            entry["weight"] += weight
+            entry["weighted"] += weight * float(emotion["intensity"])
+    merged_emotions = [
+        {**entry["emotion"], "intensity": round(entry["weighted"] / entry["weight"], 3) if entry["weight"] else 0.0}
+        for entry in sorted(emotions.values(), key=lambda entry: -entry["weighted"])
+    ][:MAX_EMOTIONS]
+
+    tones = [(partial.get("tone", ""), weight) for partial, weight in zip(partials, weights) if partial.get("tone")]
+    tone_counts: Dict[str, int] = {}
+    for tone, _ in tones:
+        tone_counts[_key(tone)] = tone_counts.get(_key(tone), 0) + 1
+    tone = max(tones, key=lambda item: (tone_counts[_key(item[0])], item[1]))[0] if tones else ""
+
+    return {
+        "symbols": _ranked([s for p in partials for s in p.get("symbols", [])], lambda s: _key(s["name"]), MAX_SYMBOLS),
+        "emotions": merged_emotions,
+        "keywords": _ranked([k for p in partials for k in p.get("keywords", [])], _key, MAX_KEYWORDS),
+        "tone": tone,
+        "themes": _ranked([t for p in partials for t in p.get("themes", [])], _key, MAX_THEMES),
+    }
@@ -0,0 +1,399 @@
+"""
+Token metering and per-client cost accounting
+Every upstream call's input and output tokens are attributed to the client,
+route and model that caused it. Calls are added to per-thread shards, so a
+thread only ever takes its own lock (contended only by the flusher), and a
+background thread periodically folds the shards into a local SQLite table of
+per-bucket totals shared by all worker processes. Usage reports and
+per-client token quotas are read from there.
+"""
+
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Client whose request is being served (jobs carry it to their worker);
+# copied into worker threads together with the metrics context
+current_client = contextvars.ContextVar("current_client", default="unknown")
+
+# USD per million input and output tokens, matched by longest model name prefix
+DEFAULT_PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+}
+
+Key = Tuple[float, str, str, str]  # (bucket start, client, route, model)
+
+
+class QuotaExceeded(Exception):
+    """A client used up its token quota; retry_after is when its oldest usage leaves the window"""
+
+    def __init__(self, client: str, used: int, quota: int, retry_after: float):
+        super().__init__(f"{client} used {used} of {quota} tokens")
+        self.used = used
+        self.quota = quota
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class Prices:
+    """Token prices per model; fake-<model> is priced as <model> so offline runs show costs"""
+
+    def __init__(self, prices: Dict[str, Tuple[float, float]]):
+        self.prices = prices
+        self._by_length = sorted(prices, key=len, reverse=True)
+
+    def lookup(self, model: str) -> Optional[Tuple[float, float]]:
+        name = model[len("fake-"):] if model.startswith("fake-") else model
+        for prefix in self._by_length:
+            if name.startswith(prefix):
+                return self.prices[prefix]
+        return None
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        price = self.lookup(model)
+        if price is None:
+            return 0.0
+        return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'gpt-4=30:60,gpt-4o-mini=0.15:0.6' -> {model: (input, output)} in USD per million tokens"""
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, rates = item.partition("=")
+        input_price, _, output_price = rates.partition(":")
+        prices[model.strip()] = (float(input_price), float(output_price or input_price))
+    return prices
+
+
+class _Shard:
+    """One thread's unflushed counts: key -> [calls, input tokens, output tokens]"""
+
+    __slots__ = ("lock", "counts", "thread")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Dict[Key, List[int]] = {}
+        self.thread = threading.current_thread()
+
+
+class UsageStore:
+    """SQLite table of usage per bucket, client, route and model; safe to share between worker processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " bucket REAL NOT NULL, client TEXT NOT NULL, route TEXT NOT NULL, model TEXT NOT NULL,"
+            " calls INTEGER NOT NULL, input_tokens INTEGER NOT NULL, output_tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (bucket, client, route, model));"
+            "CREATE INDEX IF NOT EXISTS usage_client_bucket ON usage (client, bucket);"
+        )
+        self._conn.commit()
+
+    def add(self, counts: Dict[Key, List[int]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (bucket, client, route, model) DO UPDATE SET"
+                " calls = calls + excluded.calls,"
+                " input_tokens = input_tokens + excluded.input_tokens,"
+                " output_tokens = output_tokens + excluded.output_tokens",
+                [(*key, *values) for key, values in counts.items()],
+            )
+
+    def rows(self, since: float, client: Optional[str] = None,
+             route: Optional[str] = None) -> List[Tuple[Any, ...]]:
+        sql = "SELECT bucket, client, route, model, calls, input_tokens, output_tokens FROM usage WHERE bucket >= ?"
+        params: List[Any] = [since]
+        if client is not None:
+            sql += " AND client = ?"
+            params.append(client)
+        if route is not None:
+            sql += " AND route = ?"
+            params.append(route)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def client_tokens(self, since: float) -> Dict[str, int]:
+        """Input plus output tokens per client since `since`"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT client, SUM(input_tokens + output_tokens) FROM usage WHERE bucket >= ? GROUP BY client",
+                (since,),
+            ).fetchall()
+        return dict(rows)
+
+    def oldest_bucket(self, client: str, since: float) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(bucket) FROM usage WHERE client = ? AND bucket >= ?", (client, since)
+            ).fetchone()
+        return row[0]
+
+    def purge(self, older_than: float) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM usage WHERE bucket < ?", (older_than,)).rowcount
+
+
+def _totals() -> Dict[str, Any]:
+    return {"calls": 0, "inputTokens": 0, "outputTokens": 0, "totalTokens": 0, "costUsd": 0.0}
+
+
+def _timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+class Meter:
+    """Aggregates token usage in memory and flushes it to a UsageStore
+
+    `quota_tokens` (0 = no quota) caps each client's input plus output tokens
+    over the last `quota_window` seconds. Quotas are checked against totals
+    refreshed at every flush, so a client can overshoot by up to one flush
+    interval of usage, plus the request that crosses the limit.
+    """
+
+    def __init__(self, path: str, bucket_seconds: float = 60.0, flush_interval: float = 10.0,
+                 retention: float = 30 * 86400.0, quota_tokens: int = 0, quota_window: float = 86400.0,
+                 prices: Optional[Prices] = None, enabled: bool = True):
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.quota_tokens = quota_tokens
+        self.quota_window = quota_window
+        self.prices = prices or Prices(DEFAULT_PRICES)
+        self.enabled = enabled
+        self._store: Optional[UsageStore] = None
+        self._store_lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        # Counts taken from the shards whose write failed, retried at the next flush
+        self._unwritten: Dict[Key, List[int]] = {}
+        self._flush_lock = threading.Lock()
+        self._window_tokens: Dict[str, int] = {}
+        self._purged_at = 0.0
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.flush_errors = 0
+
+    @property
+    def store(self) -> UsageStore:
+        """The SQLite store, opened on first use"""
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = UsageStore(self.path)
+        return self._store
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+                if self._flusher is None:
+                    self._start()
+        return shard
+
+    def record(self, client: str, route: str, model: str, usage: Optional[Dict[str, int]]) -> None:
+        """Count one call's tokens from a LangChain usage_metadata dict"""
+        if not self.enabled or not usage:
+            return
+        now = time.time()
+        key = (now - now % self.bucket_seconds, client, route, model)
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        shard = self._shard()
+        with shard.lock:
+            counts = shard.counts.get(key)
+            if counts is None:
+                shard.counts[key] = [1, input_tokens, output_tokens]
+            else:
+                counts[0] += 1
+                counts[1] += input_tokens
+                counts[2] += output_tokens
+
+    def _drain(self) -> Dict[Key, List[int]]:
+        """Take every shard's counts, dropping the shards of threads that have exited"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Key, List[int]] = {}
+        finished = []
+        for shard in shards:
+            with shard.lock:
+                counts, shard.counts = shard.counts, {}
+            _merge(merged, counts)
+            if not shard.thread.is_alive():
+                finished.append(shard)
+        if finished:
+            with self._shards_lock:
+                self._shards = [shard for shard in self._shards if shard not in finished]
+        return merged
+
+    def _snapshot(self) -> Dict[Key, List[int]]:
+        """Unflushed counts, without taking them (call with the flush lock held)"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged = {key: list(values) for key, values in self._unwritten.items()}
+        for shard in shards:
+            with shard.lock:
+                counts = {key: list(values) for key, values in shard.counts.items()}
+            _merge(merged, counts)
+        return merged
+
+    def flush(self) -> None:
+        """Write unflushed counts to the store and refresh the quota totals"""
+        store = self.store
+        with self._flush_lock:
+            _merge(self._unwritten, self._drain())
+            now = time.time()
+            try:
+                if self._unwritten:
+                    store.add(self._unwritten)
+                    self._unwritten = {}
+                if now - self._purged_at > 3600:
+                    store.purge(now - self.retention)
+                    self._purged_at = now
+                if self.quota_tokens:
+                    self._window_tokens = store.client_tokens(now - self.quota_window)
+                self.flushes += 1
+            except sqlite3.Error as e:
+                self.flush_errors += 1
+                logger.warning(f"Token usage flush failed, will retry: {e}")
+
+    def _start(self) -> None:
+        self._flusher = threading.Thread(target=self._run, name="metering-flush", daemon=True)
+        self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write what is left"""
+        self._stop.set()
+        if self._shards or self._unwritten:
+            self.flush()
+
+    def check_quota(self, client: str) -> None:
+        """Raise QuotaExceeded if `client` has used up its tokens for the window"""
+        if not self.enabled or not self.quota_tokens:
+            return
+        if self._flusher is None:
+            # No call recorded yet in this process; usage may still come from other workers
+            with self._shards_lock:
+                if self._flusher is None:
+                    self._start()
+            self.flush()
+        used = self._window_tokens.get(client, 0)
+        if used < self.quota_tokens:
+            return
+        now = time.time()
+        oldest = self.store.oldest_bucket(client, now - self.quota_window)
+        retry_after = (oldest + self.bucket_seconds + self.quota_window - now) if oldest else self.bucket_seconds
+        raise QuotaExceeded(client, used, self.quota_tokens, retry_after)
+
+    def _rows(self, since: float, client: Optional[str], route: Optional[str]) -> List[Tuple[Any, ...]]:
+        """Stored and unflushed rows; the flush lock keeps a concurrent flush from counting twice"""
+        store = self.store
+        with self._flush_lock:
+            rows = store.rows(since, client, route)
+            pending = self._snapshot()
+        for (bucket, row_client, row_route, model), values in pending.items():
+            if bucket >= since and client in (None, row_client) and route in (None, row_route):
+                rows.append((bucket, row_client, row_route, model, *values))
+        return rows
+
+    def _add(self, totals: Dict[str, Any], model: str, calls: int, input_tokens: int, output_tokens: int) -> None:
+        totals["calls"] += calls
+        totals["inputTokens"] += input_tokens
+        totals["outputTokens"] += output_tokens
+        totals["totalTokens"] += input_tokens + output_tokens
+        totals["costUsd"] += self.prices.cost(model, input_tokens, output_tokens)
+
+    def usage(self, window: float, client: Optional[str] = None, route: Optional[str] = None,
+              interval: Optional[float] = None, limit: int = 100) -> Dict[str, Any]:
+        """Totals over the last `window` seconds, per client, route and model
+
+        Includes counts not flushed yet. With `interval`, also a series of
+        totals per interval. Clients and routes are limited to the `limit`
+        largest by tokens.
+        """
+        now = time.time()
+        since = now - window
+        total = _totals()
+        groups: Dict[str, Dict[str, Dict[str, Any]]] = {"clients": {}, "routes": {}, "models": {}}
+        series: Dict[float, Dict[str, Any]] = {}
+        for bucket, row_client, row_route, model, calls, input_tokens, output_tokens in self._rows(since, client, route):
+            targets = [total,
+                       groups["clients"].setdefault(row_client, _totals()),
+                       groups["routes"].setdefault(row_route, _totals()),
+                       groups["models"].setdefault(model, _totals())]
+            if interval:
+                start = since + (bucket - since) // interval * interval
+                targets.append(series.setdefault(start, _totals()))
+            for totals in targets:
+                self._add(totals, model, calls, input_tokens, output_tokens)
+        for totals in [total, *series.values(), *(t for group in groups.values() for t in group.values())]:
+            totals["costUsd"] = round(totals["costUsd"], 6)
+        report = {"since": _timestamp(since), "until": _timestamp(now), "window": window, "total": total}
+        for name, group in groups.items():
+            largest = sorted(group.items(), key=lambda item: -item[1]["totalTokens"])[:limit]
+            report[name] = dict(largest)
+        if interval:
+            report["series"] = [{"start": _timestamp(start), **totals} for start, totals in sorted(series.items())]
+        return report
+
+    def quota(self, client: str) -> Optional[Dict[str, Any]]:
+        """A client's quota and the tokens it has used in the quota window, or None without quotas"""
+        if not self.quota_tokens:
+            return None
+        used = self.usage(self.quota_window, client=client)["total"]["totalTokens"]
+        return {"limit": self.quota_tokens, "used": used, "remaining": max(0, self.quota_tokens - used),
+                "window": self.quota_window}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._shards_lock:
+            shards = len(self._shards)
+        return {"enabled": self.enabled, "shards": shards, "flushes": self.flushes, "flushErrors": self.flush_errors}
+
+
+def _merge(into: Dict[Key, List[int]], counts: Dict[Key, List[int]]) -> None:
+    for key, values in counts.items():
+        existing = into.get(key)
+        if existing is None:
+            into[key] = values
+        else:
+            for index, value in enumerate(values):
+                existing[index] += value
+
+
+def meter_from_env() -> Meter:
+    """Build the meter from METERING_* environment variables"""
+    prices = dict(DEFAULT_PRICES)
+    prices.update(parse_prices(os.getenv("METERING_PRICES", "")))
+    return Meter(
+        os.getenv("METERING_DB", "usage.db"),
+        bucket_seconds=float(os.getenv("METERING_BUCKET_SECONDS", "60")),
+        flush_interval=float(os.getenv("METERING_FLUSH_INTERVAL", "10")),
+        retention=float(os.getenv("METERING_RETENTION_DAYS", "30")) * 86400,
+        quota_tokens=int(os.getenv("METERING_QUOTA_TOKENS", "0")),
+        quota_window=float(os.getenv("METERING_QUOTA_WINDOW", "86400")),
+        prices=Prices(prices),
+        enabled=os.getenv("METERING_ENABLED", "1").lower() not in ("0", "false", "no"),
+    )
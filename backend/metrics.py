@@ -0,0 +1,232 @@
+"""
+In-process metrics with Prometheus text exposition
+Counters, gauges and histograms keyed by label values, plus the per-request
+context (route label, stage timings) used to attribute them.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+
+# Route label and stage timings for the request being served; copied into
+# worker threads with contextvars.copy_context() so fan-out work is attributed
+current_route = contextvars.ContextVar("current_route", default="background")
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            labels = _format_labels(self.labelnames, key)
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+            inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metric families and optional collectors rendered on scrape"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Add a callable returning extra exposition lines (e.g. derived from other stats)"""
+        self._collectors.append(collector)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("route", "method", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served", ("route",))
+STAGE_DURATION = registry.histogram(
+    "request_stage_duration_seconds", "Time spent per processing stage", ("route", "stage"))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens reported by the LLM response metadata", ("route", "profile", "model", "kind"))
+LLM_CALLS = registry.counter(
+    "llm_calls_total", "Upstream LLM calls", ("route", "profile", "model", "outcome"))
+LLM_CALL_DURATION = registry.histogram(
+    "llm_call_duration_seconds", "Upstream LLM call latency per model profile", ("profile", "model", "outcome"))
+LLM_RESILIENCE_EVENTS = registry.counter(
+    "llm_resilience_events_total",
+    "Retries, hedges (hedge_won, hedge_lost), circuit breaker rejections and calls failed after retries",
+    ("profile", "event"))
+PARSE_FAILURES = registry.counter(
+    "llm_parse_failures_total", "Structured outputs that stayed invalid after repair and re-ask", ("route",))
+PROMPT_TOKENS = registry.histogram(
+    "llm_prompt_tokens", "Prompt tokens per call, split into the static prefix and the variable payload",
+    ("route", "prompt", "part"), buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+PROMPT_TRIMS = registry.counter(
+    "llm_prompt_trims_total", "Prompts whose payload was trimmed to fit the token budget", ("route", "prompt"))
+SIMILARITY_LOOKUPS = registry.counter(
+    "dream_index_lookups_total", "Near-duplicate dream index lookups by outcome (reuse, seed, miss)", ("route", "outcome"))
+SIMILARITY_SCORES = registry.histogram(
+    "dream_index_best_similarity", "Cosine similarity of the closest indexed dream", ("route",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0))
+COALESCED = registry.counter(
+    "llm_coalesced_requests_total", "Requests that shared another request's in-flight LLM call", ("route", "scope"))
+ADMISSION_REJECTIONS = registry.counter(
+    "admission_rejections_total", "Requests turned away by admission control (rate_limited, queue_full, queue_timeout)",
+    ("route", "reason"))
+JOBS_FINISHED = registry.counter(
+    "jobs_finished_total", "Async jobs finished, by type and final status", ("type", "status"))
+JOB_DURATION = registry.histogram(
+    "job_duration_seconds", "Time async jobs spent queued and running", ("type", "phase"),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+DREAM_FEED = registry.counter(
+    "dream_feed_requests_total", "Public feed first-page requests served from memory (hit) or rebuilt (refresh)",
+    ("outcome",))
+STRUCTURED_OUTPUTS = registry.counter(
+    "llm_structured_outputs_total", "Structured outputs by outcome (clean, repaired, reasked, failed)",
+    ("route", "schema", "outcome"))
+REASKED_FIELDS = registry.counter(
+    "llm_reasked_fields_total", "Fields requested again because they were missing or invalid", ("route", "schema"))
+LONG_DREAM_CHUNKS = registry.histogram(
+    "long_dream_chunks", "Chunks per dream analysed in long-input (map-reduce) mode", ("route",),
+    buckets=(2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a processing stage of the current route"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, route=current_route.get(), stage=name)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def record_usage(usage: Optional[Dict[str, int]], model: str, profile: str) -> None:
+    """Add token counts from a LangChain usage_metadata dict"""
+    if not usage:
+        return
+    route = current_route.get()
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], route=route, profile=profile, model=model, kind=kind.replace("_tokens", ""))
+
+
+def summarize_timings(timings: List[Tuple[str, float]]) -> Dict[str, float]:
+    """Total milliseconds per stage name for a request's timing log"""
+    totals: Dict[str, float] = {}
+    for name, elapsed in timings:
+        totals[name] = totals.get(name, 0.0) + elapsed * 1000.0
+    return {name: round(value, 2) for name, value in totals.items()}
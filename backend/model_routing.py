@@ -0,0 +1,186 @@
+"""
+Model routing
+Each LLM task is served by a model profile (model, temperature, max output
+tokens, timeout) chosen by tier. Every task has a default tier ("quality"
+for the structured analysis, startup idea and canvas, "fast" for the
+free-text mockup and section rewrites) and a request may ask for another
+one. A task may also set its own output token limit, which replaces its
+tier's on whichever tier serves it, so a long structured result (a whole
+StartupIdea or canvas) is not cut short by a limit sized for short answers.
+One client is built per profile, on first use.
+"""
+
+import contextvars
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+QUALITY = "quality"
+FAST = "fast"
+
+# Tier requested by the request being served (None = the task's default);
+# copied into worker threads together with the metrics context
+requested_tier = contextvars.ContextVar("requested_tier", default=None)
+
+
+class ModelProfile:
+    """Model settings used for every call made at one tier"""
+
+    def __init__(self, tier: str, model: str, temperature: float, max_tokens: Optional[int], timeout: float):
+        self.tier = tier
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+    @property
+    def cache_id(self) -> str:
+        """The settings that change what the model returns, for cache keys"""
+        return f"{self.model}|t={self.temperature}|max={self.max_tokens}"
+
+    def with_max_tokens(self, max_tokens: Optional[int]) -> "ModelProfile":
+        return ModelProfile(self.tier, self.model, self.temperature, max_tokens, self.timeout)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"tier": self.tier, "model": self.model, "temperature": self.temperature,
+                "maxTokens": self.max_tokens, "timeout": self.timeout}
+
+
+class ProfileUsage:
+    """Calls, latency and tokens recorded for one profile"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avgLatencyMs": round(self.seconds * 1000 / self.calls, 1) if self.calls else None,
+            "inputTokens": self.input_tokens,
+            "outputTokens": self.output_tokens,
+        }
+
+
+class ModelRouter:
+    """Resolves a task (and optional tier override) to a profile and its client
+
+    `factory` builds the chat model for a profile. `task_max_tokens` holds
+    the tasks whose output token limit (None = no limit) replaces the tier's.
+    """
+
+    def __init__(self, profiles: Dict[str, ModelProfile], task_tiers: Dict[str, str],
+                 factory: Callable[[ModelProfile], Any], task_max_tokens: Optional[Dict[str, Optional[int]]] = None):
+        unknown = sorted(set(task_tiers.values()) - set(profiles))
+        if unknown:
+            raise ValueError(f"Unknown model tier: {unknown[0]}")
+        self.profiles = profiles
+        self.task_tiers = task_tiers
+        self.task_max_tokens = task_max_tokens or {}
+        self.factory = factory
+        # Profiles with a task's own token limit, per (tier, limit)
+        self._task_profiles: Dict[Tuple[str, Optional[int]], ModelProfile] = {}
+        self._clients: Dict[Tuple[str, Optional[int]], Any] = {}
+        self._pinned = None
+        self._usage = {tier: ProfileUsage() for tier in profiles}
+        self._lock = threading.Lock()
+
+    def check_tier(self, tier: str) -> str:
+        """Return `tier` if it is configured, else raise ValueError"""
+        if tier not in self.profiles:
+            raise ValueError(f"tier must be one of: {', '.join(self.profiles)}")
+        return tier
+
+    def profile(self, task: str) -> ModelProfile:
+        """Profile for a task: the requested tier if any, else the task's default
+
+        With the task's own token limit in place of the tier's, if it has one.
+        """
+        profile = self.profiles[self.check_tier(requested_tier.get() or self.task_tiers[task])]
+        if task not in self.task_max_tokens or self.task_max_tokens[task] == profile.max_tokens:
+            return profile
+        key = (profile.tier, self.task_max_tokens[task])
+        task_profile = self._task_profiles.get(key)
+        if task_profile is None:
+            task_profile = self._task_profiles.setdefault(key, profile.with_max_tokens(key[1]))
+        return task_profile
+
+    def client(self, profile: ModelProfile) -> Any:
+        """The chat model for a profile, built on first call"""
+        if self._pinned is not None:
+            return self._pinned
+        key = (profile.tier, profile.max_tokens)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self.factory(profile)
+        return client
+
+    def use(self, client: Any) -> None:
+        """Serve every profile with one prebuilt client (benchmarks and tests)"""
+        self._pinned = client
+
+    def record(self, profile: ModelProfile, seconds: float, usage: Optional[Dict[str, int]], ok: bool) -> None:
+        usage = usage or {}
+        with self._lock:
+            stats = self._usage[profile.tier]
+            stats.calls += 1
+            stats.errors += 0 if ok else 1
+            stats.seconds += seconds
+            stats.input_tokens += usage.get("input_tokens", 0)
+            stats.output_tokens += usage.get("output_tokens", 0)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            usage = {tier: stats.as_dict() for tier, stats in self._usage.items()}
+        return {
+            "profiles": {tier: {**profile.as_dict(), "usage": usage[tier]} for tier, profile in self.profiles.items()},
+            "tasks": dict(self.task_tiers),
+            "taskMaxTokens": dict(self.task_max_tokens),
+        }
+
+
+def task_env_name(task: str) -> str:
+    """'regenerate-section' -> 'REGENERATE_SECTION'"""
+    return task.replace("-", "_").upper()
+
+
+def model_router_from_env(task_tiers: Dict[str, str], factory: Callable[[ModelProfile], Any],
+                          task_max_tokens: Optional[Dict[str, int]] = None) -> ModelRouter:
+    """Build the router from MODEL_* environment variables
+
+    Each tier is configured with MODEL_<TIER>_NAME, _TEMPERATURE, _MAX_TOKENS
+    (0 = no limit) and _TIMEOUT; `task_tiers` holds each task's default tier,
+    overridable with MODEL_TIER_<TASK>, and `task_max_tokens` the tasks' own
+    output token limits, overridable (or added) with MODEL_MAX_TOKENS_<TASK>.
+    """
+    defaults = {
+        QUALITY: (os.getenv("OPENAI_MODEL", "gpt-4"), 0.9, 1500, 60),
+        FAST: ("gpt-4o-mini", 0.7, 600, 20),
+    }
+    profiles = {}
+    for tier, (model, temperature, max_tokens, timeout) in defaults.items():
+        prefix = f"MODEL_{tier.upper()}_"
+        max_tokens = int(os.getenv(prefix + "MAX_TOKENS", max_tokens))
+        profiles[tier] = ModelProfile(
+            tier,
+            model=os.getenv(prefix + "NAME", model),
+            temperature=float(os.getenv(prefix + "TEMPERATURE", temperature)),
+            max_tokens=max_tokens or None,
+            timeout=float(os.getenv(prefix + "TIMEOUT", timeout)),
+        )
+    configured = {task: os.getenv("MODEL_TIER_" + task_env_name(task), tier).lower()
+                  for task, tier in task_tiers.items()}
+    limits = {}
+    for task in task_tiers:
+        limit = os.getenv("MODEL_MAX_TOKENS_" + task_env_name(task), (task_max_tokens or {}).get(task))
+        if limit is not None:
+            limits[task] = int(limit) or None
+    return ModelRouter(profiles, configured, factory, limits)
+
@@ -0,0 +1,427 @@
+"""
+Prompt registry
+Versioned prompts split into a static prefix (instructions plus output format
+instructions, byte-identical across calls so provider-side prefix caching can
+apply) and a variable payload rendered per request within an input-token budget.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else about four characters per token"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    # Not installed, or the encoding file cannot be downloaded (offline)
+                    logger.info(f"Estimating prompt tokens from length, tiktoken unavailable: {e}")
+                    _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def render_value(value: Any) -> str:
+    """Strings verbatim, everything else as compact JSON"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(", ", ": "))
+
+
+class PromptSpec:
+    """Static definition of a prompt: instructions, payload layout and defaults"""
+
+    def __init__(self, name: str, version: str, instructions: str, payload_template: str,
+                 schema: Optional[str] = None, token_budget: int = 3000):
+        self.name = name
+        self.version = version
+        self.instructions = instructions.strip()
+        self.payload_template = payload_template.strip()
+        self.schema = schema
+        self.token_budget = token_budget
+
+
+class RenderedPrompt:
+    """Messages for one call plus the token accounting reported in metrics"""
+
+    def __init__(self, messages: List[Dict[str, str]], static_tokens: int, payload_tokens: int, trimmed: List[str]):
+        self.messages = messages
+        self.static_tokens = static_tokens
+        self.payload_tokens = payload_tokens
+        self.trimmed = trimmed
+
+    @property
+    def total_tokens(self) -> int:
+        return self.static_tokens + self.payload_tokens
+
+
+class CompiledPrompt:
+    """A PromptSpec with its static prefix assembled and measured once"""
+
+    MAX_TRIM_ROUNDS = 64
+
+    def __init__(self, spec: PromptSpec, format_instructions: str = "", token_budget: Optional[int] = None):
+        self.spec = spec
+        self.name = spec.name
+        self.version = spec.version
+        self.token_budget = token_budget or spec.token_budget
+        self.static_prefix = spec.instructions + ("\n\n" + format_instructions if format_instructions else "")
+        self.static_tokens = count_tokens(self.static_prefix)
+
+    def _payload(self, values: Dict[str, Any]) -> str:
+        return self.spec.payload_template.format(**{key: render_value(value) for key, value in values.items()})
+
+    def fit(self, values: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """Shrink the largest values until the payload fits the budget left after the static prefix
+
+        Lists lose items from the end and strings are cut, in proportion to the overshoot. Returns
+        the fitted values and the names of the fields that were trimmed.
+        """
+        available = max(1, self.token_budget - self.static_tokens)
+        values = dict(values)
+        trimmed = []
+        for _ in range(self.MAX_TRIM_ROUNDS):
+            payload_tokens = count_tokens(self._payload(values))
+            if payload_tokens <= available:
+                break
+            sizes = {key: count_tokens(render_value(value)) for key, value in values.items()}
+            key = max(sizes, key=sizes.get)
+            value = values[key]
+            ratio = max(0.1, 1 - (payload_tokens - available) / max(sizes[key], 1))
+            if isinstance(value, list) and len(value) > 1:
+                values[key] = value[:max(1, min(len(value) - 1, int(len(value) * ratio)))]
+            elif isinstance(value, str) and len(value) > 16:
+                values[key] = value[:max(16, int(len(value) * ratio * 0.95))].rstrip() + "…"
+            else:
+                break
+            if key not in trimmed:
+                trimmed.append(key)
+        return values, trimmed
+
+    def render(self, **values) -> RenderedPrompt:
+        """Build [system: static prefix, user: payload] messages within the token budget"""
+        values, trimmed = self.fit(values)
+        payload = self._payload(values)
+        if trimmed:
+            logger.warning(f"Prompt {self.name} trimmed {', '.join(trimmed)} to fit {self.token_budget} tokens")
+        return RenderedPrompt(
+            [{"role": "system", "content": self.static_prefix}, {"role": "user", "content": payload}],
+            self.static_tokens,
+            count_tokens(payload),
+            trimmed,
+        )
+
+
+class PromptRegistry:
+    """Compiled prompts by name, built once (format instructions need LangChain)"""
+
+    def __init__(self, specs: List[PromptSpec], format_instructions: Callable[[str], str]):
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        for spec in specs:
+            budget = os.getenv("PROMPT_TOKEN_BUDGET_" + spec.name.upper().replace("-", "_"))
+            self._prompts[spec.name] = CompiledPrompt(
+                spec,
+                format_instructions(spec.schema) if spec.schema else "",
+                int(budget) if budget else None,
+            )
+
+    def get(self, name: str) -> CompiledPrompt:
+        return self._prompts[name]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"version": prompt.version, "staticTokens": prompt.static_tokens, "tokenBudget": prompt.token_budget}
+            for name, prompt in self._prompts.items()
+        }
+
+
+DREAM_ANALYSIS = PromptSpec(
+    name="dream-analysis",
+    version="2",
+    schema="DreamAnalysis",
+    token_budget=3000,
+    instructions="""
+You are an expert dream analyst and psychologist. Analyze the dream in the user message and provide a comprehensive breakdown that will be used to generate unique startup ideas.
+
+Please analyze this dream and extract SPECIFIC, UNIQUE elements:
+
+1. SYMBOLIC ELEMENTS:
+- Identify specific objects, people, places, or actions from the dream
+- Provide detailed meanings for each symbol
+- Focus on symbols that could inspire business concepts
+- Use specific emojis that represent each symbol
+
+2. EMOTIONAL ANALYSIS:
+- Identify the specific emotions felt during the dream
+- Rate intensity (0.0 to 1.0) for each emotion
+- Consider how emotions could relate to business opportunities
+- Use appropriate colors for each emotion
+
+3. KEYWORDS AND THEMES:
+- Extract SPECIFIC words and phrases from the dream content
+- Identify unique themes that could inspire business ideas
+- Look for problems, desires, or opportunities mentioned
+- Focus on actionable keywords that could become business concepts
+
+4. OVERALL TONE:
+- Describe the dream's atmosphere and mood
+- Consider how the tone could influence business direction
+- Identify the emotional journey or transformation
+
+5. BUSINESS-RELEVANT ELEMENTS:
+- Problems or challenges mentioned in the dream
+- Desires, aspirations, or goals expressed
+- Social interactions or community aspects
+- Technology, innovation, or transformation elements
+- Environmental, sustainability, or nature themes
+- Communication, connection, or isolation themes
+- Growth, change, or development patterns
+
+IMPORTANT: Make this analysis SPECIFIC to this dream. Do not use generic interpretations. Extract unique elements that could inspire a one-of-a-kind startup idea. The keywords should be directly from the dream content, and the themes should reflect the dream's unique characteristics.
+
+Provide a structured analysis that captures the dream's unique essence and could be used to generate a completely original startup concept.
+""",
+    payload_template="""
+Dream Content: {dream_content}
+Mood: {mood}
+""",
+)
+
+# Same static prefix as DREAM_ANALYSIS; the payload adds the analysis of a
+# similar earlier dream from the similarity index as a starting point
+DREAM_ANALYSIS_SEEDED = PromptSpec(
+    name="dream-analysis-seeded",
+    version="1",
+    schema="DreamAnalysis",
+    token_budget=3500,
+    instructions=DREAM_ANALYSIS.instructions,
+    payload_template="""
+Dream Content: {dream_content}
+Mood: {mood}
+
+Analysis of a similar earlier dream (reuse what still fits, change everything that differs in this dream):
+{seed}
+""",
+)
+
+# Same static prefix as DREAM_ANALYSIS; used for each chunk of a dream too
+# long for one prompt, whose partial analyses are merged by longform.py
+DREAM_ANALYSIS_EXCERPT = PromptSpec(
+    name="dream-analysis-excerpt",
+    version="1",
+    schema="DreamAnalysis",
+    token_budget=3000,
+    instructions=DREAM_ANALYSIS.instructions,
+    payload_template="""
+Dream Content (one excerpt of a longer dream; analyze only what is in this excerpt): {dream_content}
+Mood: {mood}
+""",
+)
+
+STARTUP_GENERATION = PromptSpec(
+    name="startup-generation",
+    version="2",
+    schema="StartupIdea",
+    token_budget=3000,
+    instructions="""
+You are an expert startup consultant and business strategist. Based on the dream analysis in the user message, generate a COMPLETELY UNIQUE startup idea that is DIRECTLY INSPIRED by the specific dream content, keywords, and themes.
+
+CRITICAL REQUIREMENTS:
+1. The startup idea MUST be directly inspired by the specific keywords and themes from this dream
+2. Use the actual dream symbols and their meanings to create the business concept
+3. Incorporate the emotional tone and intensity from the dream
+4. Create a startup that addresses problems or opportunities suggested by the dream content
+5. Make the startup name and concept unique to this specific dream analysis
+6. Avoid generic business ideas - this must be tailored to the dream's unique elements
+
+STARTUP IDEA REQUIREMENTS:
+1. Name: Must be inspired by dream keywords or symbols
+2. Tagline: Should reflect the dream's emotional tone and themes
+3. Problem: Address a real issue suggested by the dream content
+4. Solution: Use dream symbols or themes in the solution approach
+5. Target Market: Based on the dream's social/emotional context
+6. Business Model: Reflect the dream's themes of success/transformation
+7. Technology: Use modern tech that aligns with dream symbols
+8. Monetization: Strategy that fits the dream's themes
+9. Competitive Advantage: Based on unique dream-inspired features
+
+Guidelines for each section:
+
+PROBLEM SECTION:
+- Identify a specific problem that relates to the dream's themes and keywords
+- Use the dream's emotional tone to describe the problem
+- Reference specific dream symbols or situations
+- Should be 2-3 detailed paragraphs
+
+SOLUTION SECTION:
+- Explain how the solution incorporates dream symbols or themes
+- Use the dream's keywords in describing the approach
+- Describe features that reflect the dream's emotional journey
+- Should be 2-3 detailed paragraphs
+
+TARGET MARKET SECTION:
+- Define audience based on the dream's social/emotional context
+- Use dream themes to identify market characteristics
+- Explain why this market connects to the dream's symbols
+- Should be 2-3 detailed paragraphs
+
+BUSINESS MODEL SECTION:
+- Create revenue strategy that reflects dream themes of success
+- Use dream symbols to inspire pricing or delivery models
+- Explain growth potential based on dream's transformative themes
+- Should be 2-3 detailed paragraphs
+
+Make the startup idea creative, innovative, and PRACTICALLY IMPLEMENTABLE. Do NOT generate a generic business idea: this must be a one-of-a-kind concept that could only come from this specific dream analysis.
+""",
+    payload_template="""
+Dream Analysis:
+Symbols: {symbols}
+Emotions: {emotions}
+Keywords: {keywords}
+Tone: {tone}
+Themes: {themes}
+""",
+)
+
+BUSINESS_MODEL = PromptSpec(
+    name="business-model",
+    version="3",
+    schema="BusinessModelCanvas",
+    token_budget=2000,
+    instructions="""
+Based on the startup idea in the user message, create a comprehensive business model canvas.
+
+Each field is a list of short strings.
+""",
+    payload_template="""
+Startup: {name}
+Description: {description}
+Problem: {problem}
+Solution: {solution}
+Target Market: {targetMarket}
+""",
+)
+
+MOCKUP = PromptSpec(
+    name="mockup",
+    version="2",
+    token_budget=1500,
+    instructions="""
+Based on the startup idea in the user message, describe what the app interface should look like.
+
+Describe the main screens and UI elements for this app.
+""",
+    payload_template="""
+Startup: {name}
+Description: {description}
+Target Market: {targetMarket}
+""",
+)
+
+FIELD_REPAIR = PromptSpec(
+    name="field-repair",
+    version="1",
+    token_budget=3000,
+    instructions="""
+A previous answer to the request in the user message was missing some fields or had invalid values for them.
+
+Provide only the missing or invalid fields listed in the user message, consistent with the fields already answered.
+Return only a JSON object with exactly those keys and no other text.
+""",
+    payload_template="""
+Original request:
+{request}
+
+Already answered:
+{answered}
+
+Missing or invalid fields:
+{fields}
+""",
+)
+
+SECTION_INSTRUCTIONS = {
+    "problem": ("PROBLEM", "problem statement", """
+- Identifies a specific, real-world problem this startup solves
+- Describes pain points and challenges faced by the target audience
+- Includes relevant statistics or market data
+- Makes it compelling and relatable
+""", ("name", "tagline", "description")),
+    "solution": ("SOLUTION", "solution description", """
+- Explains exactly how this startup solves the identified problem
+- Describes the unique approach and methodology
+- Includes key features and capabilities
+- Explains the technology or innovation behind it
+""", ("name", "tagline", "description", "problem")),
+    "targetMarket": ("TARGET MARKET", "target market description", """
+- Defines the specific target audience in detail
+- Includes demographics, psychographics, and behavioral patterns
+- Describes market size and potential
+- Explains why this market is ideal for the solution
+""", ("name", "tagline", "description", "problem", "solution")),
+    "businessModel": ("BUSINESS MODEL", "business model description", """
+- Explains the revenue generation strategy in detail
+- Describes pricing models and monetization approaches
+- Includes cost structure and operational model
+- Explains scalability and growth potential
+""", ("name", "tagline", "description", "problem", "solution", "targetMarket")),
+}
+
+SECTION_LABELS = {
+    "name": "Startup Name",
+    "tagline": "Tagline",
+    "description": "Description",
+    "problem": "Problem",
+    "solution": "Solution",
+    "targetMarket": "Target Market",
+}
+
+
+def section_prompt_name(section: str) -> str:
+    return f"section-{section}"
+
+
+def _section_spec(section: str, title: str, noun: str, bullets: str, fields) -> PromptSpec:
+    return PromptSpec(
+        name=section_prompt_name(section),
+        version="2",
+        token_budget=2000,
+        instructions=f"""
+Based on the startup idea in the user message, regenerate the {title} section with detailed, specific content.
+
+Create a comprehensive {noun} that:
+{bullets.strip()}
+- Is 2-3 detailed paragraphs
+
+Focus on making this section unique to this specific startup idea. Reply with the section text only.
+""",
+        payload_template="\n".join(f"{SECTION_LABELS[field]}: {{{field}}}" for field in fields),
+    )
+
+
+SECTION_FIELDS = {section: fields for section, (_, _, _, fields) in SECTION_INSTRUCTIONS.items()}
+
+PROMPT_SPECS = [DREAM_ANALYSIS, DREAM_ANALYSIS_SEEDED, DREAM_ANALYSIS_EXCERPT, STARTUP_GENERATION, BUSINESS_MODEL, MOCKUP, FIELD_REPAIR] + [
+    _section_spec(section, *definition) for section, definition in SECTION_INSTRUCTIONS.items()
+]
+
+_SPECS_BY_NAME = {spec.name: spec for spec in PROMPT_SPECS}
+
+
+def prompt_version(name: str) -> str:
+    """Version of a registered prompt, available without building the registry"""
+    return _SPECS_BY_NAME[name].version
@@ -0,0 +1,83 @@
+"""
+Background warm-up and readiness state
+Heavy imports and client construction run once, off the import path, so a
+process can answer liveness probes immediately and report readiness later.
+A failed warm-up is tried again on the next start() after an exponential
+backoff, so a dependency that was briefly down at startup does not leave
+the process unready until it restarts.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class WarmUp:
+    """Run a warm-up callable until it succeeds once and track its progress
+
+    After the n-th failure another attempt is allowed `retry_base * 2**(n-1)`
+    seconds later (at most `retry_max`).
+    """
+
+    def __init__(self, fn: Callable[[], Any], retry_base: float = 1.0, retry_max: float = 60.0):
+        self.fn = fn
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.attempts = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self.state == "failed" and time.monotonic() >= self._retry_at:
+                self._done.clear()
+            elif self.state != "pending":
+                return False
+            self.state = "warming"
+            self.attempts += 1
+            return True
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.fn()
+            self.error = None
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self._retry_at = time.monotonic() + min(self.retry_max, self.retry_base * 2 ** (self.attempts - 1))
+            self.state = "failed"
+        finally:
+            self.duration = time.perf_counter() - started
+            self._done.set()
+
+    def start(self) -> None:
+        """Begin warming in a daemon thread unless already running, ready, or backing off after a failure"""
+        if self._claim():
+            threading.Thread(target=self._run, name="warm-up", daemon=True).start()
+
+    def run(self, timeout: Optional[float] = None) -> bool:
+        """Warm up in the calling thread (or wait for a running warm-up); True when ready"""
+        if self._claim():
+            self._run()
+        self._done.wait(timeout)
+        return self.state == "ready"
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        status = {
+            "state": self.state,
+            "durationMs": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "error": self.error,
+            "attempts": self.attempts,
+        }
+        if self.state == "failed":
+            status["retryInMs"] = round(max(0.0, self._retry_at - time.monotonic()) * 1000)
+        return status
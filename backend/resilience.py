@@ -0,0 +1,359 @@
+"""
+Resilience for upstream LLM calls
+Each upstream (one per model profile) gets a circuit breaker, retries with
+jittered exponential backoff inside a deadline, and hedging: when a call is
+slower than a recent latency percentile, a duplicate is sent and whichever
+answers first wins. Hedges are rationed by a budget so an upstream slowdown
+does not double the load on it.
+"""
+
+import collections
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# HTTP statuses worth another attempt: timeouts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpen(Exception):
+    """The upstream's circuit breaker is open; retry after `retry_after` seconds"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Upstream {name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class DeadlineExceeded(TimeoutError):
+    """No attempt succeeded within the call's deadline"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient upstream failures: timeouts, connection errors, 429 and 5xx responses"""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+class CircuitBreaker:
+    """Opens when the failure rate over the last `window` calls reaches `failure_rate`
+
+    While open, calls are refused for `cooldown` seconds; then one probe call is
+    let through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window: int = 20, min_calls: int = 10, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes: "collections.deque[bool]" = collections.deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self, name: str) -> None:
+        """Raise CircuitOpen unless a call may go ahead"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpen(name, max(remaining, 1.0))
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN and self._probing:
+                self._probing = False
+                if ok:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures >= self.failure_rate * len(self._outcomes)):
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "trips": self.trips, "recentCalls": len(self._outcomes),
+                    "recentFailures": self._outcomes.count(False)}
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful attempts, for the hedge delay"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: "collections.deque[float]" = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """The latency at `quantile`, or None until `min_samples` have been seen"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+class ResiliencePolicy:
+    """Retry, hedge and breaker settings shared by every upstream"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 90.0, hedge_quantile: float = 0.95, min_hedge_delay: float = 0.05,
+                 hedge_budget: float = 0.1, failure_rate: float = 0.5, window: int = 20,
+                 min_calls: int = 10, cooldown: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.hedge_budget = hedge_budget
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+
+
+class Upstream:
+    """Breaker, latency history and hedge budget for one upstream"""
+
+    def __init__(self, name: str, policy: ResiliencePolicy):
+        self.name = name
+        self.breaker = CircuitBreaker(policy.failure_rate, policy.window, policy.min_calls, policy.cooldown)
+        self.latency = LatencyTracker()
+        # Each call earns `hedge_budget` hedge tokens (up to 10) and a hedge spends one
+        self._hedge_tokens = 1.0
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "hedges": 0, "hedgesWon": 0, "rejected": 0, "failed": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def earn_hedge(self, rate: float) -> None:
+        with self._lock:
+            self._hedge_tokens = min(10.0, self._hedge_tokens + rate)
+
+    def take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            return True
+
+
+class Resilience:
+    """Runs upstream calls with breaker, retries and hedging
+
+    `on_event(upstream, event)` is told about every retry, hedge (hedge_won /
+    hedge_lost), breaker rejection and failed call, for metrics. Once an
+    upstream has a latency history its calls run on a pool of `hedge_workers`
+    threads, so the pool must fit every thread that can call upstream at once
+    plus their hedges, or it caps upstream concurrency.
+    """
+
+    def __init__(self, policy: ResiliencePolicy, enabled: bool = True, hedge_workers: int = 64,
+                 on_event: Optional[Callable[[str, str], None]] = None, seed: Optional[int] = None):
+        self.policy = policy
+        self.enabled = enabled
+        self.on_event = on_event
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="hedge")
+        self._upstreams: Dict[str, Upstream] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def upstream(self, name: str) -> Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            with self._lock:
+                upstream = self._upstreams.setdefault(name, Upstream(name, self.policy))
+        return upstream
+
+    def _event(self, upstream: Upstream, event: str) -> None:
+        if self.on_event:
+            self.on_event(upstream.name, event)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+        cap = min(self.policy.max_delay, self.policy.base_delay * 2 ** (attempt - 1))
+        with self._lock:
+            return self._rng.uniform(0, cap)
+
+    def call(self, name: str, fn: Callable[[], Any], hedge: bool = True) -> Any:
+        """Run `fn` against upstream `name`; `fn` must be safe to run more than once
+
+        Raises CircuitOpen without calling `fn` while the breaker is open, and
+        the last error once retries or the deadline run out.
+        """
+        if not self.enabled:
+            return fn()
+        upstream = self.upstream(name)
+        upstream.count("calls")
+        upstream.earn_hedge(self.policy.hedge_budget)
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 1
+        while True:
+            try:
+                upstream.breaker.before_call(name)
+            except CircuitOpen:
+                upstream.count("rejected")
+                self._event(upstream, "rejected")
+                raise
+            try:
+                result = self._attempt(upstream, fn, deadline, hedge)
+            except Exception as e:
+                retryable = is_retryable(e)
+                # Errors the upstream is not to blame for (bad requests) leave the breaker alone
+                upstream.breaker.record(not retryable)
+                delay = self.backoff(attempt)
+                if not retryable or attempt >= self.policy.max_attempts or time.monotonic() + delay >= deadline:
+                    upstream.count("failed")
+                    self._event(upstream, "failed")
+                    raise
+                upstream.count("retries")
+                self._event(upstream, "retry")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            upstream.breaker.record(True)
+            return result
+
+    def _attempt(self, upstream: Upstream, fn: Callable[[], Any], deadline: float, hedge: bool) -> Any:
+        """One try, hedged once it runs past the upstream's latency percentile"""
+        delay = upstream.latency.percentile(self.policy.hedge_quantile) if hedge and self.policy.hedge_quantile else None
+        if delay is None:
+            started = time.monotonic()
+            result = fn()
+            if hedge:
+                upstream.latency.add(time.monotonic() - started)
+            return result
+
+        primary, started = self._submit(upstream, fn)
+        # Time spent queued for a pool thread is not upstream latency: the hedge
+        # clock starts when the primary does, so a backlog does not set off hedges
+        started.wait(timeout=max(0.0, deadline - time.monotonic()))
+        done, _ = wait([primary], timeout=max(delay, self.policy.min_hedge_delay))
+        if done or not upstream.take_hedge():
+            return self._first_success([primary], deadline)[0]
+        upstream.count("hedges")
+        backup, _ = self._submit(upstream, fn)
+        result, winner = self._first_success([primary, backup], deadline)
+        if winner is backup:
+            upstream.count("hedgesWon")
+        self._event(upstream, "hedge_won" if winner is backup else "hedge_lost")
+        return result
+
+    def _submit(self, upstream: Upstream, fn: Callable[[], Any]):
+        """Run `fn` on the pool; returns its future and an event set once it starts running"""
+        started_event = threading.Event()
+
+        def timed():
+            started_event.set()
+            started = time.monotonic()
+            result = fn()
+            upstream.latency.add(time.monotonic() - started)
+            return result
+        return self._executor.submit(contextvars.copy_context().run, timed), started_event
+
+    def _first_success(self, futures: List, deadline: float):
+        """The first successful result among `futures` and its future; the others are cancelled
+
+        Raises the last error if all of them fail, or DeadlineExceeded.
+        """
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A loser that has already started runs to completion; its result is dropped
+                    for other in pending:
+                        other.cancel()
+                    return future.result(), future
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        for future in pending:
+            future.cancel()
+        raise DeadlineExceeded(f"No upstream response within {self.policy.deadline:g}s")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+        stats = {}
+        for upstream in upstreams:
+            delay = upstream.latency.percentile(self.policy.hedge_quantile)
+            with upstream._lock:
+                counts = dict(upstream.counts)
+            stats[upstream.name] = {
+                "breaker": upstream.breaker.stats(),
+                "hedgeDelayMs": round(max(delay, self.policy.min_hedge_delay) * 1000, 1) if delay is not None else None,
+                **counts,
+            }
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def resilience_from_env(upstream_threads: int = 32, **kwargs) -> Resilience:
+    """Build the resilience layer from RESILIENCE_* environment variables
+
+    `upstream_threads` is how many threads may call upstream at once; the
+    hedge pool defaults to twice that, room for each call and one hedge.
+    """
+    policy = ResiliencePolicy(
+        max_attempts=int(os.getenv("RESILIENCE_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("RESILIENCE_BACKOFF_BASE", "0.5")),
+        max_delay=float(os.getenv("RESILIENCE_BACKOFF_MAX", "8")),
+        deadline=float(os.getenv("RESILIENCE_DEADLINE", "90")),
+        hedge_quantile=float(os.getenv("RESILIENCE_HEDGE_QUANTILE", "0.95")),
+        min_hedge_delay=float(os.getenv("RESILIENCE_HEDGE_MIN_DELAY", "0.05")),
+        hedge_budget=float(os.getenv("RESILIENCE_HEDGE_BUDGET", "0.1")),
+        failure_rate=float(os.getenv("RESILIENCE_BREAKER_FAILURE_RATE", "0.5")),
+        window=int(os.getenv("RESILIENCE_BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("RESILIENCE_BREAKER_MIN_CALLS", "10")),
+        cooldown=float(os.getenv("RESILIENCE_BREAKER_COOLDOWN", "30")),
+    )
+    return Resilience(
+        policy,
+        enabled=os.getenv("RESILIENCE_ENABLED", "1").lower() not in ("0", "false", "no"),
+        hedge_workers=int(os.getenv("RESILIENCE_HEDGE_WORKERS", str(2 * upstream_threads))),
+        **kwargs,
+    )
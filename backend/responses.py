@@ -0,0 +1,199 @@
+"""
+Response layer: fast JSON, compression and conditional requests
+JSON is encoded with orjson when it is installed (stdlib json otherwise),
+Pydantic models included. Finished responses get a strong ETag derived from
+a hash of their body, GET/HEAD requests whose If-None-Match matches it get
+304 Not Modified, and bodies above a size threshold are compressed with
+brotli (when installed) or gzip, as the client's Accept-Encoding allows.
+Streamed responses are compressed on the fly and flushed chunk by chunk;
+Server-Sent Events are left alone, as some proxies buffer encoded streams.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from functools import partial
+from typing import Any, Iterable, Iterator, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only text-like types are worth compressing; images, Parquet and Arrow data are not
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html",
+                      "application/javascript")
+
+
+def _to_jsonable(value: Any) -> Any:
+    """orjson `default`: Pydantic models as their JSON-mode dump, anything else as Flask does"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return DefaultJSONProvider.default(value)
+
+
+def dumps_bytes(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON, with orjson when available
+
+    Falls back to the stdlib for what orjson rejects (e.g. integers beyond 64 bits).
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, default=_to_jsonable, option=option)
+        except TypeError:
+            pass
+    return json.dumps(value, default=_to_jsonable, ensure_ascii=False, separators=(",", ":"),
+                      sort_keys=sort_keys).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with dumps_bytes; keys stay sorted like Flask's default
+
+    Debug mode (pretty-printed output) and explicit dumps() options go
+    through the stdlib provider unchanged.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, sort_keys=self.sort_keys).decode("utf-8")
+
+    def response(self, *args: Any, **kwargs: Any):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, sort_keys=self.sort_keys) + b"\n", mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The best of br (when brotli is installed) and gzip the client accepts, or None"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda encoding: accepted.get(encoding, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int) -> Iterator[bytes]:
+    """Compress a streamed body, flushing after every chunk so progressive streams stay progressive"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(level, 11))
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, flush, finish = compressor.compress, partial(compressor.flush, zlib.Z_SYNC_FLUSH), compressor.flush
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield process(chunk.encode("utf-8") if isinstance(chunk, str) else chunk) + flush()
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def etag_matches(if_none_match: str, tag: str) -> bool:
+    """Whether If-None-Match lists `tag` (weak comparison, as RFC 9110 requires for it) or is *"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+class ResponseLayer:
+    """Applies ETags, 304s and compression to a finished response"""
+
+    def __init__(self, etags: bool = True, compression: bool = True, min_bytes: int = 1024, level: int = 6):
+        self.etags = etags
+        self.compression = compression
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def _compressible(self, response) -> bool:
+        return (self.compression and "Content-Encoding" not in response.headers
+                and response.mimetype in COMPRESSIBLE_TYPES and 200 <= response.status_code < 300
+                and response.status_code != 204)
+
+    def finish(self, request, response):
+        """Return the response to send for `request`, with validators and encoding applied"""
+        if response.direct_passthrough and not response.is_streamed:
+            return response
+        if response.is_streamed:
+            if not self._compressible(response):
+                return response
+            encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+            if encoding is None:
+                return response
+            response.response = compress_stream(response.response, encoding, self.level)
+            response.headers["Content-Encoding"] = encoding
+            response.headers.pop("Content-Length", None)
+            response.vary.add("Accept-Encoding")
+            return response
+
+        body = response.get_data()
+        compressible = self._compressible(response)
+        if compressible:
+            response.vary.add("Accept-Encoding")
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", "")) if compressible else None
+        if encoding and len(body) < self.min_bytes:
+            encoding = None
+
+        if self.etags and response.status_code == 200 and "ETag" not in response.headers:
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            # A strong validator names one representation, so encoded bodies get their own tag
+            tag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+            response.headers["ETag"] = tag
+            if request.method in ("GET", "HEAD") and etag_matches(request.headers.get("If-None-Match", ""), tag):
+                response.status_code = 304
+                response.set_data(b"")
+                response.headers.pop("Content-Length", None)
+                response.headers.pop("Content-Type", None)
+                return response
+
+        if encoding:
+            response.set_data(compress(body, encoding, self.level))
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def response_layer_from_env() -> ResponseLayer:
+    """Build the response layer from RESPONSE_* environment variables"""
+    def flag(name: str, default: str) -> bool:
+        return os.getenv(name, default).lower() not in ("0", "false", "no")
+    return ResponseLayer(
+        etags=flag("RESPONSE_ETAGS", "1"),
+        compression=flag("RESPONSE_COMPRESSION", "1"),
+        min_bytes=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024")),
+        level=int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "6")),
+    )
@@ -2,29 +2,45 @@
 """
 Dream to Startup Generator Backend
 Flask server with LangChain integration
+
+    python run.py                 # Flask development server with the reloader
+    python run.py --production    # gunicorn, see server.py for the SERVER_* settings
 """
 
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
 
+from server import add_server_arguments, options_from_env, serve
+
 # Load environment variables
 load_dotenv()
 
-# Check if OpenAI API key is set
-if not os.getenv("OPENAI_API_KEY"):
+# Check if OpenAI API key is set (not needed for the local fake backend)
+if os.getenv("LLM_BACKEND", "openai").lower() == "openai" and not os.getenv("OPENAI_API_KEY"):
     print("❌ Error: OPENAI_API_KEY environment variable is not set!")
     print("Please create a .env file with your OpenAI API key:")
     print("OPENAI_API_KEY=your_api_key_here")
     sys.exit(1)
 
-# Import and run the Flask app
-from app import app
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Dream to Startup Generator backend")
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("SERVER_MODE", "development").lower() == "production",
+                        help="Serve with gunicorn instead of the Flask dev server [env: SERVER_MODE=production]")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 5000)))
+    add_server_arguments(parser)
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
+    args = parse_args()
     print("🚀 Starting Dream to Startup Generator Backend...")
-    print("📍 API will be available at: http://localhost:5000")
-    print("🔗 Health check: http://localhost:5000/health")
+    print(f"📍 API will be available at: http://localhost:{args.port}")
+    print(f"🔗 Health check: http://localhost:{args.port}/health")
     print("📚 API Documentation:")
     print("   POST /analyze-dream - Analyze dream content")
     print("   POST /generate-startup - Generate startup idea")
@@ -32,5 +48,13 @@ if __name__ == '__main__':
     print("   POST /generate-mockup - Generate app mockup")
     print()
     
-    port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    if args.production:
+        # CLI flags override SERVER_* environment variables
+        options = options_from_env()
+        options.update({name: value for name, value in vars(args).items() if name in options and value is not None})
+        print(f"🏭 Production mode: {options['workers']} workers x {options['threads']} threads ({options['worker_class']})")
+        serve(args.host, args.port, options)
+    else:
+        # Import and run the Flask app
+        from app import app
+        app.run(host=args.host, port=args.port, debug=True, threaded=True)
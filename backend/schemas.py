@@ -0,0 +1,56 @@
+"""
+Pydantic models for structured LLM output
+Kept out of app.py so importing the app does not pull in pydantic; loaded on
+first use or during warm-up.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class Symbol(BaseModel):
+    name: str = Field(description="The name of the symbol")
+    meaning: str = Field(description="The symbolic meaning of this element")
+    icon: str = Field(description="An emoji icon representing this symbol")
+
+class Emotion(BaseModel):
+    name: str = Field(description="The name of the emotion")
+    intensity: float = Field(description="Intensity of the emotion (0.0 to 1.0)")
+    color: str = Field(description="Hex color code for the emotion")
+
+class DreamAnalysis(BaseModel):
+    symbols: List[Symbol] = Field(description="List of symbolic elements found in the dream")
+    emotions: List[Emotion] = Field(description="List of emotions detected in the dream")
+    keywords: List[str] = Field(description="Key themes and keywords extracted from the dream")
+    tone: str = Field(description="Overall tone and mood of the dream")
+    themes: List[str] = Field(description="Recurring themes and patterns")
+
+class StartupIdea(BaseModel):
+    name: str = Field(description="Creative and memorable startup name")
+    tagline: str = Field(description="Catchy one-liner describing the startup")
+    description: str = Field(description="Detailed description of the startup concept")
+    problem: str = Field(description="The problem this startup solves")
+    solution: str = Field(description="How the startup solves the problem")
+    targetMarket: str = Field(description="Target market and audience")
+    businessModel: str = Field(description="Business model and revenue strategy")
+    techStack: List[str] = Field(description="Recommended technology stack")
+    monetization: str = Field(description="Monetization strategy")
+    competitiveAdvantage: str = Field(description="Unique competitive advantage")
+
+class BusinessModelCanvas(BaseModel):
+    keyPartners: List[str] = Field(description="Key partners and suppliers")
+    keyActivities: List[str] = Field(description="Key activities the business must perform")
+    keyResources: List[str] = Field(description="Key resources the business depends on")
+    valuePropositions: List[str] = Field(description="Value delivered to customers")
+    customerRelationships: List[str] = Field(description="Relationships established with each segment")
+    channels: List[str] = Field(description="Channels used to reach customers")
+    customerSegments: List[str] = Field(description="Customer segments served")
+    costStructure: List[str] = Field(description="Main costs of running the business")
+    revenueStreams: List[str] = Field(description="Sources of revenue")
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def wrap_single_item(cls, value):
+        # Models sometimes answer a list field with a single string
+        return [value] if isinstance(value, str) else value
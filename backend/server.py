@@ -0,0 +1,108 @@
+"""
+Production serving with gunicorn
+Worker processes, threads per worker, timeouts, keep-alive and max-requests
+recycling come from SERVER_* environment variables (overridable on the run.py
+command line). SIGTERM drains in-flight requests before workers exit.
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (option, environment variable, type, default, help) for every tunable setting
+SERVER_OPTIONS: List[Tuple[str, str, Callable[[str], Any], Any, str]] = [
+    ("workers", "SERVER_WORKERS", int, min(multiprocessing.cpu_count(), 4),
+     "Worker processes (default: CPU count, at most 4)"),
+    ("threads", "SERVER_THREADS", int, 32,
+     "Threads per worker; LLM calls mostly wait on the network, so this can be high"),
+    ("worker_class", "SERVER_WORKER_CLASS", str, "gthread",
+     "gunicorn worker class: gthread, or gevent/eventlet if installed"),
+    ("timeout", "SERVER_TIMEOUT", int, 180,
+     "Seconds a worker may stay silent before it is killed and restarted"),
+    ("graceful_timeout", "SERVER_GRACEFUL_TIMEOUT", int, 120,
+     "Seconds in-flight requests get to finish after SIGTERM"),
+    ("keepalive", "SERVER_KEEPALIVE", int, 5,
+     "Seconds to hold idle keep-alive connections open"),
+    ("max_requests", "SERVER_MAX_REQUESTS", int, 1000,
+     "Recycle a worker after this many requests (0 disables)"),
+    ("max_requests_jitter", "SERVER_MAX_REQUESTS_JITTER", int, 100,
+     "Random extra requests per worker so recycling is staggered"),
+    ("backlog", "SERVER_BACKLOG", int, 2048,
+     "Pending connections the listen socket queues"),
+]
+
+
+def options_from_env() -> Dict[str, Any]:
+    """Server settings from SERVER_* environment variables, falling back to defaults"""
+    options = {}
+    for name, env, cast, default, _ in SERVER_OPTIONS:
+        value = os.getenv(env)
+        options[name] = cast(value) if value not in (None, "") else default
+    return options
+
+
+def add_server_arguments(parser) -> None:
+    """Register a --flag for every server option on an argparse parser"""
+    group = parser.add_argument_group("production server")
+    for name, env, cast, _, help_text in SERVER_OPTIONS:
+        group.add_argument("--" + name.replace("_", "-"), dest=name, type=cast, default=None,
+                           help=f"{help_text} [env: {env}]")
+
+
+def drain_executors(server, worker) -> None:
+    """gunicorn worker_exit hook: let fan-out work started by finished requests complete"""
+    app_module = sys.modules.get("app")
+    if app_module is None:
+        return
+    logger.info("Worker %s draining background executors", worker.pid)
+    app_module.pipeline_executor.shutdown(wait=True)
+    # Accepted jobs finish here; any cut off by the kill timeout are resumed by the next worker
+    if app_module.job_runner is not None:
+        app_module.job_runner.shutdown(wait=True)
+
+
+def log_timeout(worker) -> None:
+    """gunicorn worker_abort hook: a request outlived SERVER_TIMEOUT"""
+    logger.error("Worker %s timed out with requests in flight; raise SERVER_TIMEOUT for slow LLM calls", worker.pid)
+
+
+def gunicorn_config(host: str, port: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate server options into gunicorn settings"""
+    return {
+        "bind": f"{host}:{port}",
+        **options,
+        # Keep app loading in the workers: each needs its own LLM client and SQLite connections
+        "preload_app": False,
+        "accesslog": "-",
+        "errorlog": "-",
+        "worker_exit": drain_executors,
+        "worker_abort": log_timeout,
+    }
+
+
+def serve(host: str, port: int, options: Dict[str, Any]) -> None:
+    """Run the Flask app under gunicorn until SIGTERM/SIGINT"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ Error: production mode needs gunicorn (pip install gunicorn; not available on Windows)")
+        sys.exit(1)
+
+    config = gunicorn_config(host, port, options)
+    # The app sizes its upstream call pool from the thread count, CLI overrides included
+    os.environ["SERVER_THREADS"] = str(options["threads"])
+
+    class DreamApplication(BaseApplication):
+        def load_config(self):
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    DreamApplication().run()
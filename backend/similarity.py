@@ -0,0 +1,221 @@
+"""
+Near-duplicate dream index
+Dreams are embedded locally as hashed character n-gram vectors (no network,
+NumPy only) and kept in a bounded in-memory matrix. A lookup is one
+matrix-vector product over the stored unit vectors (cosine similarity).
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZES = (3, 4, 5)
+_WORD = re.compile(r"\w+")
+
+# Moods the frontend offers. Any other mood goes to one shared bucket, so
+# free-text moods cannot grow the index (or its saved metadata) without bound
+MOODS = ("sad", "neutral", "happy", "excited", "anxious")
+OTHER_MOOD = len(MOODS)
+_MOOD_IDS = {mood: index for index, mood in enumerate(MOODS)}
+
+
+def mood_id(mood: Any) -> int:
+    """Index bucket of a mood: its position in MOODS, or OTHER_MOOD"""
+    return _MOOD_IDS.get(normalize_text(mood) if isinstance(mood, str) else "", OTHER_MOOD)
+
+
+def text_features(text: str) -> List[str]:
+    """Word tokens plus character n-grams of each word (padded with spaces)"""
+    features = []
+    for word in _WORD.findall(normalize_text(text)):
+        features.append("w:" + word)
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for start in range(max(1, len(padded) - size + 1)):
+                features.append(padded[start:start + size])
+    return features
+
+
+def embed(text: str, dim: int):
+    """Signed feature-hashing embedding with sublinear term frequency, L2-normalized"""
+    import numpy as np
+    counts: Dict[int, float] = {}
+    for feature in text_features(text):
+        digest = zlib.crc32(feature.encode("utf-8"))
+        index = digest % dim
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        counts[index] = counts.get(index, 0.0) + sign
+    vector = np.zeros(dim, dtype=np.float32)
+    for index, value in counts.items():
+        vector[index] = np.sign(value) * (1.0 + np.log(abs(value))) if value else 0.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Match:
+    """Most similar stored dream for a query"""
+
+    def __init__(self, score: float, analysis: Dict[str, Any], content: str):
+        self.score = score
+        self.analysis = analysis
+        self.content = content
+
+
+class DreamIndex:
+    """Bounded vector index of analysed dreams, grouped by mood
+
+    Holds at most `max_entries` dreams; once full, the oldest entry is
+    overwritten. With `path` set the index is loaded at start and saved every
+    `save_every` inserts (and on save()).
+    """
+
+    def __init__(self, dim: int = 512, max_entries: int = 20000, path: Optional[str] = None, save_every: int = 100):
+        import numpy as np
+        self.dim = dim
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self._vectors = np.zeros((min(max_entries, 1024), dim), dtype=np.float32)
+        self._moods = np.zeros(self._vectors.shape[0], dtype=np.int32)
+        self._analyses: List[Optional[Dict[str, Any]]] = []
+        self._contents: List[str] = []
+        self._count = 0
+        self._next = 0
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        if path and os.path.exists(path + ".npy"):
+            self._load()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _ensure_capacity(self, rows: int) -> None:
+        import numpy as np
+        if rows <= self._vectors.shape[0]:
+            return
+        size = min(self.max_entries, max(rows, self._vectors.shape[0] * 2))
+        vectors = np.zeros((size, self.dim), dtype=np.float32)
+        vectors[:self._count] = self._vectors[:self._count]
+        moods = np.zeros(size, dtype=np.int32)
+        moods[:self._count] = self._moods[:self._count]
+        self._vectors, self._moods = vectors, moods
+
+    def add_vector(self, vector, mood: str, analysis: Dict[str, Any], content: str = "") -> None:
+        """Insert a pre-computed unit vector, evicting the oldest entry when full"""
+        with self._lock:
+            slot = self._next
+            if self._count < self.max_entries:
+                self._ensure_capacity(self._count + 1)
+                self._count += 1
+                self._analyses.append(analysis)
+                self._contents.append(content)
+            else:
+                self._analyses[slot] = analysis
+                self._contents[slot] = content
+            self._vectors[slot] = vector
+            self._moods[slot] = mood_id(mood)
+            self._next = (slot + 1) % self.max_entries
+            self._unsaved += 1
+            save = self.path and self._unsaved >= self.save_every
+        if save:
+            self.save()
+
+    def add(self, content: str, mood: str, analysis: Dict[str, Any]) -> None:
+        self.add_vector(embed(content, self.dim), mood, analysis, content)
+
+    def search_vector(self, vector, mood: str) -> Optional[Match]:
+        """Best match among stored dreams with the same mood (any mood outside MOODS counts as one)"""
+        import numpy as np
+        with self._lock:
+            if not self._count:
+                return None
+            scores = self._vectors[:self._count] @ vector
+            scores[self._moods[:self._count] != mood_id(mood)] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < 0:
+                return None
+            return Match(float(scores[best]), self._analyses[best], self._contents[best])
+
+    def search(self, content: str, mood: str) -> Optional[Match]:
+        return self.search_vector(embed(content, self.dim), mood)
+
+    def save(self) -> None:
+        """Write vectors (.npy) and metadata (.json) atomically next to `path`"""
+        import numpy as np
+        if not self.path:
+            return
+        with self._lock:
+            vectors = self._vectors[:self._count].copy()
+            metadata = {
+                "dim": self.dim,
+                "next": self._next,
+                "moods": self._moods[:self._count].tolist(),
+                "moodIds": _MOOD_IDS,
+                "analyses": list(self._analyses),
+                "contents": list(self._contents),
+            }
+            self._unsaved = 0
+        with self._save_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path + ".npy.tmp", "wb") as handle:
+                np.save(handle, vectors)
+            with open(self.path + ".json.tmp", "w", encoding="utf-8") as handle:
+                json.dump(metadata, handle, ensure_ascii=False)
+            os.replace(self.path + ".npy.tmp", self.path + ".npy")
+            os.replace(self.path + ".json.tmp", self.path + ".json")
+
+    def _load(self) -> None:
+        import numpy as np
+        try:
+            vectors = np.load(self.path + ".npy")
+            with open(self.path + ".json", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable dream index at {self.path}: {e}")
+            return
+        if metadata.get("dim") != self.dim or len(vectors) != len(metadata["analyses"]):
+            logger.warning(f"Ignoring dream index at {self.path}: built with a different dimension")
+            return
+        keep = min(len(vectors), self.max_entries)
+        self._ensure_capacity(keep)
+        self._vectors[:keep] = vectors[:keep]
+        # Older indexes numbered every distinct mood they saw; map saved IDs to today's buckets
+        buckets = {saved: mood_id(mood) for mood, saved in metadata["moodIds"].items()}
+        self._moods[:keep] = [buckets.get(saved, OTHER_MOOD) for saved in metadata["moods"][:keep]]
+        self._analyses = metadata["analyses"][:keep]
+        self._contents = metadata["contents"][:keep]
+        self._count = keep
+        self._next = metadata["next"] % self.max_entries if keep == self.max_entries else keep
+        logger.info(f"Loaded {keep} dreams from {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "maxEntries": self.max_entries,
+                "dim": self.dim,
+                "bytes": int(self._vectors.nbytes),
+            }
+
+
+def dream_index_from_env() -> Tuple[Optional[DreamIndex], float, Optional[float]]:
+    """Build the index from SIMILARITY_* variables: (index or None, reuse threshold, seed threshold)"""
+    if os.getenv("SIMILARITY_INDEX_ENABLED", "0").lower() not in ("1", "true", "yes"):
+        return None, 1.0, None
+    index = DreamIndex(
+        dim=int(os.getenv("SIMILARITY_DIM", "512")),
+        max_entries=int(os.getenv("SIMILARITY_MAX_ENTRIES", "20000")),
+        path=os.getenv("SIMILARITY_INDEX_PATH") or None,
+        save_every=int(os.getenv("SIMILARITY_SAVE_EVERY", "100")),
+    )
+    seed = os.getenv("SIMILARITY_SEED_THRESHOLD")
+    return index, float(os.getenv("SIMILARITY_THRESHOLD", "0.9")), float(seed) if seed else None
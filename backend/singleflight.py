@@ -0,0 +1,171 @@
+"""
+Single-flight coalescing of identical in-flight calls
+Concurrent callers with the same key share one execution and its result or
+error. Within a process this uses threading events; with a lock directory,
+workers in other processes serialize on a file lock and pick up the leader's
+JSON result instead of repeating the call. An open circuit breaker reaches
+followers in other processes as CircuitOpen, with its remaining wait.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from resilience import CircuitOpen
+
+# Roles returned by SingleFlight.do
+LEADER = "leader"
+THREAD = "thread"
+PROCESS = "process"
+
+
+class CoalescedCallError(RuntimeError):
+    """Error raised by a leader in another process, replayed to a follower"""
+
+
+def error_record(error: Exception) -> Dict[str, Any]:
+    """A leader's error as written for followers in other processes"""
+    if isinstance(error, CircuitOpen):
+        return {"error": str(error), "circuitOpen": error.name, "retryAfter": error.retry_after}
+    return {"error": str(error)}
+
+
+def replayed_error(shared: Dict[str, Any], written_at: float) -> Exception:
+    """The exception a follower raises for an error record written at `written_at`"""
+    if "circuitOpen" in shared:
+        return CircuitOpen(shared["circuitOpen"], shared["retryAfter"] - (time.time() - written_at))
+    return CoalescedCallError(shared["error"])
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome
+
+    Results must be JSON-serializable when `lock_dir` is set. A result written
+    by another process is reused for `result_ttl` seconds, which covers callers
+    that arrive just after the leader finished. A leader's error is only
+    shared with callers that were already waiting on it; later callers run
+    the call themselves rather than getting a cached failure.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, enabled: bool = True, lock_dir: Optional[str] = None, result_ttl: float = 5.0):
+        self.enabled = enabled
+        self.lock_dir = lock_dir
+        self.result_ttl = result_ttl
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        if lock_dir:
+            import fcntl  # noqa: F401  (POSIX only; fail at startup rather than on first call)
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, str]:
+        """Return (result, role) where role is LEADER, THREAD or PROCESS"""
+        if not self.enabled:
+            return fn(), LEADER
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, THREAD
+
+        try:
+            call.result, role = self._lead(key, fn)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, role
+
+    def _lead(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, str]:
+        if not self.lock_dir:
+            return fn(), LEADER
+
+        import fcntl
+        path = os.path.join(self.lock_dir, key)
+        waiting_since = time.time()
+        with open(path + ".lock", "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                shared, written_at = self._read_result(path, waiting_since)
+                if shared is not None and "error" in shared and written_at >= waiting_since:
+                    raise replayed_error(shared, written_at)
+                if shared is not None and "result" in shared:
+                    return shared["result"], PROCESS
+                try:
+                    result = fn()
+                except Exception as e:
+                    self._write_result(path, error_record(e))
+                    raise
+                self._write_result(path, {"result": result})
+                return result, LEADER
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_result(self, path: str, waiting_since: float) -> Tuple[Optional[Dict[str, Any]], float]:
+        """The last outcome written for `path` and when, or (None, 0) if there is none within result_ttl"""
+        try:
+            written_at = os.path.getmtime(path + ".json")
+            if written_at < waiting_since - self.result_ttl:
+                return None, 0.0
+            with open(path + ".json", encoding="utf-8") as handle:
+                return json.load(handle), written_at
+        except (OSError, ValueError):
+            return None, 0.0
+
+    def _write_result(self, path: str, outcome: Dict[str, Any]) -> None:
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(outcome, handle, ensure_ascii=False)
+        os.replace(temporary, path + ".json")
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Remove lock/result files for keys that have been idle for a while"""
+        cutoff = time.time() - max(60.0, self.result_ttl * 10)
+        for name in os.listdir(self.lock_dir):
+            if not name.endswith(".json"):
+                continue
+            base = os.path.join(self.lock_dir, name[:-len(".json")])
+            try:
+                if os.path.getmtime(base + ".json") < cutoff:
+                    os.remove(base + ".json")
+                    os.remove(base + ".lock")
+            except OSError:
+                pass
+
+
+def singleflight_from_env() -> SingleFlight:
+    """Build the coalescer from COALESCE_* environment variables"""
+    return SingleFlight(
+        enabled=os.getenv("COALESCE_ENABLED", "1").lower() not in ("0", "false", "no"),
+        lock_dir=os.getenv("COALESCE_LOCK_DIR") or None,
+        result_ttl=float(os.getenv("COALESCE_RESULT_TTL", "5")),
+    )
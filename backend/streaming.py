@@ -0,0 +1,110 @@
+"""
+Server-Sent Events helpers and incremental JSON parsing for streamed LLM output
+"""
+
+import json
+from typing import Any, List, Tuple
+
+from responses import dumps_bytes
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {dumps_bytes(data).decode('utf-8')}\n\n"
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop reverse proxies (nginx) from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+
+class IncrementalObjectParser:
+    """Emit top-level fields of a JSON object as soon as each value is complete
+
+    Text before the opening brace (chatty preambles, ```json fences) is skipped,
+    and already scanned characters are never re-read, so feeding N chunks costs
+    O(total length) rather than re-parsing the whole buffer every time.
+    A key or value that is not valid JSON (trailing commas, comments) stops the
+    parser: it sets `failed` and emits nothing more, leaving the caller to
+    repair the full output once it is complete.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.segment_start = None
+        self.value_start = None
+        self.key = None
+        self.done = False
+        self.failed = False
+        self.fields = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return the (key, value) pairs it completed"""
+        completed = []
+        if self.done or not chunk:
+            return completed
+        self.buffer += chunk
+        text = self.buffer
+        for index in range(self.position, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if self.depth == 0:
+                if char == "{":
+                    self.depth = 1
+                    self.segment_start = index + 1
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        self._complete_value(text, index, completed)
+                    except json.JSONDecodeError:
+                        return self._fail(completed)
+                    self.done = True
+                    self.position = index + 1
+                    return completed
+            elif self.depth == 1 and char == ":":
+                try:
+                    self.key = json.loads(text[self.segment_start:index].strip())
+                except json.JSONDecodeError:
+                    return self._fail(completed)
+                self.value_start = index + 1
+            elif self.depth == 1 and char == ",":
+                try:
+                    self._complete_value(text, index, completed)
+                except json.JSONDecodeError:
+                    return self._fail(completed)
+                self.segment_start = index + 1
+        self.position = len(text)
+        return completed
+
+    def _fail(self, completed: list) -> List[Tuple[str, Any]]:
+        self.done = True
+        self.failed = True
+        return completed
+
+    def _complete_value(self, text: str, end: int, completed: list) -> None:
+        if self.key is None:
+            return
+        value = json.loads(text[self.value_start:end])
+        self.fields[self.key] = value
+        completed.append((self.key, value))
+        self.key = None
+        self.value_start = None
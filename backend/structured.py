@@ -0,0 +1,187 @@
+"""
+Structured output extraction and repair
+Pulls a JSON object out of fenced or chatty LLM output, repairs common
+defects (trailing commas, Python literals, smart quotes, truncation), and
+splits the result into fields that validate against a Pydantic model and
+fields that have to be asked for again.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.S)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+
+
+class StructuredOutputError(ValueError):
+    """The output contains no recoverable JSON object"""
+
+
+def _object_span(text: str) -> str:
+    """Text from the first '{' to its matching '}' (or to the end when truncated)"""
+    start = text.find("{")
+    if start < 0:
+        raise StructuredOutputError("No JSON object found in model output")
+    depth = 0
+    in_string = escape = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return text[start:]
+
+
+def repair_json(text: str) -> str:
+    """Fix trailing commas and Python literals, and close a truncated object
+
+    A string value cut off by truncation is dropped together with its key,
+    so a half-written field is re-asked instead of kept.
+    """
+    output: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    string_start = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            output.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            index += 1
+            continue
+        if char == '"':
+            in_string = True
+            string_start = len(output)
+            output.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            output.append(char)
+        elif char in "}]":
+            # Drop a trailing comma before the closer
+            while output and output[-1].isspace():
+                output.pop()
+            if output and output[-1] == ",":
+                output.pop()
+            if stack:
+                output.append(stack.pop())
+        elif char.isalpha():
+            end = index
+            while end < len(text) and text[end].isalpha():
+                end += 1
+            word = text[index:end]
+            output.append(_LITERALS.get(word, word))
+            index = end
+            continue
+        else:
+            output.append(char)
+        index += 1
+
+    repaired = "".join(output)
+    if in_string:
+        repaired = repaired[:string_start]
+    if stack:
+        repaired = repaired.rstrip()
+        while True:
+            trimmed = repaired.rstrip().rstrip(",").rstrip()
+            if stack[-1] == "}":
+                match = _DANGLING_KEY.search(trimmed)
+                if match:
+                    trimmed = trimmed[:match.start()] + ("{" if match.group(1) == "{" else "")
+            if trimmed == repaired:
+                break
+            repaired = trimmed
+        repaired += "".join(reversed(stack))
+    return repaired
+
+
+def extract_json(text: str) -> Tuple[Dict[str, Any], bool]:
+    """Return (object, repaired) for the first JSON object in model output"""
+    fenced = _FENCE.search(text)
+    candidate = _object_span(fenced.group(1) if fenced and "{" in fenced.group(1) else text)
+    try:
+        value = json.loads(candidate, strict=False)
+        repaired = False
+    except ValueError:
+        try:
+            value = json.loads(repair_json(candidate.translate(_SMART_QUOTES)), strict=False)
+        except ValueError as e:
+            raise StructuredOutputError(f"Unrepairable JSON in model output: {e}")
+        repaired = True
+    if not isinstance(value, dict):
+        raise StructuredOutputError("Model output is not a JSON object")
+    return value, repaired
+
+
+def split_fields(model, data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Validate `data` against a Pydantic model field by field
+
+    Returns (valid, bad): the top-level fields that validate and the names of
+    missing or invalid ones. Invalid items inside a list field are dropped
+    when at least one valid item remains.
+    """
+    from pydantic import ValidationError
+
+    data = {name: value for name, value in data.items() if name in model.model_fields}
+    try:
+        model.model_validate(data)
+        return data, []
+    except ValidationError as e:
+        errors = e.errors()
+
+    bad: Set[str] = set()
+    drop: Dict[str, Set[int]] = {}
+    for error in errors:
+        location = error.get("loc") or ()
+        if not location:
+            continue
+        field = location[0]
+        if len(location) > 1 and isinstance(location[1], int) and isinstance(data.get(field), list):
+            drop.setdefault(field, set()).add(location[1])
+        else:
+            bad.add(field)
+    for field, indices in drop.items():
+        kept = [item for position, item in enumerate(data[field]) if position not in indices]
+        if kept:
+            data[field] = kept
+        else:
+            bad.add(field)
+
+    # Whatever still fails (including missing fields) has to be asked for again
+    valid = {name: value for name, value in data.items() if name not in bad}
+    try:
+        model.model_validate(valid)
+        return valid, []
+    except ValidationError as e:
+        bad = {error["loc"][0] for error in e.errors() if error.get("loc")}
+    return {name: value for name, value in valid.items() if name not in bad}, sorted(bad)
+
+
+def field_descriptions(model, fields: List[str]) -> str:
+    """One line per field with its type and description, for a re-ask prompt"""
+    lines = []
+    for name in fields:
+        info = model.model_fields[name]
+        annotation = getattr(info.annotation, "__name__", None) or str(info.annotation).replace("typing.", "")
+        lines.append(f"- {name} ({annotation}): {info.description or ''}")
+    return "\n".join(lines)
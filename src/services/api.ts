@@ -1,13 +1,28 @@
 import axios from 'axios';
-import { Dream, DreamAnalysis, StartupIdea, BusinessModelCanvas, VCChat, AppMockup } from '../types';
+import { Dream, DreamAnalysis, StartupIdea, BusinessModelCanvas, VCChat, AppMockup, DreamToStartupResult } from '../types';
 import { mockAnalyzeDream, mockGenerateStartupIdea, mockGenerateBusinessModel, mockGenerateAppMockup } from './mockApi';
 
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:5000';
 
+// Saved dreams belong to an API key; without a configured one, each browser gets its own.
+// A browser-made key only names the dreams' owner: rate limits and quotas still go by IP
+const getApiKey = (): string => {
+  if (process.env.REACT_APP_API_KEY) {
+    return process.env.REACT_APP_API_KEY;
+  }
+  let key = localStorage.getItem('dreamApiKey');
+  if (!key) {
+    key = crypto.randomUUID();
+    localStorage.setItem('dreamApiKey', key);
+  }
+  return key;
+};
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
+    'X-API-Key': getApiKey(),
   },
 });
 
@@ -50,6 +65,15 @@ export const generateAppMockup = async (startupIdea: StartupIdea): Promise<AppMo
   return response.data;
 };
 
+// Full pipeline in one round trip (business model and mockup run in parallel server-side)
+export const dreamToStartup = async (dream: Omit<Dream, 'id' | 'createdAt'>): Promise<DreamToStartupResult> => {
+  const response = await api.post('/dream-to-startup', {
+    content: dream.content,
+    mood: dream.mood
+  });
+  return response.data;
+};
+
 // VC Chat
 export const sendVCMessage = async (message: string, startupIdea: StartupIdea): Promise<VCChat> => {
   const response = await api.post('/vc-chat', { message, startupIdea });
@@ -88,4 +112,18 @@ export const regenerateSection = async (startupIdea: StartupIdea, section: strin
   }
 };
 
+// Regenerate several sections at once (generated concurrently server-side)
+export const regenerateSections = async (startupIdea: StartupIdea, sections: string[]): Promise<Partial<StartupIdea>> => {
+  try {
+    const response = await api.post('/regenerate-section', {
+      startupIdea,
+      sections
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error calling regenerate-section API:', error);
+    throw error;
+  }
+};
+
 export default api; 
\ No newline at end of file
@@ -66,4 +66,19 @@ export interface AppMockup {
   imageUrl: string;
   description: string;
   createdAt: Date;
-} 
\ No newline at end of file
+} 
+export interface PipelineTimings {
+  analysis: number;
+  startupIdea: number;
+  businessModel: number;
+  mockup: number;
+  total: number;
+}
+
+export interface DreamToStartupResult {
+  analysis: DreamAnalysis;
+  startupIdea: StartupIdea;
+  businessModel: BusinessModelCanvas;
+  mockup: AppMockup;
+  timings: PipelineTimings;
+}